@@ -1,5 +1,4 @@
-from typing import Dict, Any
-from langchain.chat_models import ChatOpenAI
+from typing import Dict, Any, Iterator, List
 from langchain.chains import LLMChain
 from langchain.prompts import ChatPromptTemplate
 from prompts.agent_prompts.courier_prompts import (
@@ -8,42 +7,69 @@ from prompts.agent_prompts.courier_prompts import (
     WEIGHT_ANALYSIS_PROMPT
 )
 from utils.metrics import MetricsCalculator
+from utils.concurrency import run_blocking
+from utils.llm import get_chat_model
+
+# Metrics handed to the prompts, per PARENT_COURIER
+PERFORMANCE_METRICS = ['fasr', 'delivery_rate', 'rto_rate', 'ndr_rate', 'avg_tat_hours']
+WEIGHT_METRICS = ['weight_discrepancy_rate', 'avg_excess_weight']
 
 class CourierAgent:
     def __init__(self):
-        self.llm = ChatOpenAI(model_name="gpt-3.5-turbo")
+        self.llm = get_chat_model("gpt-3.5-turbo")
         self.metrics_calculator = MetricsCalculator()
 
     def process_query(self, query: str, context: Dict[str, Any] = None) -> str:
-        # Get courier performance data
-        courier_data = self._get_courier_performance(context)
+        prompt, inputs = self._build_prompt(query, context)
+        
+        # Create and execute chain
+        chain = LLMChain(llm=self.llm, prompt=prompt)
+        response = chain.run(**inputs)
         
+        return response
+
+    def stream_query(self, query: str, context: Dict[str, Any] = None) -> Iterator[str]:
+        """Yield response tokens as the LLM produces them"""
+        prompt, inputs = self._build_prompt(query, context)
+        chain = prompt | self.llm
+        for chunk in chain.stream(inputs):
+            yield chunk.content
+
+    def _build_prompt(self, query: str, context: Dict[str, Any] = None):
+        """Pick the prompt for the query and gather the data it needs"""
+        group_by = self._group_by(query)
+
         # Determine prompt based on query type
         if "weight" in query.lower():
             prompt_template = WEIGHT_ANALYSIS_PROMPT
-            data = self._get_weight_analysis(context)
+            inputs = {"query": query, "weight_data": self._get_weight_analysis(group_by)}
         else:
             prompt_template = COURIER_BASE_PROMPT
-            data = courier_data
+            inputs = {"query": query, "data": self._get_courier_performance(group_by)}
         
         # Create prompt
         prompt = ChatPromptTemplate.from_messages([
             ("system", prompt_template),
             ("human", "{query}")
         ])
-        
-        # Create and execute chain
-        chain = LLMChain(llm=self.llm, prompt=prompt)
-        response = chain.run(query=query, data=data)
-        
-        return response
+        return prompt, inputs
+
+    async def aprocess_query(self, query: str, context: Dict[str, Any] = None) -> str:
+        """Async variant of process_query; the legacy LLMChain runs in a worker thread"""
+        return await run_blocking('llm', self.process_query, query, context)
 
-    def _get_courier_performance(self, context: Dict[str, Any] = None) -> Dict[str, Any]:
+    def _group_by(self, query: str) -> List[str]:
+        """Couriers, also split by zone when the question asks for it"""
+        return ['PARENT_COURIER', 'ZONE'] if 'zone' in query.lower() else ['PARENT_COURIER']
+
+    def _get_courier_performance(self, group_by: List[str] = None) -> List[Dict[str, Any]]:
         """Get courier performance metrics"""
-        # Implement courier performance metrics calculation
-        return {}
+        return self._records(PERFORMANCE_METRICS, group_by or ['PARENT_COURIER'])
 
-    def _get_weight_analysis(self, context: Dict[str, Any] = None) -> Dict[str, Any]:
+    def _get_weight_analysis(self, group_by: List[str] = None) -> List[Dict[str, Any]]:
         """Get weight discrepancy analysis"""
-        # Implement weight analysis
-        return {}
\ No newline at end of file
+        return self._records(WEIGHT_METRICS, group_by or ['PARENT_COURIER'])
+
+    def _records(self, metrics: List[str], group_by: List[str]) -> List[Dict[str, Any]]:
+        result = self.metrics_calculator.compute(metrics, group_by=group_by)
+        return result[group_by + ['total_shipments'] + metrics].to_dict('records')
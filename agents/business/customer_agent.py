@@ -1,26 +1,21 @@
-from typing import Dict, Any
-from langchain_openai import ChatOpenAI
+from typing import Dict, Any, Iterator
 from langchain_core.prompts import ChatPromptTemplate
 from utils.metrics import MetricsCalculator
+from utils.concurrency import get_limiter
+from utils.llm import get_chat_model
+
+FALLBACK_RESPONSE = "I need more information to help track your order. Could you please provide your order ID or AWB number?"
 
 class CustomerAgent:
     def __init__(self):
-        self.llm = ChatOpenAI(model_name="gpt-3.5-turbo")
+        self.llm = get_chat_model("gpt-3.5-turbo")
         self.metrics_calculator = MetricsCalculator()
 
     def process_query(self, query: str, context: Dict[str, Any] = None) -> str:
         # Get customer metrics
         customer_data = self._get_customer_metrics(context)
         
-        # Create prompt
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are a customer service agent for a shipping company. 
-            Help customers track their orders and answer shipping-related questions."""),
-            ("human", "{query}")
-        ])
-        
-        # Create chain using the new pipe syntax
-        chain = prompt | self.llm
+        chain = self._build_chain()
         
         try:
             # Use invoke instead of run
@@ -28,8 +23,43 @@ class CustomerAgent:
                 "query": query
             })
             return str(response.content)
-        except Exception as e:
-            return "I need more information to help track your order. Could you please provide your order ID or AWB number?"
+        except Exception:
+            return FALLBACK_RESPONSE
+
+    async def aprocess_query(self, query: str, context: Dict[str, Any] = None) -> str:
+        """Async variant of process_query"""
+        chain = self._build_chain()
+
+        try:
+            async with get_limiter('llm'):
+                response = await chain.ainvoke({"query": query})
+            return str(response.content)
+        except Exception:
+            return FALLBACK_RESPONSE
+
+    def stream_query(self, query: str, context: Dict[str, Any] = None) -> Iterator[str]:
+        """Yield response tokens as the LLM produces them"""
+        chain = self._build_chain()
+
+        streamed = False
+        try:
+            for chunk in chain.stream({"query": query}):
+                streamed = True
+                yield str(chunk.content)
+        except Exception:
+            if not streamed:
+                yield FALLBACK_RESPONSE
+
+    def _build_chain(self):
+        """Create the prompt | llm chain"""
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", """You are a customer service agent for a shipping company. 
+            Help customers track their orders and answer shipping-related questions."""),
+            ("human", "{query}")
+        ])
+        
+        # Create chain using the new pipe syntax
+        return prompt | self.llm
 
     def _get_customer_metrics(self, context: Dict[str, Any] = None) -> Dict[str, Any]:
         """Calculate customer-related metrics"""
@@ -39,5 +69,5 @@ class CustomerAgent:
                 # Add metrics calculation logic here
                 pass
             return metrics
-        except Exception as e:
+        except Exception:
             return {}
\ No newline at end of file
@@ -1,58 +1,129 @@
-from typing import Dict, Any, List
-from langchain_openai import ChatOpenAI
+import re
+from functools import partial
+from typing import Dict, Any, List, Optional, Tuple, Union
 from langchain_core.prompts import ChatPromptTemplate
 from utils.metrics import MetricsCalculator
-from database.connector import get_db_connection
+from database.connector import CancellationToken, run_query
+from database.tracking_cache import get_tracking_cache
+from database.awb_index import get_awb_index
+from database.result_store import ResultRef, get_result_store
+from utils.concurrency import run_blocking
+from utils.llm import get_chat_model
+from config import TRACKING_CHUNK_SIZE, TRACKING_QUERY_TIMEOUT
 import pandas as pd
 
+AWB_PATTERN = re.compile(r'AWB\d{8}', re.IGNORECASE)
+
+TRACKING_COLUMNS = [
+    'AWB_CODE',
+    'SHIPMENT_STATUS',
+    'ASSIGNED_DATE_TIME',
+    'FIRST_ATTEMPT_DATE',
+    'AWB_DELIVERED_DATE',
+    'NO_OF_ATTEMPTS',
+    'NDR_RAISED_SHIPMENTS',
+    'PARENT_COURIER',
+    'ZONE',
+    'CITY_TIER'
+]
+
+def _bulk_tracking_query(num_awbs: int) -> str:
+    placeholders = ", ".join(["?"] * num_awbs)
+    return f"""
+        SELECT 
+            {", ".join(TRACKING_COLUMNS)}
+        FROM VIEW_TITANIUM_PLATINUM_REPORT
+        WHERE AWB_CODE IN ({placeholders})
+        """
+
 class DeliveryAgent:
     def __init__(self):
-        self.llm = ChatOpenAI(model_name="gpt-3.5-turbo")
+        self.llm = get_chat_model("gpt-3.5-turbo")
         self.metrics_calculator = MetricsCalculator()
-        self.conn = get_db_connection()
+        self.tracking_cache = get_tracking_cache()
+        self.awb_index = get_awb_index()
 
-    def process_query(self, query: str, context: Dict[str, Any] = None) -> str:
-        # Extract tracking numbers from context or query
-        tracking_numbers = context.get('entities', []) if context else []
-        if not tracking_numbers:
-            tracking_numbers = self._extract_tracking_numbers(query)
+    def process_query(self, query: str, context: Dict[str, Any] = None) -> Union[str, Tuple[str, str, ResultRef]]:
+        # Extract tracking numbers from context and query
+        entities = context.get('entities', []) if context else []
+        tracking_numbers = self._extract_tracking_numbers(" ".join(entities) + " " + query)
+        cancel_token = context.get('cancel_token') if context else None
         
         try:
-            if tracking_numbers:
-                # Get tracking info for the first AWB
-                return self._get_tracking_info(tracking_numbers[0])
+            if len(tracking_numbers) > 1:
+                return self._get_bulk_tracking_info(tracking_numbers, cancel_token)
+            elif tracking_numbers:
+                return self._get_tracking_info(tracking_numbers[0], cancel_token)
             else:
                 return "Please provide a valid tracking number (AWB) to check your delivery status."
                 
         except Exception as e:
             return f"I encountered an error while retrieving the tracking information: {str(e)}"
 
+    async def aprocess_query(self, query: str, context: Dict[str, Any] = None) -> Union[str, Tuple[str, str, ResultRef]]:
+        """Async variant of process_query; lookups run off the event loop"""
+        return await run_blocking('warehouse', self.process_query, query, context)
+
     def _extract_tracking_numbers(self, text: str) -> List[str]:
-        """Extract AWB numbers from text"""
-        import re
-        awb_pattern = r'AWB\d{8}'
-        return re.findall(awb_pattern, text, re.IGNORECASE)
+        """Extract unique AWB numbers from text, in order of appearance"""
+        awbs = (awb.upper() for awb in AWB_PATTERN.findall(text))
+        return list(dict.fromkeys(awbs))
+
+    def _fetch_tracking_rows(self, awbs: List[str], cancel_token: Optional[CancellationToken] = None) -> pd.DataFrame:
+        """Fetch tracking rows for AWBs, serving hot ones from the tracking cache"""
+        rows = self.tracking_cache.get_many(awbs, partial(self._load_tracking_rows, cancel_token=cancel_token))
+        records = [rows[awb] for awb in awbs if awb in rows]
+        return pd.DataFrame(records, columns=TRACKING_COLUMNS)
+
+    def _load_tracking_rows(self,
+                            awbs: List[str],
+                            cancel_token: Optional[CancellationToken] = None) -> Dict[str, Dict[str, Any]]:
+        """Look tracking rows up in the local AWB index, querying the rest in chunked IN-lists"""
+        rows = self.awb_index.get_many(awbs)
+        missing = [awb for awb in awbs if awb not in rows]
+        for start in range(0, len(missing), TRACKING_CHUNK_SIZE):
+            chunk = missing[start:start + TRACKING_CHUNK_SIZE]
+            # At most one row per AWB, so the chunk bounds the result size
+            df = run_query(_bulk_tracking_query(len(chunk)), chunk, timeout=TRACKING_QUERY_TIMEOUT,
+                           max_rows=None, max_bytes=None, cancel_token=cancel_token).frame
+            for row in df.to_dict('records'):
+                rows[str(row['AWB_CODE']).upper()] = row
+        return rows
+
+    def warm_cache(self, frame: pd.DataFrame) -> int:
+        """Pre-load the tracking cache from a bulk export of recent shipments"""
+        frame = frame[[col for col in TRACKING_COLUMNS if col in frame.columns]].copy()
+        frame['AWB_CODE'] = frame['AWB_CODE'].astype(str).str.upper()
+        return self.tracking_cache.warm(frame)
 
-    def _get_tracking_info(self, awb: str) -> str:
+    def _get_bulk_tracking_info(self,
+                                awbs: List[str],
+                                cancel_token: Optional[CancellationToken] = None) -> Tuple[str, str, ResultRef]:
+        """Get a status table and summary for many AWBs"""
+        df = self._fetch_tracking_rows(awbs, cancel_token)
+        df = df.drop_duplicates(subset='AWB_CODE')
+
+        found = set(df['AWB_CODE'].str.upper())
+        missing = [awb for awb in awbs if awb not in found]
+        ndr_flagged = int(df['NDR_RAISED_SHIPMENTS'].fillna(0).astype(bool).sum())
+
+        response = f"Tracking summary for {len(awbs)} AWBs ({len(df)} found):\n\n"
+        response += "Shipments by status:\n"
+        for status, count in df['SHIPMENT_STATUS'].fillna('UNKNOWN').value_counts().items():
+            response += f"- {status}: {count}\n"
+        response += f"\nNDR raised: {ndr_flagged}\n"
+
+        if missing:
+            shown = ", ".join(missing[:20])
+            more = f" and {len(missing) - 20} more" if len(missing) > 20 else ""
+            response += f"Not found: {shown}{more}\n"
+
+        return response, _bulk_tracking_query(min(len(awbs), TRACKING_CHUNK_SIZE)), get_result_store().put(df)
+
+    def _get_tracking_info(self, awb: str, cancel_token: Optional[CancellationToken] = None) -> str:
         """Get tracking information for an AWB"""
-        query = """
-        SELECT 
-            AWB_CODE,
-            SHIPMENT_STATUS,
-            ASSIGNED_DATE_TIME,
-            FIRST_ATTEMPT_DATE,
-            AWB_DELIVERED_DATE,
-            NO_OF_ATTEMPTS,
-            NDR_RAISED_SHIPMENTS,
-            PARENT_COURIER,
-            ZONE,
-            CITY_TIER
-        FROM VIEW_TITANIUM_PLATINUM_REPORT  # Changed here
-        WHERE AWB_CODE = ?
-        """
-            
         try:
-            df = pd.read_sql_query(query, self.conn, params=[awb])
+            df = self._fetch_tracking_rows([awb], cancel_token)
             
             if df.empty:
                 return f"No tracking information found for AWB: {awb}"
@@ -1,13 +1,61 @@
 from typing import Dict, Any, List, Tuple, Optional
-from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
-from database.connector import get_db_connection
+from database.connector import run_query, get_analytics_pool
+from database.result_cache import get_result_cache
+from database.result_store import ResultRef, get_result_store
+from agents.support.sql_cache import get_sql_cache
+from agents.support.sql_cache import normalize_question
+from utils.concurrency import get_limiter, run_blocking
+from utils.metrics import MetricsCalculator
+from utils.sql_guard import GuardedQuery, get_sql_guard
+from utils.llm import get_chat_model
+import asyncio
+import re
 import pandas as pd
 
+# Classifier metrics the rollup can answer, and the engine metric for each
+ROLLUP_METRICS = {
+    'rto': 'rto_rate',
+    'ndr': 'ndr_rate',
+    'fasr': 'fasr',
+    'tat': 'avg_tat_hours'
+}
+
+# Question words that ask for a breakdown
+ROLLUP_GROUP_TERMS = {
+    'zone': 'ZONE',
+    'tier': 'CITY_TIER',
+    'courier': 'PARENT_COURIER',
+    'mode': 'MODE_OF_SHIPMENT',
+    'payment': 'MODE_OF_SHIPMENT',
+    'month': 'MONTH',
+    'week': 'WEEK',
+    'day': 'DAY'
+}
+
+# Words that add nothing beyond the metric and breakdown
+ROLLUP_FILLER_TERMS = {
+    'rate', 'rto', 'ndr', 'fasr', 'tat', 'trend', 'analysis', 'breakdown',
+    'wise', 'overall', 'performance', 'shipment', 'delivery', 'time',
+    'turnaround', 'first', 'attempt', 'non', 'raised',
+    'average', 'current', 'our', 'each', 'every'
+}
+
+ZONE_FILTER_PATTERN = re.compile(r'\bzone[_\s]?([a-e]2?)\b', re.IGNORECASE)
+TIER_FILTER_PATTERN = re.compile(r'\btier[_\s]?([123])\b|\bmetro\b', re.IGNORECASE)
+MODE_FILTER_PATTERN = re.compile(r'\b(cod|prepaid)\b', re.IGNORECASE)
+
+TRUNCATION_NOTE = "\n\nNote: the result was too large, so only the first {rows:,} rows are shown."
+REWRITE_NOTE = "\n\nNote: the query was narrowed before running: {rewrites}."
+
 class OperationsAgent:
     def __init__(self):
-        self.llm = ChatOpenAI(model_name="gpt-3.5-turbo")
-        self.conn = get_db_connection()
+        self.llm = get_chat_model("gpt-3.5-turbo")
+        self.result_cache = get_result_cache()
+        self.result_store = get_result_store()
+        self.sql_cache = get_sql_cache()
+        self.sql_guard = get_sql_guard()
+        self.metrics_calculator = MetricsCalculator()
         
         # Schema information for the LLM
         self.table_schema = """
@@ -46,28 +94,155 @@ class OperationsAgent:
     ("human", "{question}")
 ])
 
-    def process_query(self, query: str, context: Dict[str, Any] = None) -> Tuple[str, str, List[Dict]]:
+        self.sql_cache.set_schema(self.table_schema)
+
+    def set_table_schema(self, table_schema: str) -> None:
+        """Update the schema shown to the LLM and drop SQL generated for the old one"""
+        self.table_schema = table_schema
+        self.sql_cache.set_schema(table_schema)
+
+    def process_query(self, query: str, context: Dict[str, Any] = None) -> Tuple[str, str, ResultRef]:
+        context = context or {}
+        metrics = context.get("metrics", [])
+        entities = context.get("entities", [])
         try:
-            # Generate SQL from natural language
-            chain = self.nl2sql_prompt | self.llm
-            sql_response = chain.invoke({
-                "schema": self.table_schema,
-                "question": query
-            })
-            
-            sql_query = sql_response.content
-            
-            # Execute the generated query
-            df = pd.read_sql_query(sql_query, self.conn)
+            # Standard metric breakdowns come straight from the local rollup
+            answer = self._answer_from_rollup(query, metrics)
+            if answer is not None:
+                return answer
+
+            # Reuse SQL generated for the same or a near-identical question
+            sql_query = self.sql_cache.lookup(query, metrics, entities)
+            from_cache = sql_query is not None
+
+            if not from_cache:
+                # Generate SQL from natural language
+                chain = self.nl2sql_prompt | self.llm
+                sql_response = chain.invoke({
+                    "schema": self.table_schema,
+                    "question": query
+                })
+
+                sql_query = sql_response.content
+
+            # Refuse writes, bound the scan and cap the rows before executing
+            guarded = self.sql_guard.check(sql_query)
+            sql_query = guarded.sql
+            df, truncated = self._execute_sql(sql_query, context.get("cancel_token"))
+
+            if not from_cache:
+                # Unguarded, so a hit is windowed, limited and reported like a fresh query
+                self.sql_cache.store(query, guarded.original_sql, metrics, entities)
             
             # Format natural language response
-            response = self._format_results_text(df, query)
+            response = self._format_results_text(df, query) + self._guard_notes(guarded, df, truncated)
             
-            return response, sql_query, df.to_dict('records')
+            return response, sql_query, self.result_store.put(df)
             
         except Exception as e:
             raise Exception(f"Failed to process query: {str(e)}")
 
+    async def aprocess_query(self, query: str, context: Dict[str, Any] = None) -> Tuple[str, str, ResultRef]:
+        """Async variant of process_query; warehouse work runs off the event loop"""
+        context = context or {}
+        metrics = context.get("metrics", [])
+        entities = context.get("entities", [])
+        try:
+            answer = await asyncio.to_thread(self._answer_from_rollup, query, metrics)
+            if answer is not None:
+                return answer
+
+            sql_query = self.sql_cache.lookup(query, metrics, entities)
+            from_cache = sql_query is not None
+
+            if not from_cache:
+                chain = self.nl2sql_prompt | self.llm
+                async with get_limiter('llm'):
+                    sql_response = await chain.ainvoke({
+                        "schema": self.table_schema,
+                        "question": query
+                    })
+                sql_query = sql_response.content
+
+            if self.sql_guard.explain:
+                guarded = await run_blocking('warehouse', self.sql_guard.check, sql_query)
+            else:
+                guarded = self.sql_guard.check(sql_query)
+            sql_query = guarded.sql
+            df, truncated = await run_blocking('warehouse', self._execute_sql, sql_query, context.get("cancel_token"))
+
+            if not from_cache:
+                # Unguarded, so a hit is windowed, limited and reported like a fresh query
+                self.sql_cache.store(query, guarded.original_sql, metrics, entities)
+
+            response = self._format_results_text(df, query) + self._guard_notes(guarded, df, truncated)
+
+            return response, sql_query, self.result_store.put(df)
+
+        except Exception as e:
+            raise Exception(f"Failed to process query: {str(e)}")
+
+    def _plan_rollup_question(self, query: str, metrics: List[str]) -> Optional[Tuple[List[str], Dict[str, Any], List[str]]]:
+        """Translate a question into a rollup request, or None if it asks for more"""
+        engine_metrics = [ROLLUP_METRICS[m] for m in metrics or [] if m in ROLLUP_METRICS]
+        if not engine_metrics or len(engine_metrics) != len(metrics):
+            return None
+
+        filters: Dict[str, Any] = {}
+        zones = [f"z_{z.lower()}" for z in ZONE_FILTER_PATTERN.findall(query)]
+        tiers = [f"Tier{t}" if t else "Metro" for t in TIER_FILTER_PATTERN.findall(query)]
+        modes = [m.upper() for m in MODE_FILTER_PATTERN.findall(query)]
+        for column, values in (('ZONE', zones), ('CITY_TIER', tiers), ('MODE_OF_SHIPMENT', modes)):
+            if values:
+                filters[column] = sorted(set(values))
+
+        remaining = query
+        for pattern in (ZONE_FILTER_PATTERN, TIER_FILTER_PATTERN, MODE_FILTER_PATTERN):
+            remaining = pattern.sub(" ", remaining)
+
+        group_by = []
+        for token in normalize_question(remaining).split():
+            if token in ROLLUP_GROUP_TERMS:
+                column = ROLLUP_GROUP_TERMS[token]
+                if column not in group_by and column not in filters:
+                    group_by.append(column)
+            elif token not in ROLLUP_FILLER_TERMS:
+                return None  # e.g. dates, rankings or columns the rollup lacks
+        return engine_metrics, filters, group_by
+
+    def _answer_from_rollup(self, query: str, metrics: List[str]) -> Optional[Tuple[str, str, ResultRef]]:
+        """Answer from the local daily rollup when the question fits it"""
+        plan = self._plan_rollup_question(query, metrics)
+        if plan is None or not self.metrics_calculator.covered_by_rollup(*plan):
+            return None
+
+        df = self.metrics_calculator.compute(*plan)
+        equivalent_sql, _ = self.metrics_calculator.build_query(*plan)
+        sql_query = f"-- Answered from the local daily rollup; equivalent warehouse query:\n{equivalent_sql}"
+        return self._format_results_text(df, query), sql_query, self.result_store.put(df)
+
+    def _execute_sql(self, sql_query: str, cancel_token=None) -> Tuple[pd.DataFrame, bool]:
+        """Execute generated SQL, reusing a cached result when fresh; also returns whether rows were cut off"""
+        df = self.result_cache.get(sql_query)
+        if df is not None:
+            return df, False
+
+        result = run_query(sql_query, cancel_token=cancel_token, pool=get_analytics_pool())
+        if not result.truncated:
+            self.result_cache.put(sql_query, result.frame)
+        return result.frame, result.truncated
+
+    def _guard_notes(self, guarded: GuardedQuery, df: pd.DataFrame, truncated: bool) -> str:
+        """Tell the user about rows cut off and filters the SQL guard added"""
+        notes = ""
+        windows = [r for r in guarded.rewrites if not r.startswith("LIMIT ")]
+        if windows:
+            notes += REWRITE_NOTE.format(rewrites="; ".join(windows))
+        # A result that fills the guard's LIMIT has most likely been cut off by it
+        if truncated or (guarded.row_limit is not None and len(df) >= guarded.row_limit):
+            notes += TRUNCATION_NOTE.format(rows=len(df))
+        return notes
+
     def _format_results_text(self, df: pd.DataFrame, query: str) -> str:
         """Format results into natural language response"""
         if df.empty:
@@ -1,12 +1,23 @@
-from typing import Dict, List, Tuple, Any, TypedDict, Optional
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, List, Tuple, Any, TypedDict, Optional, Iterator
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
 from operator import itemgetter
 from langgraph.graph import Graph, StateGraph,END
 #rom langgraph.prebuilt import END
-from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
-from config import ORCHESTRATOR_MODEL, AGENT_MODEL
+from config import ORCHESTRATOR_MODEL, AGENT_MODEL, AGENT_TYPES, AGENT_FANOUT_MAX_WORKERS, AGENT_DEADLINES
 from utils.query_classifier import QueryClassifier
+from utils.concurrency import get_limiter, run_blocking
+from utils.tracing import traced, get_tracer
+from utils.llm import get_chat_model
+from database.result_cache import get_result_cache
+from database.connector import CancellationToken
+from database.result_store import ResultRef
+from agents.support.context_manager import ContextManager
 from typing import Dict, List, Any, TypedDict, Optional, Tuple  # Added Tuple here
 
 class GraphState(TypedDict):
@@ -15,13 +26,25 @@ class GraphState(TypedDict):
     context: Dict[str, Any]
     next_step: str
     query_type: str
+    secondary_agents: List[str]
     entities: List[str]
     metrics: List[str]
     sql_query: Optional[str]
-    results: Optional[List[Dict]]
+    results: Optional[ResultRef]
 
-def get_business_agent(agent_type: str):
-    """Get specific business agent based on type"""
+_registry_lock = threading.RLock()
+_business_agents: Dict[str, Any] = {}
+_classifier: Optional[QueryClassifier] = None
+_graphs: Dict[str, Any] = {}
+
+# Agents of a cross-domain question run side by side on this pool
+_fanout_pool = ThreadPoolExecutor(max_workers=AGENT_FANOUT_MAX_WORKERS, thread_name_prefix="agent-fanout")
+
+# Marks an agent that missed its deadline in a fan-out
+_TIMED_OUT = object()
+
+def _create_business_agent(agent_type: str):
+    """Create a new business agent based on type"""
     if agent_type == "delivery":
         from agents.business.delivery_agent import DeliveryAgent
         return DeliveryAgent()
@@ -37,57 +60,256 @@ def get_business_agent(agent_type: str):
     else:
         raise ValueError(f"Unknown agent type: {agent_type}")
 
+def get_business_agent(agent_type: str):
+    """Get the shared business agent for a type, creating it on first use"""
+    agent = _business_agents.get(agent_type)
+    if agent is None:
+        with _registry_lock:
+            agent = _business_agents.get(agent_type)
+            if agent is None:
+                agent = _create_business_agent(agent_type)
+                _business_agents[agent_type] = agent
+    return agent
+
+def get_classifier() -> QueryClassifier:
+    """Get the shared query classifier"""
+    global _classifier
+    if _classifier is None:
+        with _registry_lock:
+            if _classifier is None:
+                _classifier = QueryClassifier()
+    return _classifier
+
+def get_compiled_graph():
+    """Get the shared compiled workflow graph"""
+    return _get_graph("sync", create_graph)
+
+def get_compiled_async_graph():
+    """Get the shared compiled workflow graph with async nodes"""
+    return _get_graph("async", create_async_graph)
+
+def _get_graph(kind: str, factory):
+    graph = _graphs.get(kind)
+    if graph is None:
+        with _registry_lock:
+            graph = _graphs.get(kind)
+            if graph is None:
+                graph = factory()
+                _graphs[kind] = graph
+    return graph
+
+def warm_up(agent_types: List[str] = None) -> None:
+    """Build the graph, classifier and business agents ahead of the first query"""
+    get_compiled_graph()
+    get_compiled_async_graph()
+    get_classifier()
+    for agent_type in agent_types or ["delivery", "operations", "customer"]:
+        get_business_agent(agent_type)
+
+@traced("classify")
 def classify_query(state: GraphState) -> GraphState:
     """Classify incoming query and update state"""
-    classifier = QueryClassifier()
+    classifier = get_classifier()
     messages = state["messages"]
     latest_message = messages[-1].content
     
     classification = classifier.classify(latest_message)
     
+    return _apply_classification(state, classification)
+
+@traced("classify")
+async def aclassify_query(state: GraphState) -> GraphState:
+    """Async classify; overlaps classification with the result cache's freshness check.
+
+    Only questions the rules already send to the operations agent prefetch the
+    warehouse watermark; other agents never read the result cache.
+    """
+    classifier = get_classifier()
+    latest_message = state["messages"][-1].content
+
+    rules = classifier.classify_rules(latest_message)
+    if "operations" not in [rules["primary_agent"], *rules["secondary_agents"]]:
+        classification = await asyncio.to_thread(classifier.classify, latest_message)
+    else:
+        classification, _ = await asyncio.gather(
+            asyncio.to_thread(classifier.classify, latest_message),
+            run_blocking('warehouse', get_result_cache().current_watermark)
+        )
+
+    return _apply_classification(state, classification)
+
+def _apply_classification(state: GraphState, classification: Dict) -> GraphState:
+    secondary_agents = [
+        agent for agent in classification.get("secondary_agents", []) if agent != classification["primary_agent"]
+    ]
     return {
         **state,
+        "context": {**state["context"], "need_cross_agent": bool(secondary_agents)},
         "query_type": classification["primary_agent"],
+        "secondary_agents": secondary_agents,
         "entities": classification["entities"],
         "metrics": classification["metrics"],
         "next_step": "route_to_agent"
     }
 
+@traced("route")
 def route_to_agent(state: GraphState) -> GraphState:
     """Route query to appropriate agent"""
     agent_type = state["query_type"]
     agent = get_business_agent(agent_type)
     
     try:
-        if agent_type == "operations":
-            response, sql_query, results = agent.process_query(
-                query=state["messages"][-1].content,
-                context={
-                    "entities": state["entities"],
-                    "metrics": state["metrics"]
-                }
-            )
-            state["sql_query"] = sql_query
-            state["results"] = results
-        else:
-            response = agent.process_query(
-                query=state["messages"][-1].content,
-                context={
-                    "entities": state["entities"],
-                    "metrics": state["metrics"]
-                }
-            )
-            
-        state["messages"].append(AIMessage(content=response))
-        state["current_agent"] = agent_type
-        state["next_step"] = "check_followup"
-        
+        output = agent.process_query(
+            query=state["messages"][-1].content,
+            context=_agent_context(state)
+        )
+        return _apply_agent_output(state, agent_type, output)
+    except Exception as e:
+        error_msg = f"Error in agent processing: {str(e)}"
+        state["messages"].append(AIMessage(content=error_msg))
         return state
+
+@traced("route")
+async def aroute_to_agent(state: GraphState) -> GraphState:
+    """Async route query to appropriate agent"""
+    agent_type = state["query_type"]
+    agent = get_business_agent(agent_type)
+
+    try:
+        output = await agent.aprocess_query(
+            query=state["messages"][-1].content,
+            context=_agent_context(state)
+        )
+        return _apply_agent_output(state, agent_type, output)
     except Exception as e:
         error_msg = f"Error in agent processing: {str(e)}"
         state["messages"].append(AIMessage(content=error_msg))
         return state
 
+@traced("fan_out")
+def fan_out(state: GraphState) -> GraphState:
+    """Run the primary and secondary agents concurrently and merge their answers.
+
+    Each agent has its own deadline (AGENT_DEADLINES); one that misses it is
+    cancelled and reported as such, so the answer takes as long as the
+    slowest agent within its deadline rather than the sum of all agents.
+    """
+    query = state["messages"][-1].content
+    agents = _fanout_agents(state)
+    tokens = {agent: _child_token(state["context"].get("cancel_token")) for agent in agents}
+    started = time.monotonic()
+    futures = {
+        # Each agent runs in a copy of this context, so its spans nest under fan_out
+        agent: _fanout_pool.submit(
+            contextvars.copy_context().run,
+            get_business_agent(agent).process_query,
+            query=query,
+            context=_agent_context(state, tokens[agent][0])
+        )
+        for agent in agents
+    }
+
+    outputs = {}
+    for agent, future in futures.items():
+        remaining = AGENT_DEADLINES.get(agent, 60) - (time.monotonic() - started)
+        try:
+            outputs[agent] = future.result(timeout=max(0.0, remaining))
+        except FutureTimeoutError:
+            # Interrupts the agent's warehouse queries; an LLM call still runs out in its worker
+            tokens[agent][0].cancel()
+            outputs[agent] = _TIMED_OUT
+        except Exception as e:
+            outputs[agent] = e
+        finally:
+            tokens[agent][1]()
+    return _apply_fanout_output(state, agents, outputs)
+
+@traced("fan_out")
+async def afan_out(state: GraphState) -> GraphState:
+    """Async fan_out: agents run as concurrent tasks, each under its own deadline"""
+    query = state["messages"][-1].content
+    agents = _fanout_agents(state)
+
+    async def run(agent: str) -> Any:
+        token, unregister = _child_token(state["context"].get("cancel_token"))
+        try:
+            return await asyncio.wait_for(
+                get_business_agent(agent).aprocess_query(query=query, context=_agent_context(state, token)),
+                AGENT_DEADLINES.get(agent, 60)
+            )
+        except asyncio.TimeoutError:
+            token.cancel()
+            return _TIMED_OUT
+        except Exception as e:
+            return e
+        finally:
+            unregister()
+
+    results = await asyncio.gather(*(run(agent) for agent in agents))
+    return _apply_fanout_output(state, agents, dict(zip(agents, results)))
+
+def _fanout_agents(state: GraphState) -> List[str]:
+    primary = state["query_type"]
+    return [primary] + [agent for agent in state.get("secondary_agents") or [] if agent != primary]
+
+def _child_token(parent: Optional[CancellationToken]) -> Tuple[CancellationToken, Any]:
+    """A token cancelled with ``parent`` that can also be cancelled alone; returns it and a detach function"""
+    token = CancellationToken()
+    if parent is None:
+        return token, lambda: None
+    return token, parent.register(token.cancel)
+
+def _apply_fanout_output(state: GraphState, agents: List[str], outputs: Dict[str, Any]) -> GraphState:
+    """Merge partial answers into one response; SQL and results come from the first agent that has them"""
+    sections, statuses = [], {}
+    for agent in agents:
+        output = outputs[agent]
+        if output is _TIMED_OUT:
+            text, statuses[agent] = f"_No answer within {AGENT_DEADLINES.get(agent, 60):g}s._", "timeout"
+        elif isinstance(output, Exception):
+            text, statuses[agent] = f"_Error in agent processing: {output}_", "error"
+        else:
+            statuses[agent] = "ok"
+            text = output
+            if isinstance(output, tuple):
+                text, sql_query, results = output
+                if state.get("sql_query") is None:
+                    state["sql_query"] = sql_query
+                    state["results"] = results
+        sections.append(f"**{AGENT_TYPES.get(agent, agent)}**\n\n{text}")
+
+    state["messages"].append(AIMessage(content="\n\n".join(sections)))
+    state["current_agent"] = agents[0]
+    state["context"] = {**state["context"], "need_cross_agent": False, "agent_status": statuses}
+    state["next_step"] = "check_followup"
+    return state
+
+def route_after_classify(state: GraphState) -> str:
+    """Send cross-domain questions to the fan-out, everything else to a single agent"""
+    return "cross_agent" if state["context"].get("need_cross_agent") else "single_agent"
+
+def _agent_context(state: GraphState, cancel_token: Optional[CancellationToken] = None) -> Dict[str, Any]:
+    return {
+        "entities": state["entities"],
+        "metrics": state["metrics"],
+        "cancel_token": cancel_token or state["context"].get("cancel_token"),
+        "conversation": state["context"].get("conversation")
+    }
+
+def _apply_agent_output(state: GraphState, agent_type: str, output: Any) -> GraphState:
+    """Record an agent's response, plus SQL and results when it returns them"""
+    if isinstance(output, tuple):
+        response, sql_query, results = output
+        state["sql_query"] = sql_query
+        state["results"] = results
+    else:
+        response = output
+
+    state["messages"].append(AIMessage(content=response))
+    state["current_agent"] = agent_type
+    state["next_step"] = "check_followup"
+    return state
+
 def check_followup(state: GraphState) -> str:
     """Determine if query needs followup"""
     context = state.get("context", {})
@@ -101,75 +323,234 @@ def check_followup(state: GraphState) -> str:
     else:
         return "end"
 
+@traced("clarify")
 def handle_clarification(state: GraphState) -> GraphState:
     """Handle cases needing clarification"""
-    llm = ChatOpenAI(model=AGENT_MODEL)
+    chain = _clarification_chain()
+    clarification = chain.invoke({"query": state["messages"][-1].content})
+    state["messages"].append(AIMessage(content=clarification.content))
+    state["next_step"] = "await_user"
+    return state
+
+@traced("clarify")
+async def ahandle_clarification(state: GraphState) -> GraphState:
+    """Async handle cases needing clarification"""
+    chain = _clarification_chain()
+    async with get_limiter('llm'):
+        clarification = await chain.ainvoke({"query": state["messages"][-1].content})
+    state["messages"].append(AIMessage(content=clarification.content))
+    state["next_step"] = "await_user"
+    return state
+
+def stream_clarification(query: str) -> Iterator[str]:
+    """Yield a clarifying question token by token"""
+    for chunk in _clarification_chain().stream({"query": query}):
+        yield chunk.content
+
+def _clarification_chain():
+    llm = get_chat_model(AGENT_MODEL)
     
     prompt = ChatPromptTemplate.from_messages([
         ("system", "Generate a clarifying question based on this user query."),
         ("human", "{query}")
     ])
     
-    chain = prompt | llm
-    clarification = chain.invoke({"query": state["messages"][-1].content})
-    state["messages"].append(AIMessage(content=str(clarification)))
-    state["next_step"] = "await_user"
-    return state
+    return prompt | llm
 
 def create_graph() -> Graph:
     """Create the workflow graph"""
+    return _build_graph(classify_query, route_to_agent, fan_out, handle_clarification)
+
+def create_async_graph() -> Graph:
+    """Create the workflow graph with async nodes, for use with ainvoke"""
+    return _build_graph(aclassify_query, aroute_to_agent, afan_out, ahandle_clarification)
+
+def _build_graph(classify, route, fan_out_node, clarify) -> Graph:
     workflow = StateGraph(GraphState)
     
     # Add nodes
-    workflow.add_node("classify", classify_query)
-    workflow.add_node("route", route_to_agent)
-    workflow.add_node("clarify", handle_clarification)
+    workflow.add_node("classify", classify)
+    workflow.add_node("route", route)
+    workflow.add_node("fan_out", fan_out_node)
+    workflow.add_node("clarify", clarify)
     
     # Add edges with conditions
-    workflow.add_edge("classify", "route")
     workflow.add_conditional_edges(
-        "route",
-        check_followup,
+        "classify",
+        route_after_classify,
         {
-            "need_clarification": "clarify",
-            "need_data": "route",
-            "end": END
+            "single_agent": "route",
+            "cross_agent": "fan_out"
         }
     )
+    followups = {
+        "need_clarification": "clarify",
+        "need_data": "route",
+        "cross_agent": "fan_out",
+        "end": END
+    }
+    workflow.add_conditional_edges("route", check_followup, followups)
+    workflow.add_conditional_edges("fan_out", check_followup, followups)
     workflow.add_edge("clarify", "classify")
     
     workflow.set_entry_point("classify")
     return workflow.compile()
 
+class StreamingResponse:
+    """Token stream for one query.
+
+    Iterate to receive response tokens; ``sql_query``, ``results`` and the
+    timings are filled in as the stream is consumed.
+    """
+
+    def __init__(self, query: str, cancel_token: Optional[CancellationToken] = None):
+        self.query = query
+        self.cancel_token = cancel_token
+        self.sql_query: Optional[str] = None
+        self.results: Optional[ResultRef] = None
+        self.agent_type: Optional[str] = None
+        self.time_to_first_token: Optional[float] = None
+        self.total_time: Optional[float] = None
+        self._parts: List[str] = []
+        self._tokens: Iterator[str] = iter(())
+
+    def __iter__(self) -> Iterator[str]:
+        started = time.perf_counter()
+        for token in self._tokens:
+            if self.cancel_token is not None and self.cancel_token.cancelled:
+                break
+            if not token:
+                continue
+            if self.time_to_first_token is None:
+                self.time_to_first_token = time.perf_counter() - started
+            self._parts.append(token)
+            yield token
+        self.total_time = time.perf_counter() - started
+
+    @property
+    def text(self) -> str:
+        """Response text received so far"""
+        return "".join(self._parts)
+
 class OrchestratorAgent:
     def __init__(self):
-        self.graph = create_graph()
-        self.classifier = QueryClassifier()
+        self.graph = get_compiled_graph()
+        self.async_graph = get_compiled_async_graph()
+        self.classifier = get_classifier()
     
-    def process_query(self, query: str) -> Tuple[str, Optional[str], Optional[List[Dict]]]:
+    def process_query(self, query: str, cancel_token: Optional[CancellationToken] = None,
+                      session_id: Optional[str] = None) -> Tuple[str, Optional[str], Optional[ResultRef]]:
         """Process query through the graph and return response, SQL query, and results"""
-        initial_state = {
+        try:
+            with get_tracer().span("query", "query"):
+                final_state = self.graph.invoke(self._initial_state(query, cancel_token, session_id))
+                self._record_turn(session_id, final_state)
+            return self._final_output(final_state)
+        except Exception as e:
+            return f"Error processing query: {str(e)}", None, None
+
+    async def aprocess_query(self, query: str, cancel_token: Optional[CancellationToken] = None,
+                             session_id: Optional[str] = None) -> Tuple[str, Optional[str], Optional[ResultRef]]:
+        """Async variant of process_query; many sessions can share one event loop"""
+        try:
+            with get_tracer().span("query", "query"):
+                initial_state = await asyncio.to_thread(self._initial_state, query, cancel_token, session_id)
+                final_state = await self.async_graph.ainvoke(initial_state)
+                await asyncio.to_thread(self._record_turn, session_id, final_state)
+            return self._final_output(final_state)
+        except Exception as e:
+            return f"Error processing query: {str(e)}", None, None
+
+    def stream_query(self, query: str, cancel_token: Optional[CancellationToken] = None,
+                     session_id: Optional[str] = None) -> StreamingResponse:
+        """Process query, streaming the response as it is generated"""
+        response = StreamingResponse(query, cancel_token)
+        response._tokens = self._stream(query, response, session_id)
+        return response
+
+    def _stream(self, query: str, response: StreamingResponse, session_id: Optional[str] = None) -> Iterator[str]:
+        try:
+            with get_tracer().span("query", "query", streamed=True):
+                state = classify_query(self._initial_state(query, response.cancel_token, session_id))
+                with get_tracer().span("route", "node"):
+                    yield from self._stream_answer(query, state, response)
+                # Runs once the consumer has taken the last token
+                if session_id is not None:
+                    ContextManager(session_id).update_context(query, response.text, state["entities"])
+        except Exception as e:
+            yield f"Error processing query: {str(e)}"
+
+    def _stream_answer(self, query: str, state: GraphState, response: StreamingResponse) -> Iterator[str]:
+        followup = check_followup(state)
+        if followup == "need_clarification":
+            yield from stream_clarification(query)
+            return
+
+        if followup == "cross_agent":
+            # Several agents answer together; the merged answer arrives in one piece
+            state = fan_out(state)
+            response.agent_type = state["current_agent"]
+            response.sql_query, response.results = state.get("sql_query"), state.get("results")
+            yield state["messages"][-1].content
+            return
+
+        agent_type = state["query_type"]
+        agent = get_business_agent(agent_type)
+        response.agent_type = agent_type
+        context = _agent_context(state)
+
+        if hasattr(agent, "stream_query"):
+            yield from agent.stream_query(query, context)
+            return
+
+        # Agents without an LLM summary deliver their answer in one piece
+        output = agent.process_query(query=query, context=context)
+        if isinstance(output, tuple):
+            output, response.sql_query, response.results = output
+        yield output
+
+    @staticmethod
+    def _initial_state(query: str, cancel_token: Optional[CancellationToken] = None,
+                       session_id: Optional[str] = None) -> GraphState:
+        context = {}
+        if cancel_token is not None:
+            context["cancel_token"] = cancel_token
+        if session_id is not None:
+            # Earlier turns of this session, capped to the context token budget
+            context["conversation"] = ContextManager(session_id).get_relevant_context(query)
+        return {
             "messages": [HumanMessage(content=query)],
             "current_agent": None,
-            "context": {},
+            "context": context,
             "next_step": "classify",
             "query_type": None,
+            "secondary_agents": [],
             "entities": [],
             "metrics": [],
             "sql_query": None,
             "results": None
         }
-        
-        try:
-            final_state = self.graph.invoke(initial_state)
-            return (
-                final_state["messages"][-1].content,
-                final_state.get("sql_query"),
-                final_state.get("results")
-            )
-        except Exception as e:
-            return f"Error processing query: {str(e)}", None, None
+
+    @staticmethod
+    def _record_turn(session_id: Optional[str], final_state: GraphState) -> None:
+        if session_id is None:
+            return
+        ContextManager(session_id).update_context(
+            final_state["messages"][0].content,
+            final_state["messages"][-1].content,
+            final_state.get("entities")
+        )
+
+    @staticmethod
+    def _final_output(final_state: GraphState) -> Tuple[str, Optional[str], Optional[ResultRef]]:
+        return (
+            final_state["messages"][-1].content,
+            final_state.get("sql_query"),
+            final_state.get("results")
+        )
 
     def reset(self):
         """Reset the orchestrator state"""
-        self.graph = create_graph()
\ No newline at end of file
+        # Per-query state lives in GraphState, so the shared graphs are reused
+        self.graph = get_compiled_graph()
+        self.async_graph = get_compiled_async_graph()
\ No newline at end of file
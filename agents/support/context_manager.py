@@ -1,58 +1,351 @@
-from typing import Dict, List, Any
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
 from datetime import datetime
+from config import (
+    MAX_CONTEXT_LENGTH,
+    CONTEXT_MAX_ENTITIES,
+    CONTEXT_TOKEN_BUDGET,
+    CONTEXT_MAX_RESPONSE_CHARS,
+    CONTEXT_SUMMARY_MAX_CHARS,
+    CONTEXT_STORE,
+    CONTEXT_STORE_PATH,
+    CONTEXT_STORE_MAX_SESSIONS,
+    CONTEXT_TTL
+)
+
+# summarizer(previous_summary, turns) -> new summary
+Summarizer = Callable[[str, List[Dict[str, Any]]], str]
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English)"""
+    return (len(text) + 3) // 4
+
+def _empty_state() -> Dict[str, Any]:
+    return {
+        'turns': [],  # most recent last, at most max_turns
+        'pending': [],  # turns pushed out of the ring buffer, not yet summarized
+        'summary': '',
+        'entities': {},  # entity -> last seen, least recently seen first
+        'metrics': {},  # metric -> value, least recently updated first
+        'turn_count': 0,
+        'last_query_time': None
+    }
+
+class MemoryContextStore:
+    """Per-session context kept in process memory, least recently used sessions dropped"""
+
+    def __init__(self, max_sessions: int = CONTEXT_STORE_MAX_SESSIONS, ttl: int = CONTEXT_TTL):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions = OrderedDict()  # session_id -> (saved_at, state)
+        self._lock = threading.Lock()
+
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            if time.time() - entry[0] > self.ttl:
+                del self._sessions[session_id]
+                return None
+            self._sessions.move_to_end(session_id)
+            # Hand out a copy so callers never mutate stored state outside save()
+            return json.loads(entry[1])
+
+    def save(self, session_id: str, state: Dict[str, Any]) -> None:
+        payload = json.dumps(state)
+        with self._lock:
+            self._sessions[session_id] = (time.time(), payload)
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+class SQLiteContextStore:
+    """Per-session context in a local SQLite file, so idle sessions cost no memory"""
+
+    def __init__(self, path: str = CONTEXT_STORE_PATH, ttl: int = CONTEXT_TTL):
+        self.path = path
+        self.ttl = ttl
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._last_cleanup = time.time()
+        with self._connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS session_context (
+                    session_id TEXT PRIMARY KEY,
+                    state TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+
+    def _connection(self) -> sqlite3.Connection:
+        """One connection per thread; sqlite3 connections are not shareable"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute(
+            "SELECT state FROM session_context WHERE session_id = ? AND updated_at >= ?",
+            (session_id, time.time() - self.ttl)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self, session_id: str, state: Dict[str, Any]) -> None:
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO session_context (session_id, state, updated_at) VALUES (?, ?, ?)",
+                (session_id, json.dumps(state), time.time())
+            )
+        if time.time() - self._last_cleanup > min(self.ttl, 3600):
+            self.cleanup()
+
+    def delete(self, session_id: str) -> None:
+        with self._connection() as conn:
+            conn.execute("DELETE FROM session_context WHERE session_id = ?", (session_id,))
+
+    def cleanup(self) -> int:
+        """Remove expired sessions; returns how many"""
+        self._last_cleanup = time.time()
+        with self._connection() as conn:
+            return conn.execute(
+                "DELETE FROM session_context WHERE updated_at < ?", (time.time() - self.ttl,)
+            ).rowcount
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM session_context").fetchone()[0]
+
+def extractive_summary(previous: str, turns: List[Dict[str, Any]], max_chars: int = CONTEXT_SUMMARY_MAX_CHARS) -> str:
+    """Summary without an LLM: the earlier questions, newest kept when space runs out"""
+    questions = [turn['query'].strip().replace("\n", " ") for turn in turns]
+    summary = "; ".join(([previous] if previous else []) + questions)
+    if len(summary) > max_chars:
+        summary = "..." + summary[-(max_chars - 3):]
+    return summary
+
+def llm_summarizer(model: Any = None) -> Summarizer:
+    """Summarizer backed by the agent model, for use off the request path"""
+    from langchain_core.prompts import ChatPromptTemplate
+    from config import AGENT_MODEL, TEMPERATURE
+    from utils.llm import get_chat_model
+
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", "Condense this shipment analytics conversation into a short summary "
+                   f"(under {CONTEXT_SUMMARY_MAX_CHARS} characters). Keep AWB numbers, "
+                   "zones, couriers, date ranges and metrics the user asked about."),
+        ("human", "Summary so far:\n{summary}\n\nNew turns:\n{turns}")
+    ])
+    chain = prompt | (model or get_chat_model(AGENT_MODEL, temperature=TEMPERATURE))
+
+    def summarize(previous: str, turns: List[Dict[str, Any]]) -> str:
+        text = "\n".join(f"Q: {turn['query']}\nA: {turn['response']}" for turn in turns)
+        summary = chain.invoke({"summary": previous or "(none)", "turns": text}).content
+        return summary[:CONTEXT_SUMMARY_MAX_CHARS]
+
+    return summarize
+
+# Background summaries share a small pool so they never hold up a response
+_summary_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="context-summary")
 
 class ContextManager:
-    def __init__(self):
-        self.context = {
-            'conversation_history': [],
-            'active_entities': set(),
-            'current_metrics': {},
-            'last_query_time': None
-        }
-        
-    def update_context(self, query: str, response: str, 
-                      entities: List[str] = None, 
+    """Bounded conversation context for one session.
+
+    The last ``max_turns`` turns are kept verbatim; older turns are folded into
+    a running summary, by ``summarizer`` in the background when one is given
+    and extractively otherwise. Entities and metrics are evicted least recently
+    seen first, and ``get_relevant_context`` fits within ``token_budget``.
+    State lives in a pluggable store keyed by ``session_id``.
+    """
+
+    def __init__(self,
+                 session_id: str = "default",
+                 store: Any = None,
+                 max_turns: int = MAX_CONTEXT_LENGTH,
+                 max_entities: int = CONTEXT_MAX_ENTITIES,
+                 token_budget: int = CONTEXT_TOKEN_BUDGET,
+                 summarizer: Optional[Summarizer] = None):
+        self.session_id = session_id
+        self.store = store if store is not None else get_context_store()
+        self.max_turns = max_turns
+        self.max_entities = max_entities
+        self.token_budget = token_budget
+        self.summarizer = summarizer
+        self._lock = _session_lock(session_id)
+
+    @property
+    def context(self) -> Dict[str, Any]:
+        """The stored state of this session"""
+        return self.store.load(self.session_id) or _empty_state()
+
+    def update_context(self, query: str, response: str,
+                      entities: List[str] = None,
                       metrics: Dict[str, Any] = None) -> None:
         """Update conversation context"""
-        # Update conversation history
-        self.context['conversation_history'].append({
-            'query': query,
-            'response': response,
-            'timestamp': datetime.now()
-        })
-        
-        # Update active entities
-        if entities:
-            self.context['active_entities'].update(entities)
-        
-        # Update metrics
-        if metrics:
-            self.context['current_metrics'].update(metrics)
-        
-        self.context['last_query_time'] = datetime.now()
+        now = time.time()
+        with self._lock:
+            state = self.context
+            state['turns'].append({
+                'query': query,
+                'response': response[:CONTEXT_MAX_RESPONSE_CHARS],
+                'timestamp': now
+            })
+            state['turn_count'] += 1
+
+            # Ring buffer: the oldest turns move to the summary backlog
+            overflow = len(state['turns']) - self.max_turns
+            if overflow > 0:
+                state['pending'].extend(state['turns'][:overflow])
+                del state['turns'][:overflow]
+
+            _touch(state['entities'], {entity: now for entity in entities or []}, self.max_entities)
+            _touch(state['metrics'], metrics or {}, self.max_entities)
+            state['last_query_time'] = now
+
+            if state['pending'] and self.summarizer is None:
+                state['summary'] = extractive_summary(state['summary'], state['pending'])
+                state['pending'] = []
+            self.store.save(self.session_id, state)
+
+        if self.summarizer is not None and state['pending']:
+            self._schedule_summary()
 
     def get_relevant_context(self, query: str) -> Dict[str, Any]:
-        """Get context relevant to current query"""
-        relevant_context = {
-            'recent_history': self.context['conversation_history'][-3:],
-            'active_entities': list(self.context['active_entities']),
-            'current_metrics': self.context['current_metrics']
+        """Get context relevant to current query, within the token budget"""
+        state = self.context
+        # Turns still waiting for the background summary are included in short form
+        summary = state['summary']
+        if state['pending']:
+            summary = extractive_summary(summary, state['pending'])
+
+        recent_history = [
+            {**turn, 'timestamp': datetime.fromtimestamp(turn['timestamp'])}
+            for turn in state['turns']
+        ]
+        entities = list(reversed(state['entities']))  # most recent first
+        metrics = state['metrics']
+
+        budget = self.token_budget - estimate_tokens(query)
+        used = (sum(_turn_tokens(turn) for turn in recent_history)
+                + estimate_tokens(summary)
+                + sum(estimate_tokens(entity) for entity in entities)
+                + estimate_tokens(json.dumps(metrics, default=str)))
+
+        # Trim what matters least first: older turns, the summary, old entities, the last turn
+        while used > budget and len(recent_history) > 1:
+            used -= _turn_tokens(recent_history.pop(0))
+        if used > budget and summary:
+            keep = max(0, len(summary) - 4 * (used - budget))
+            used -= estimate_tokens(summary) - estimate_tokens(summary[len(summary) - keep:])
+            summary = summary[len(summary) - keep:]
+        while used > budget and entities:
+            used -= estimate_tokens(entities.pop())
+        if used > budget and recent_history:
+            recent_history.pop()
+
+        return {
+            'recent_history': recent_history,
+            'summary': summary,
+            'active_entities': entities,
+            'current_metrics': metrics
         }
-        return relevant_context
 
     def clear_context(self) -> None:
         """Clear context data"""
-        self.context = {
-            'conversation_history': [],
-            'active_entities': set(),
-            'current_metrics': {},
-            'last_query_time': None
-        }
+        with self._lock:
+            self.store.delete(self.session_id)
 
     def should_refresh_context(self) -> bool:
         """Check if context needs refreshing"""
-        if not self.context['last_query_time']:
+        last_query_time = self.context['last_query_time']
+        if not last_query_time:
             return True
-            
-        time_difference = datetime.now() - self.context['last_query_time']
-        return time_difference.total_seconds() > 1800  # 30 minutes
\ No newline at end of file
+
+        return time.time() - last_query_time > 1800  # 30 minutes
+
+    def _schedule_summary(self) -> None:
+        with _summarizing_lock:
+            if self.session_id in _summarizing:
+                return
+            _summarizing.add(self.session_id)
+        _summary_pool.submit(self._summarize_pending)
+
+    def _summarize_pending(self) -> None:
+        """Fold pending turns into the summary; runs on the background pool"""
+        try:
+            while True:
+                with _summarizing_lock:
+                    # Checked and released together: a turn saved after this schedules a new run
+                    state = self.context
+                    pending = state['pending']
+                    if not pending:
+                        _summarizing.discard(self.session_id)
+                        return
+                try:
+                    summary = self.summarizer(state['summary'], pending)
+                except Exception:
+                    summary = extractive_summary(state['summary'], pending)
+
+                with self._lock:
+                    # Turns may have been added while the summarizer ran
+                    state = self.context
+                    state['summary'] = summary
+                    state['pending'] = state['pending'][len(pending):]
+                    self.store.save(self.session_id, state)
+        except BaseException:
+            with _summarizing_lock:
+                _summarizing.discard(self.session_id)
+            raise
+
+def _turn_tokens(turn: Dict[str, Any]) -> int:
+    return estimate_tokens(turn['query']) + estimate_tokens(turn['response'])
+
+def _touch(items: Dict[str, Any], updates: Dict[str, Any], max_items: int) -> None:
+    """Insert or refresh entries as most recent, evicting the least recent"""
+    for key, value in updates.items():
+        items.pop(key, None)
+        items[key] = value
+    for key in list(items)[:max(0, len(items) - max_items)]:
+        del items[key]
+
+# Striped locks: every ContextManager of a session shares one, without a lock per session
+_session_locks = [threading.RLock() for _ in range(64)]
+_summarizing = set()  # sessions with a background summary in flight
+_summarizing_lock = threading.Lock()  # guards _summarizing, whichever stripe a session uses
+
+def _session_lock(session_id: str) -> threading.RLock:
+    return _session_locks[hash(session_id) % len(_session_locks)]
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_context_store():
+    """Get the process-wide context store selected by CONTEXT_STORE"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if CONTEXT_STORE == 'sqlite':
+                    _store = SQLiteContextStore()
+                elif CONTEXT_STORE == 'memory':
+                    _store = MemoryContextStore()
+                else:
+                    raise ValueError(f"Unknown context store: {CONTEXT_STORE}")
+    return _store
@@ -1,7 +1,54 @@
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
+import numpy as np
 import pandas as pd
 from database.connector import get_db_session
+from database.models import ShipmentTracking
+
+VALID_ZONES = list(ShipmentTracking.__table__.columns['ZONE'].type.enums)
+VALID_CITY_TIERS = list(ShipmentTracking.__table__.columns['CITY_TIER'].type.enums)
+
+DATE_FIELDS = ['ASSIGNED_DATE_TIME', 'PICKED_DATE', 'AWB_DELIVERED_DATE']
+BOOL_FIELDS = ['RTO_SHIPMENTS', 'DELIVERED_SHIPMENTS', 'NDR_RAISED_SHIPMENTS']
+
+# Formats tried in order when parsing date columns in bulk; warehouse exports use the first
+DATETIME_FORMATS = ['%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d']
+
+_TRUE_STRINGS = ['1', 'true', 't', 'yes', 'y']
+_FALSE_STRINGS = ['0', 'false', 'f', 'no', 'n', '']
+
+class FrameValidation:
+    """Outcome of validating a DataFrame: per-check violation masks plus counts"""
+
+    def __init__(self, num_rows: int, missing_fields: List[str], masks: Dict[str, pd.Series]):
+        self.num_rows = num_rows
+        self.missing_fields = missing_fields
+        self.masks = masks  # check name -> boolean Series, True where a row fails
+
+    @property
+    def counts(self) -> Dict[str, int]:
+        return {name: int(mask.sum()) for name, mask in self.masks.items()}
+
+    @property
+    def invalid_rows(self) -> pd.Series:
+        """True for rows failing any check"""
+        if not self.masks:
+            return pd.Series(np.zeros(self.num_rows, dtype=bool))
+        return pd.concat(self.masks, axis=1).any(axis=1)
+
+    @property
+    def is_valid(self) -> bool:
+        return not self.missing_fields and not any(mask.any() for mask in self.masks.values())
+
+    def summary(self) -> Dict[str, Any]:
+        """Counts only, small enough to log or show"""
+        return {
+            'rows': self.num_rows,
+            'is_valid': self.is_valid,
+            'missing_fields': self.missing_fields,
+            'invalid_rows': int(self.invalid_rows.sum()),
+            'violations': {name: count for name, count in self.counts.items() if count}
+        }
 
 class DataValidator:
     def __init__(self):
@@ -27,11 +74,11 @@ class DataValidator:
         
         # Validate field values
         if 'ZONE' in data:
-            if data['ZONE'] not in ['z_a', 'z_b', 'z_c', 'z_d', 'z_e', 'z_e2']:
+            if data['ZONE'] not in VALID_ZONES:
                 validation_results['invalid_values'].append(('ZONE', data['ZONE']))
         
         if 'CITY_TIER' in data:
-            if data['CITY_TIER'] not in ['Tier1', 'Tier2', 'Tier3', 'Metro', 'Others']:
+            if data['CITY_TIER'] not in VALID_CITY_TIERS:
                 validation_results['invalid_values'].append(('CITY_TIER', data['CITY_TIER']))
         
         return validation_results
@@ -41,8 +88,7 @@ class DataValidator:
         cleaned_data = data.copy()
         
         # Standardize dates
-        date_fields = ['ASSIGNED_DATE_TIME', 'PICKED_DATE', 'AWB_DELIVERED_DATE']
-        for field in date_fields:
+        for field in DATE_FIELDS:
             if field in cleaned_data and cleaned_data[field]:
                 try:
                     cleaned_data[field] = pd.to_datetime(cleaned_data[field])
@@ -50,13 +96,59 @@ class DataValidator:
                     cleaned_data[field] = None
         
         # Standardize boolean fields
-        bool_fields = ['RTO_SHIPMENTS', 'DELIVERED_SHIPMENTS', 'NDR_RAISED_SHIPMENTS']
-        for field in bool_fields:
+        for field in BOOL_FIELDS:
             if field in cleaned_data:
                 cleaned_data[field] = bool(cleaned_data[field])
         
         return cleaned_data
 
+    def validate_frame(self, df: pd.DataFrame) -> FrameValidation:
+        """Validate a whole DataFrame at once.
+
+        Checks required columns, nulls in them, ZONE and CITY_TIER values,
+        unparseable dates and unrecognised boolean flags.
+        """
+        return self._check_frame(df)[1]
+
+    def clean_frame(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, FrameValidation]:
+        """Clean and standardize a whole DataFrame, returning it with its validation.
+
+        Dates become datetime64 (NaT where unparseable), flags become bool and
+        ZONE / CITY_TIER become categoricals (NaN where not a known value).
+        """
+        return self._check_frame(df, clean=True)
+
+    def _check_frame(self, df: pd.DataFrame, clean: bool = False) -> Tuple[Optional[pd.DataFrame], FrameValidation]:
+        masks = {}
+        missing_fields = [field for field in self.required_columns if field not in df.columns]
+        for field in self.required_columns:
+            if field in df.columns:
+                masks[f'null:{field}'] = df[field].isna()
+
+        cleaned = df.copy() if clean else None
+        for field, allowed in (('ZONE', VALID_ZONES), ('CITY_TIER', VALID_CITY_TIERS)):
+            if field in df.columns:
+                values = _to_category(df[field], allowed)
+                masks[f'invalid:{field}'] = values.isna() & df[field].notna()
+                if clean:
+                    cleaned[field] = values
+
+        for field in DATE_FIELDS:
+            if field in df.columns:
+                values = _parse_datetimes(df[field])
+                masks[f'invalid:{field}'] = values.isna() & df[field].notna()
+                if clean:
+                    cleaned[field] = values
+
+        for field in BOOL_FIELDS:
+            if field in df.columns:
+                values, invalid = _coerce_bool(df[field])
+                masks[f'invalid:{field}'] = invalid
+                if clean:
+                    cleaned[field] = values
+
+        return cleaned, FrameValidation(len(df), missing_fields, masks)
+
     def validate_metrics(self, metrics: Dict[str, float]) -> bool:
         """Validate calculated metrics"""
         valid = True
@@ -68,4 +160,44 @@ class DataValidator:
                     valid = False
                     break
         
-        return valid
\ No newline at end of file
+        return valid
+
+def _to_category(values: pd.Series, allowed: List[str]) -> pd.Series:
+    """Categorical over ``allowed``; values outside it become NaN"""
+    dtype = pd.CategoricalDtype(allowed)
+    if values.dtype == dtype:
+        return values
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # Recode the (few) categories rather than every row
+        return values.cat.set_categories(allowed)
+    # Unknown values are masked first; casting them is deprecated in pandas
+    return values.where(values.isin(allowed)).astype(dtype)
+
+def _parse_datetimes(values: pd.Series) -> pd.Series:
+    """Parse a column with explicit formats, trying later ones only on what is left"""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    parsed = pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns]')
+    remaining = values.notna()
+    for fmt in DATETIME_FORMATS:
+        if not remaining.any():
+            break
+        attempt = pd.to_datetime(values[remaining], format=fmt, errors='coerce')
+        parsed[attempt.index] = attempt
+        remaining &= parsed.isna()
+    return parsed
+
+def _coerce_bool(values: pd.Series) -> Tuple[pd.Series, pd.Series]:
+    """Flags as bool plus a mask of values that are not recognisably true or false.
+
+    Nulls count as False, as ``bool(None)`` does in ``clean_data``.
+    """
+    if pd.api.types.is_bool_dtype(values):
+        return values.fillna(False).astype(bool), pd.Series(False, index=values.index)
+    if pd.api.types.is_numeric_dtype(values):
+        return values.fillna(0).astype(bool), pd.Series(False, index=values.index)
+
+    text = values.astype(str).str.strip().str.lower()
+    is_true = text.isin(_TRUE_STRINGS) | values.isin([True])
+    is_false = text.isin(_FALSE_STRINGS) | values.isin([False]) | values.isna()
+    return is_true, ~(is_true | is_false)
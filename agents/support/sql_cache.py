@@ -0,0 +1,243 @@
+import hashlib
+import math
+import re
+import threading
+from collections import Counter, OrderedDict, defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from config import SQL_CACHE_MAX_ENTRIES, SQL_CACHE_SIMILARITY_THRESHOLD
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9_%]+")
+
+# Phrasings that mean the same thing in analytics questions
+_SYNONYMS = {
+    '%': 'rate',
+    'percent': 'rate',
+    'percentage': 'rate',
+    'ratio': 'rate',
+    'monthly': 'month',
+    'months': 'month',
+    'mom': 'month',
+    'weekly': 'week',
+    'daily': 'day',
+    'returns': 'rto',
+    'returned': 'rto',
+    'return': 'rto',
+    'avg': 'average',
+    'mean': 'average',
+    'couriers': 'courier',
+    'zones': 'zone',
+    'tiers': 'tier',
+    'shipments': 'shipment'
+}
+
+_STOPWORDS = {
+    'a', 'an', 'the', 'of', 'for', 'by', 'in', 'on', 'per', 'over', 'to',
+    'me', 'our', 'my', 'we', 'is', 'are', 'was', 'what', 'whats', 'show',
+    'give', 'get', 'tell', 'please', 'can', 'you', 'list', 'display', 'and',
+    'with', 'how', 'much', 'many', 'all'
+}
+
+_LITERAL_PATTERN = re.compile(r"\d+(?:[-/.:]\d+)*")
+
+_NUMBER_WORDS = {
+    'one': '1', 'two': '2', 'three': '3', 'four': '4', 'five': '5', 'six': '6',
+    'seven': '7', 'eight': '8', 'nine': '9', 'ten': '10', 'eleven': '11', 'twelve': '12'
+}
+
+# Words whose object gives a term its role, as in "from mumbai to delhi"
+_ROLE_WORDS = {'from', 'to', 'vs', 'versus', 'than', 'between', 'except', 'excluding', 'not'}
+
+def normalize_question(question: str) -> str:
+    """Reduce a question to a canonical token string, keeping word order"""
+    tokens = []
+    for token in _TOKEN_PATTERN.findall(question.lower().replace('%', ' % ')):
+        token = _SYNONYMS.get(token, _NUMBER_WORDS.get(token, token))
+        if token not in _STOPWORDS:
+            tokens.append(token)
+    return " ".join(tokens)
+
+def question_literals(question: str) -> Tuple[Tuple[str, ...], Tuple[Tuple[str, str], ...]]:
+    """Numbers and dates, and the terms that role words point at, in order.
+
+    Two questions only share SQL when these agree, whatever their wording:
+    "last 3 months" is not "last 6 months", nor "to delhi" "from delhi".
+    """
+    text = question.lower()
+    for word, digits in _NUMBER_WORDS.items():
+        text = re.sub(rf"\b{word}\b", digits, text)
+    numbers = tuple(_LITERAL_PATTERN.findall(text))
+    words = [_SYNONYMS.get(w, w) for w in _TOKEN_PATTERN.findall(text)]
+    roles = tuple((word, following) for word, following in zip(words, words[1:]) if word in _ROLE_WORDS)
+    return numbers, roles
+
+def _normalize_terms(terms: Iterable[str]) -> Tuple[str, ...]:
+    return tuple(sorted({re.sub(r"[\s_]+", "_", str(t).strip().lower()) for t in terms or []}))
+
+def _ngrams(text: str, n: int = 3) -> Counter:
+    grams = Counter(text.split())
+    padded = f" {text} "
+    grams.update(padded[i:i + n] for i in range(len(padded) - n + 1))
+    return grams
+
+def _norm(vector: Counter) -> float:
+    return math.sqrt(sum(v * v for v in vector.values()))
+
+class NL2SQLCache:
+    """Maps analytics questions to previously generated SQL.
+
+    Lookups first try an exact match on the normalized question and then an
+    approximate match over a word + character-trigram index. That match is
+    restricted to entries with the same extracted metrics, entities, numbers
+    and dates, role terms (question_literals) and content words: questions
+    may differ in word order, stopwords and synonyms, never in a courier,
+    region or sort order.
+    """
+
+    def __init__(self,
+                 max_entries: int = SQL_CACHE_MAX_ENTRIES,
+                 similarity_threshold: float = SQL_CACHE_SIMILARITY_THRESHOLD):
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+
+        self._entries = OrderedDict()  # exact key -> entry dict
+        self._index = defaultdict(set)  # n-gram -> exact keys
+        self._schema_fingerprint = None
+        self._lock = threading.Lock()
+        self._stats = {
+            'exact_hits': 0,
+            'approximate_hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'invalidations': 0
+        }
+
+    def set_schema(self, schema: str) -> None:
+        """Invalidation hook: drop all SQL generated against a different schema"""
+        fingerprint = hashlib.sha256(schema.encode("utf-8")).hexdigest()
+        with self._lock:
+            if fingerprint != self._schema_fingerprint:
+                if self._entries:
+                    self._stats['invalidations'] += 1
+                self._clear()
+                self._schema_fingerprint = fingerprint
+
+    def invalidate(self) -> None:
+        """Drop every cached question"""
+        with self._lock:
+            self._stats['invalidations'] += 1
+            self._clear()
+
+    def lookup(self,
+               question: str,
+               metrics: List[str] = None,
+               entities: List[str] = None) -> Optional[str]:
+        """Return cached SQL for the question, or None on a miss"""
+        normalized = normalize_question(question)
+        signature = (_normalize_terms(metrics), _normalize_terms(entities), question_literals(question))
+        key = self._key(normalized, signature)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._stats['exact_hits'] += 1
+                return entry['sql']
+
+            match = self._nearest(normalized, signature)
+            if match is not None:
+                self._entries.move_to_end(match)
+                self._stats['approximate_hits'] += 1
+                return self._entries[match]['sql']
+
+            self._stats['misses'] += 1
+            return None
+
+    def store(self,
+              question: str,
+              sql: str,
+              metrics: List[str] = None,
+              entities: List[str] = None) -> None:
+        """Remember the SQL generated for a question"""
+        normalized = normalize_question(question)
+        signature = (_normalize_terms(metrics), _normalize_terms(entities), question_literals(question))
+        key = self._key(normalized, signature)
+        vector = _ngrams(normalized)
+
+        with self._lock:
+            if key in self._entries:
+                self._unindex(key)
+            self._entries[key] = {
+                'sql': sql,
+                'signature': signature,
+                'terms': frozenset(normalized.split()),
+                'vector': vector,
+                'norm': _norm(vector)
+            }
+            self._entries.move_to_end(key)
+            for gram in vector:
+                self._index[gram].add(key)
+
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._unindex(oldest)
+                del self._entries[oldest]
+                self._stats['evictions'] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+        lookups = stats['exact_hits'] + stats['approximate_hits'] + stats['misses']
+        stats['hit_rate'] = round((lookups - stats['misses']) / lookups, 4) if lookups else 0.0
+        return stats
+
+    def _key(self, normalized: str, signature: Tuple) -> str:
+        return f"{self._schema_fingerprint}|{signature}|{normalized}"
+
+    def _nearest(self, normalized: str, signature: Tuple) -> Optional[str]:
+        """Best index match above the similarity threshold (lock held)"""
+        vector = _ngrams(normalized)
+        norm = _norm(vector)
+        if not norm:
+            return None
+
+        candidates = set()
+        for gram in vector:
+            candidates.update(self._index.get(gram, ()))
+
+        terms = frozenset(normalized.split())
+        best_key, best_score = None, self.similarity_threshold
+        for key in candidates:
+            entry = self._entries[key]
+            if entry['signature'] != signature or entry['terms'] != terms:
+                continue
+            dot = sum(count * entry['vector'].get(gram, 0) for gram, count in vector.items())
+            score = dot / (norm * entry['norm'])
+            if score >= best_score:
+                best_key, best_score = key, score
+        return best_key
+
+    def _unindex(self, key: str) -> None:
+        for gram in self._entries[key]['vector']:
+            keys = self._index.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._index[gram]
+
+    def _clear(self) -> None:
+        self._entries.clear()
+        self._index.clear()
+
+_cache: Optional[NL2SQLCache] = None
+_cache_lock = threading.Lock()
+
+def get_sql_cache() -> NL2SQLCache:
+    """Get the process-wide NL-to-SQL cache, creating it on first use"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = NL2SQLCache()
+    return _cache
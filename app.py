@@ -1,9 +1,16 @@
+import itertools
+import uuid
+from collections import deque
 import streamlit as st
 import pandas as pd
-from config import PAGE_TITLE, PAGE_ICON, AGENT_TYPES
-from database.connector import init_db
-from agents.orchestrator import OrchestratorAgent
+from config import PAGE_TITLE, PAGE_ICON, AGENT_TYPES, RENDER_RECENT_TURNS, TTFT_HISTORY_SIZE
+from database.connector import init_db, CancellationToken
+from database.result_store import ResultRef, ResultExpiredError, get_result_store
+from agents.orchestrator import OrchestratorAgent, warm_up
+from agents.support.context_manager import ContextManager
 from utils.query_classifier import QueryClassifier
+from utils.rendering import get_artifact_cache, visible_history
+from utils.tracing import get_tracer, traced
 
 # Page Configuration
 st.set_page_config(
@@ -12,31 +19,60 @@ st.set_page_config(
     layout="wide"
 )
 
-def display_query_and_results(sql_query: str, df: pd.DataFrame):
-    """Display SQL query and results in a formatted way"""
+@traced("render_result", stage="render")
+def display_query_and_results(sql_query: str, result: ResultRef):
+    """Display SQL query and one page of results in a formatted way"""
     # Display SQL Query in an expander
     with st.expander("View SQL Query"):
         st.code(sql_query, language='sql')
+
+    # Only the visible page is fetched from the server-side result store
+    page = 0
+    if result.num_pages > 1:
+        page = st.number_input(
+            "Page", min_value=1, max_value=result.num_pages, value=1,
+            key=f"page_{result.result_id}"
+        ) - 1
+    try:
+        # Page frame, dtypes and chart data are prepared once per result page
+        artifact = get_artifact_cache().get(result, page)
+    except ResultExpiredError:
+        st.info("This result has expired; ask the question again to see it.")
+        return
+    df = artifact.frame
+    if result.num_pages > 1:
+        first_row = page * result.store.page_size
+        st.caption(f"Rows {first_row + 1:,}-{first_row + len(df):,} of {result.num_rows:,}")
     
     # Display results in a table with formatting
     st.dataframe(
-        df.style.format({
-            col: '{:.2f}' for col in df.select_dtypes(include=['float64']).columns
-        }),
+        df,
+        column_config={
+            col: st.column_config.NumberColumn(format="%.2f") for col in artifact.float_columns
+        },
         use_container_width=True,
         hide_index=True
     )
 
     # If the data might be interesting as a chart, offer visualization options
-    if len(df) > 0 and df.select_dtypes(include=['float64', 'int64']).columns.any():
+    if artifact.chart_kind:
         with st.expander("View Visualization"):
-            # Determine suitable visualization based on data
-            numeric_cols = df.select_dtypes(include=['float64', 'int64']).columns
-            if 'month' in df.columns.str.lower() and len(numeric_cols) > 0:
+            if artifact.chart_kind == 'line':
                 # Time series plot
-                st.line_chart(df.set_index('MONTH')[numeric_cols])
-            elif len(df) <= 10:  # For small datasets
-                st.bar_chart(df.set_index(df.columns[0])[numeric_cols])
+                st.line_chart(artifact.chart_data)
+            else:
+                st.bar_chart(artifact.chart_data)
+
+@st.cache_resource
+def get_orchestrator() -> OrchestratorAgent:
+    """Build the workflow graph and agents once per process"""
+    warm_up()
+    return OrchestratorAgent()
+
+@st.cache_resource
+def init_database() -> bool:
+    """Verify warehouse connectivity once per process"""
+    return init_db()
 
 def init_session_state():
     """Initialize session state variables"""
@@ -44,6 +80,20 @@ def init_session_state():
         st.session_state.conversation_history = []
     if 'current_agent' not in st.session_state:
         st.session_state.current_agent = None
+    if 'ttft_history' not in st.session_state:
+        st.session_state.ttft_history = deque(maxlen=TTFT_HISTORY_SIZE)
+    if 'cancel_token' not in st.session_state:
+        st.session_state.cancel_token = CancellationToken()
+    if 'session_id' not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+    if 'visible_turns' not in st.session_state:
+        st.session_state.visible_turns = RENDER_RECENT_TURNS
+
+def new_cancel_token() -> CancellationToken:
+    """Cancel whatever this session still has running and start afresh"""
+    st.session_state.cancel_token.cancel()
+    st.session_state.cancel_token = CancellationToken()
+    return st.session_state.cancel_token
 
 def display_metrics_dashboard():
     """Display key metrics in the sidebar"""
@@ -56,10 +106,28 @@ def display_metrics_dashboard():
             if st.session_state.current_agent:
                 st.metric("Active Agent", st.session_state.current_agent)
 
+        ttft_history = st.session_state.ttft_history
+        if ttft_history:
+            col1, col2 = st.columns(2)
+            with col1:
+                st.metric("Last TTFT", f"{ttft_history[-1]:.2f}s")
+            with col2:
+                st.metric("Avg TTFT", f"{sum(ttft_history) / len(ttft_history):.2f}s")
+
+        # Recent latency of each stage across all sessions of this process
+        stages = get_tracer().stage_percentiles()
+        if stages:
+            st.caption("Latency by stage (ms)")
+            st.dataframe(
+                pd.DataFrame.from_dict(stages, orient='index')[['count', 'p50', 'p95', 'p99']].round(1),
+                use_container_width=True
+            )
+
 def main():
     # Initialize
     init_session_state()
-    init_db()
+    init_database()
+    orchestrator = get_orchestrator()
 
     # Page Header with styling
     st.title(f"{PAGE_ICON} {PAGE_TITLE}")
@@ -72,8 +140,15 @@ def main():
         
         # Clear conversation button
         if st.button("Clear Conversation", type="primary"):
+            new_cancel_token()
+            get_result_store().delete(
+                m["result"].result_id for m in st.session_state.conversation_history if "result" in m
+            )
+            ContextManager(st.session_state.session_id).clear_context()
             st.session_state.conversation_history = []
             st.session_state.current_agent = None
+            st.session_state.ttft_history = deque(maxlen=TTFT_HISTORY_SIZE)
+            st.session_state.visible_turns = RENDER_RECENT_TURNS
             st.rerun()
         
         # Help section
@@ -88,16 +163,22 @@ def main():
     # Main Chat Interface
     st.subheader("Chat Interface")
     
-    # Display conversation history
-    for message in st.session_state.conversation_history:
-        with st.chat_message(message["role"]):
-            st.write(message["content"])
-            # If message contains SQL and results, display them
-            if "sql_query" in message and "results" in message:
-                display_query_and_results(
-                    message["sql_query"],
-                    pd.DataFrame(message["results"])
-                )
+    # Display the most recent turns; older ones are only drawn on request
+    hidden, messages = visible_history(
+        st.session_state.conversation_history, st.session_state.visible_turns
+    )
+    if hidden:
+        if st.button(f"Show earlier messages ({hidden} hidden)"):
+            st.session_state.visible_turns += RENDER_RECENT_TURNS
+            st.rerun()
+
+    with get_tracer().span("render_history", "render", messages=len(messages)):
+        for message in messages:
+            with st.chat_message(message["role"]):
+                st.write(message["content"])
+                # If message contains SQL and results, display them
+                if "sql_query" in message and "result" in message:
+                    display_query_and_results(message["sql_query"], message["result"])
 
     # Chat input
     if prompt := st.chat_input("Ask about your shipments..."):
@@ -113,36 +194,44 @@ def main():
 
         # Get response
         with st.chat_message("assistant"):
-            with st.spinner("Processing your query..."):
-                try:
-                    orchestrator = OrchestratorAgent()
-                    response, sql_query, results = orchestrator.process_query(prompt)
-                    
-                    # Add assistant response to history
-                    message = {
-                        "role": "assistant",
-                        "content": response
-                    }
+            try:
+                stream = orchestrator.stream_query(
+                    prompt, new_cancel_token(), st.session_state.session_id
+                )
+                tokens = iter(stream)
+                with st.spinner("Processing your query..."):
+                    first_token = next(tokens, "")
+
+                # Render tokens as they arrive
+                st.write_stream(itertools.chain([first_token], tokens))
+                sql_query, results = stream.sql_query, stream.results
+
+                if stream.time_to_first_token is not None:
+                    st.session_state.ttft_history.append(stream.time_to_first_token)
+                
+                # Add assistant response to history
+                message = {
+                    "role": "assistant",
+                    "content": stream.text
+                }
+                
+                # If we have SQL and results, keep a reference to the stored result
+                if sql_query and results is not None:
+                    message["sql_query"] = sql_query
+                    message["result"] = results
                     
-                    # If we have SQL and results, add them
-                    if sql_query and results is not None:
-                        message["sql_query"] = sql_query
-                        message["results"] = results
-                        
-                    st.session_state.conversation_history.append(message)
+                st.session_state.conversation_history.append(message)
+                
+                if sql_query and results is not None:
+                    display_query_and_results(sql_query, results)
                     
-                    # Display response
-                    st.write(response)
-                    if sql_query and results is not None:
-                        display_query_and_results(sql_query, pd.DataFrame(results))
-                        
-                except Exception as e:
-                    error_msg = f"Error processing query: {str(e)}"
-                    st.error(error_msg)
-                    st.session_state.conversation_history.append({
-                        "role": "assistant",
-                        "content": error_msg
-                    })
+            except Exception as e:
+                error_msg = f"Error processing query: {str(e)}"
+                st.error(error_msg)
+                st.session_state.conversation_history.append({
+                    "role": "assistant",
+                    "content": error_msg
+                })
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
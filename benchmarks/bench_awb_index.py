@@ -0,0 +1,122 @@
+"""AWB tracking lookups from the local index against the warehouse.
+
+A DuckDB file of synthetic shipments stands in for Snowflake. It is mirrored
+by IncrementalSync, which builds the AwbIndex; then random AWBs are looked up
+one at a time and in batches from the index, through DeliveryAgent (index,
+then warehouse on a miss) and straight from the stand-in. After changes to
+the source and another sync, the index must return the changed rows.
+Reports latency percentiles, build and delta times, the index size and how
+much of it lookups made resident.
+
+Run from the repository root:
+    python -m benchmarks.bench_awb_index --rows 10000000 --lookups 20000
+"""
+import argparse
+import os
+import random
+import resource
+import shutil
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+WORKDIR = os.path.join(tempfile.gettempdir(), "bench_awb_index")
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("TRACE_ENABLED", "false")  # one JSONL line per lookup would dominate
+
+from config import TABLE_NAME
+from database.awb_index import AwbIndex, INDEX_COLUMNS
+from database.backends import ParquetMirror
+from database.connector import configure_pool, run_query
+from database.sync import IncrementalSync
+from benchmarks.bench_sync import change_source, settle
+from benchmarks.warehouse import build_warehouse, connector
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def timings(fn, items) -> dict:
+    values = []
+    for item in items:
+        started = time.perf_counter()
+        fn(item)
+        values.append((time.perf_counter() - started) * 1000)
+    p50, p99 = np.percentile(values, [50, 99])
+    return {'p50_ms': p50, 'p99_ms': p99}
+
+def report(label: str, result: dict) -> None:
+    print(f"{label:34s} p50 {result['p50_ms']:8.3f} ms   p99 {result['p99_ms']:8.3f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--lookups", type=int, default=20_000)
+    parser.add_argument("--warehouse-lookups", type=int, default=200, help="the stand-in is much slower")
+    parser.add_argument("--batch", type=int, default=20, help="AWBs per bulk lookup")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    os.makedirs(WORKDIR, exist_ok=True)
+    pristine = os.path.join(WORKDIR, f"warehouse_{args.rows}.duckdb")
+    build_warehouse(pristine, args.rows).close()
+    source_path = os.path.join(WORKDIR, "source.duckdb")
+    shutil.copy(pristine, source_path)
+    if os.path.exists(source_path + ".wal"):
+        os.remove(source_path + ".wal")
+    import duckdb
+    db = duckdb.connect(source_path)
+    settle(db, pd.Timestamp.now().floor('s'))
+    configure_pool(connector(db))
+
+    for name in ("mirror", "index"):
+        shutil.rmtree(os.path.join(WORKDIR, name), ignore_errors=True)
+    index = AwbIndex(os.path.join(WORKDIR, "index"))
+    sync = IncrementalSync(ParquetMirror(os.path.join(WORKDIR, "mirror")), overlap_seconds=60, index=index)
+    started = time.perf_counter()
+    sync.run()
+    stats = index.stats()
+    print(f"mirror and index of {stats['rows']:,} AWBs in {time.perf_counter() - started:.1f} s; "
+          f"index {stats['bytes'] / 1024 ** 2:,.0f} MB on disk ({stats['bytes'] / max(stats['rows'], 1):.0f} bytes per AWB)")
+
+    def awb() -> str:
+        return f"AWB{rng.randrange(args.rows):08d}"
+
+    rss_before = peak_rss_mb()
+    report("index, one AWB", timings(index.get, [awb() for _ in range(args.lookups)]))
+    report("index, unknown AWB", timings(index.get, [f"AWB9{rng.randrange(10 ** 7):07d}" for _ in range(args.lookups)]))
+    report(f"index, {args.batch} AWBs", timings(index.get_many, [[awb() for _ in range(args.batch)]
+                                                                for _ in range(args.lookups // args.batch)]))
+    print(f"peak RSS grew {peak_rss_mb() - rss_before:,.0f} MB over the lookups")
+
+    query = f"SELECT AWB_CODE, {', '.join(INDEX_COLUMNS)} FROM {TABLE_NAME} WHERE AWB_CODE = ?"
+    report("stand-in warehouse, one AWB", timings(lambda a: run_query(query, [a]).frame,
+                                                  [awb() for _ in range(args.warehouse_lookups)]))
+
+    from agents.business.delivery_agent import DeliveryAgent
+    from database.tracking_cache import TrackingCache
+    agent = DeliveryAgent()
+    agent.awb_index = index
+    agent.tracking_cache = TrackingCache()
+    report("DeliveryAgent, index", timings(agent._get_tracking_info, [awb() for _ in range(args.warehouse_lookups)]))
+    agent.awb_index = AwbIndex(os.path.join(WORKDIR, "no_index"))
+    report("DeliveryAgent, warehouse", timings(agent._get_tracking_info, [awb() for _ in range(args.warehouse_lookups)]))
+
+    # Changes reach the index as a delta segment with the next sync
+    change_source(db, args.rows, 0.001, 10_000, seed=args.rows)
+    started = time.perf_counter()
+    result = sync.run()
+    print(f"\nsync of {result['rows']:,} changed rows, index delta included: {time.perf_counter() - started:.2f} s; "
+          f"{index.stats()['segments']} segments")
+    changed = db.execute(f"""
+        SELECT AWB_CODE, SHIPMENT_STATUS, AWB_DELIVERED_DATE FROM {TABLE_NAME}
+        WHERE AWB_DELIVERED_DATE >= TIMESTAMP '{pd.Timestamp.now() - pd.Timedelta(minutes=5)}'
+    """).df()
+    rows = index.get_many(changed['AWB_CODE'].tolist())
+    stale = sum(rows.get(awb, {}).get('AWB_DELIVERED_DATE') != delivered
+                for awb, delivered in zip(changed['AWB_CODE'], changed['AWB_DELIVERED_DATE']))
+    print(f"changed AWBs current in the index: {len(changed) - stale:,} of {len(changed):,}")
+
+if __name__ == "__main__":
+    main()
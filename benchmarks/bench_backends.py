@@ -0,0 +1,91 @@
+"""Analytics on the local Parquet mirror via the duckdb backend.
+
+A DuckDB file of synthetic shipments stands in for Snowflake. The latest
+months are mirrored into Parquet with ParquetMirror.export, then the canned
+analytics SQL of the fake LLM and the metric aggregates run on the duckdb
+backend. Reports mirror throughput, latency per query, the cost of SQL
+translation, and that every query returns the same rows as the source.
+The stand-in is itself in-process, so its column is a floor, not what a
+Snowflake round trip costs.
+
+Run from the repository root:
+    python -m benchmarks.bench_backends --rows 5000000 --months 3
+"""
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+import pandas as pd
+from database.backends import DuckDBBackend, ParquetMirror, transpile
+from database.connector import ConnectionPool, configure_pool, run_query
+from utils.metrics import MetricsCalculator
+from benchmarks.fake_llm import CANNED_SQL
+from benchmarks.warehouse import build_warehouse, connector
+
+def timed(fn, repeat: int) -> tuple:
+    timings, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), result
+
+def same_rows(a: pd.DataFrame, b: pd.DataFrame) -> bool:
+    if a.shape != b.shape:
+        return False
+    a = a.sort_values(list(a.columns)).reset_index(drop=True)
+    b = b.sort_values(list(b.columns)).reset_index(drop=True)
+    try:
+        pd.testing.assert_frame_equal(a, b, check_dtype=False, check_exact=False)
+        return True
+    except AssertionError:
+        return False
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--months", type=int, default=3, help="months mirrored")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--warehouse", default=None, help="DuckDB file standing in for Snowflake")
+    args = parser.parse_args()
+
+    workdir = os.path.join(tempfile.gettempdir(), "bench_backends")
+    os.makedirs(workdir, exist_ok=True)
+    source = build_warehouse(args.warehouse or os.path.join(workdir, f"warehouse_{args.rows}.duckdb"), args.rows)
+    configure_pool(connector(source))
+
+    mirror_path = os.path.join(workdir, "mirror")
+    shutil.rmtree(mirror_path, ignore_errors=True)
+    export = ParquetMirror(mirror_path).export(args.months)
+    stats = ParquetMirror(mirror_path).stats()
+    print(f"mirror: {export['rows']:,} rows in {len(export['months'])} months, {export['seconds']:.1f} s "
+          f"({export['rows_per_second']:,} rows/s), {stats['bytes'] / 1024 ** 2:,.0f} MB Parquet")
+
+    local = ConnectionPool(DuckDBBackend(mirror_path).connect)
+    first_month = pd.Period(export['months'][0]).start_time
+    # Only the mirrored months can agree with the source
+    mirrored = f"(SELECT * FROM VIEW_TITANIUM_PLATINUM_REPORT WHERE ASSIGNED_DATE_TIME >= '{first_month}')"
+    queries = {name: (sql.replace("FROM VIEW_TITANIUM_PLATINUM_REPORT", f"FROM {mirrored}", 1), None)
+               for name, sql in CANNED_SQL.items() if name != 'export'}
+    calculator = MetricsCalculator(use_rollup=False)
+    for name, group_by in (('metrics', []), ('metrics by zone', ['ZONE']), ('metrics by month', ['MONTH'])):
+        queries[name] = calculator.build_query(['rto_rate', 'ndr_rate', 'fasr', 'avg_tat_hours'],
+                                               {'start_date': first_month}, group_by)
+
+    translate_ms = []
+    print(f"\n{'query':18s} {'local ms':>9s} {'stand-in ms':>12s}  same rows")
+    for name, (sql, params) in queries.items():
+        transpile.cache_clear()
+        started = time.perf_counter()
+        transpile(sql, 'duckdb')
+        translate_ms.append((time.perf_counter() - started) * 1000)
+
+        local_ms, local_frame = timed(lambda: run_query(sql, params, pool=local).frame, args.repeat)
+        source_ms, source_frame = timed(lambda: run_query(sql, params).frame, args.repeat)
+        print(f"{name:18s} {local_ms:9.1f} {source_ms:12.1f}  {same_rows(local_frame, source_frame)}")
+    print(f"\nSQL translation: {statistics.median(translate_ms):.2f} ms per new statement (memoized after)")
+
+if __name__ == "__main__":
+    main()
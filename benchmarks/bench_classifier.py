@@ -0,0 +1,143 @@
+"""Query classification latency: substring scans vs the precompiled rule engine.
+
+Run from the repository root:
+    python -m benchmarks.bench_classifier --iterations 2000
+"""
+import argparse
+import os
+import re
+import statistics
+import time
+
+# The legacy classifier constructs an LLM client it never calls
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("AGENT_MODEL", "gpt-3.5-turbo")
+
+from langchain_openai import ChatOpenAI
+from config import AGENT_MODEL, TEMPERATURE
+from utils.query_classifier import QueryClassifier
+
+# Questions as they show up in the chat, including the app's examples
+CORPUS = [
+    "Where is AWB00000004?",
+    "Show RTO rate month over month",
+    "What's our delivery success rate?",
+    "track AWB12345678 and AWB87654321",
+    "status of awb00451234",
+    "what is the NDR rate for zone a this week",
+    "Compare FASR across couriers for tier 1 cities",
+    "average delivery time for metro shipments",
+    "Give me the RTO % for COD orders in zone_b",
+    "breakdown of returned shipments by courier",
+    "how many shipments were not delivered yesterday",
+    "total prepaid orders in tier 3",
+    "order status for my package",
+    "where's my shipment",
+    "I want a refund for my last order",
+    "can you help me cancel my order",
+    "hello",
+    "thanks, that's all",
+    "first attempt delivery performance for Zone C",
+    "turnaround time trend for Express mode",
+    "distribution of shipments by city tier",
+    "Which courier has the lowest non delivery rate?",
+    "shipment status AWB00000123",
+    "count of NDR shipments in zone e2",
+    "Why was my package returned?",
+    "weekly tat for zone d surface shipments",
+    "please update the delivery address",
+    "any delays in Mumbai today?",
+    "performance of Delhivery vs Bluedart",
+    "fasr for tier 2 prepaid orders last month",
+]
+
+class LegacyQueryClassifier:
+    """The classifier as it was: substring scans and per-call regex compilation"""
+
+    def __init__(self):
+        self.model = ChatOpenAI(model_name=AGENT_MODEL, temperature=TEMPERATURE)
+        self.patterns = {
+            'analytical': [
+                'rate', 'trend', 'analysis', 'compare', 'performance',
+                'distribution', 'breakdown', 'month', 'percentage',
+                'average', 'avg', 'total', 'count', 'rto', 'ndr', 'fasr'
+            ],
+            'tracking': [
+                'track', 'where', 'status', 'awb', 'delivery status',
+                'shipment status', 'order status'
+            ],
+            'metric_terms': {
+                'rto': ['rto', 'return', 'returned'],
+                'ndr': ['ndr', 'non delivery', 'not delivered'],
+                'fasr': ['fasr', 'first attempt', 'success rate'],
+                'tat': ['tat', 'turnaround', 'delivery time']
+            }
+        }
+
+    def classify(self, query: str) -> dict:
+        query_lower = query.lower()
+        metrics = [m for m, terms in self.patterns['metric_terms'].items()
+                   if any(term in query_lower for term in terms)]
+        tracking_numbers = re.findall(r'AWB\d{8}', query, re.IGNORECASE)
+
+        if any(term in query_lower for term in self.patterns['analytical']):
+            entities = re.findall(r'zone[_\s]?[a-e]2?', query_lower, re.IGNORECASE)
+            entities += re.findall(r'tier[_\s]?[123]|metro', query_lower, re.IGNORECASE)
+            if 'cod' in query_lower:
+                entities.append('COD')
+            if 'prepaid' in query_lower:
+                entities.append('PREPAID')
+            return {"primary_agent": "operations", "metrics": metrics, "entities": entities}
+        if tracking_numbers or any(term in query_lower for term in self.patterns['tracking']):
+            return {"primary_agent": "delivery", "metrics": metrics, "entities": tracking_numbers}
+        return {"primary_agent": "customer", "metrics": metrics, "entities": []}
+
+def summarize(timings: list) -> dict:
+    timings = sorted(timings)
+    return {
+        "median_us": round(statistics.median(timings), 2),
+        "p95_us": round(timings[int(len(timings) * 0.95) - 1], 2),
+        "max_us": round(timings[-1], 2)
+    }
+
+def measure(classify, iterations: int) -> dict:
+    timings = []
+    for i in range(iterations):
+        query = CORPUS[i % len(CORPUS)]
+        started = time.perf_counter()
+        classify(query)
+        timings.append((time.perf_counter() - started) * 1e6)
+    return summarize(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    legacy = LegacyQueryClassifier()
+    compiled = QueryClassifier(llm_fallback=False)
+
+    for query in CORPUS:
+        before, after = legacy.classify(query), compiled.classify_rules(query)
+        for key in ("primary_agent", "metrics", "entities"):
+            assert before[key] == after[key], (query, key, before[key], after[key])
+    print(f"routing identical on {len(CORPUS)} queries")
+
+    fallback = [q for q in CORPUS if compiled.classify_rules(q)["confidence_score"] < compiled.confidence_threshold]
+    print(f"LLM fallback needed for {len(fallback)}/{len(CORPUS)}: {fallback}")
+
+    for name, factory in [("legacy construction", LegacyQueryClassifier),
+                          ("compiled construction", QueryClassifier)]:
+        timings = []
+        for _ in range(20):
+            started = time.perf_counter()
+            factory()
+            timings.append((time.perf_counter() - started) * 1e6)
+        print(f"{name}: {summarize(timings)}")
+
+    for name, classify in [("legacy classify", legacy.classify),
+                           ("compiled classify", compiled.classify_rules)]:
+        print(f"{name}: {measure(classify, args.iterations)}")
+
+if __name__ == "__main__":
+    main()
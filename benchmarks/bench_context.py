@@ -0,0 +1,79 @@
+"""Conversation context: unbounded per-session history vs the bounded ContextManager.
+
+Simulates many sessions each running many turns and reports the memory held
+by the context (tracemalloc) and the cost of building the context for a query.
+Updates are timed with tracemalloc running, which inflates them several times.
+
+Run from the repository root:
+    python -m benchmarks.bench_context --sessions 2000 --turns 50
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from agents.support.context_manager import ContextManager, MemoryContextStore, SQLiteContextStore
+
+ANSWER = ("The RTO rate for the selected zone was 8.4% last month, down from 9.1%. "
+          "Most returns came from COD orders in Tier3 cities. ") * 4
+
+class LegacyContextManager:
+    """The previous ContextManager: every turn and entity kept forever"""
+
+    def __init__(self):
+        self.context = {'conversation_history': [], 'active_entities': set(),
+                        'current_metrics': {}, 'last_query_time': None}
+
+    def update_context(self, query, response, entities=None, metrics=None):
+        self.context['conversation_history'].append(
+            {'query': query, 'response': response, 'timestamp': datetime.now()})
+        if entities:
+            self.context['active_entities'].update(entities)
+        if metrics:
+            self.context['current_metrics'].update(metrics)
+        self.context['last_query_time'] = datetime.now()
+
+    def get_relevant_context(self, query):
+        return {'recent_history': self.context['conversation_history'][-3:],
+                'active_entities': list(self.context['active_entities']),
+                'current_metrics': self.context['current_metrics']}
+
+def run(name: str, make_manager, sessions: int, turns: int) -> None:
+    tracemalloc.start()
+    managers = [make_manager(f"session-{i}") for i in range(sessions)]
+    started = time.perf_counter()
+    for turn in range(turns):
+        for i, manager in enumerate(managers):
+            manager.update_context(f"What is the RTO rate for AWB{i:05d}{turn:03d} in zone z_{turn % 6}?",
+                                   ANSWER, [f"AWB{i:05d}{turn:03d}", f"z_{turn % 6}"], {f"rto_{turn}": 8.4})
+    update_seconds = time.perf_counter() - started
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    for manager in managers:
+        manager.get_relevant_context("And for last week?")
+    context_seconds = time.perf_counter() - started
+
+    print(f"{name:18s} memory {memory / 1024 ** 2:8.1f} MB | "
+          f"update {update_seconds / (sessions * turns) * 1e6:7.1f} us/turn | "
+          f"context {context_seconds / sessions * 1e6:7.1f} us/query")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--turns", type=int, default=50)
+    args = parser.parse_args()
+
+    memory_store = MemoryContextStore(max_sessions=args.sessions)
+    sqlite_store = SQLiteContextStore(os.path.join(tempfile.mkdtemp(prefix="bench_context_"), "context.db"))
+
+    run("legacy", lambda session_id: LegacyContextManager(), args.sessions, args.turns)
+    run("bounded (memory)", lambda session_id: ContextManager(session_id, store=memory_store),
+        args.sessions, args.turns)
+    run("bounded (sqlite)", lambda session_id: ContextManager(session_id, store=sqlite_store),
+        args.sessions, args.turns)
+
+if __name__ == "__main__":
+    main()
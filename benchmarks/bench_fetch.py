@@ -0,0 +1,103 @@
+"""Result fetching: pd.read_sql_query over DBAPI tuples vs Arrow batches.
+
+Each path runs in a fresh process against an in-process DuckDB stand-in for
+the warehouse, so peak RSS reflects that path alone.
+
+Run from the repository root:
+    python -m benchmarks.bench_fetch --rows 500000
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+import warnings
+
+PATHS = ["read_sql_query", "run_query", "iter_query_batches"]
+
+# A courier-level export of the shipment view
+EXPORT_SQL = "SELECT * FROM VIEW_TITANIUM_PLATINUM_REPORT"
+
+def create_warehouse(num_rows: int):
+    """DuckDB table generated in SQL, so no client-side copy inflates the baseline"""
+    import duckdb
+
+    db = duckdb.connect()
+    db.execute(f"""
+        CREATE TABLE VIEW_TITANIUM_PLATINUM_REPORT AS
+        SELECT
+            'AWB' || lpad(CAST(i AS VARCHAR), 8, '0') AS AWB_CODE,
+            ['z_a', 'z_b', 'z_c', 'z_d', 'z_e', 'z_e2'][1 + i % 6] AS ZONE,
+            ['Tier1', 'Tier2', 'Tier3', 'Metro'][1 + i % 4] AS CITY_TIER,
+            ['Delhivery', 'Bluedart', 'Ekart', 'XpressBees', 'Shadowfax'][1 + i % 5] AS PARENT_COURIER,
+            ['DELIVERED', 'IN TRANSIT', 'RTO DELIVERED', 'OUT FOR DELIVERY'][1 + i % 4] AS SHIPMENT_STATUS,
+            TIMESTAMP '2024-01-01' + INTERVAL (i % 15552000) SECOND AS ASSIGNED_DATE_TIME,
+            TIMESTAMP '2024-01-04' + INTERVAL (i % 15552000) SECOND AS AWB_DELIVERED_DATE,
+            CAST(i % 7 = 0 AS INTEGER) AS RTO_SHIPMENTS,
+            CAST(i % 5 = 0 AS INTEGER) AS NDR_RAISED_SHIPMENTS,
+            1 + i % 3 AS NO_OF_ATTEMPTS,
+            CAST(0.5 + (i % 40) * 0.25 AS DOUBLE) AS CHARGED_WEIGHT
+        FROM range({num_rows}) t(i)
+    """)
+    return db
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def run_path(path: str, num_rows: int) -> dict:
+    import pandas as pd
+    from database.connector import configure_pool, run_query, iter_query_batches
+
+    db = create_warehouse(num_rows)
+    configure_pool(db.cursor)
+    baseline = peak_rss_mb()
+
+    started = time.perf_counter()
+    if path == "read_sql_query":
+        conn = db.cursor()
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")  # pandas warns about non-SQLAlchemy connections
+            frame = pd.read_sql_query(EXPORT_SQL, conn)
+        rows = len(frame)
+    elif path == "run_query":
+        frame = run_query(EXPORT_SQL, timeout=None, max_rows=None, max_bytes=None).frame
+        rows = len(frame)
+    else:
+        # Streaming consumer: per-courier totals without holding the full result
+        rows, totals = 0, None
+        for batch in iter_query_batches(EXPORT_SQL, timeout=None):
+            rows += len(batch)
+            counts = batch.groupby("PARENT_COURIER")["RTO_SHIPMENTS"].sum()
+            totals = counts if totals is None else totals.add(counts, fill_value=0)
+    seconds = time.perf_counter() - started
+
+    return {
+        "path": path,
+        "rows": rows,
+        "seconds": round(seconds, 3),
+        "rows_per_second": int(rows / seconds),
+        "peak_rss_delta_mb": round(peak_rss_mb() - baseline, 1)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--path", choices=PATHS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.path:
+        print(json.dumps(run_path(args.path, args.rows)))
+        return
+
+    for path in PATHS:
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_fetch", "--rows", str(args.rows), "--path", path],
+            capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{path:20s} {result['seconds']:7.3f} s | {result['rows_per_second']:>10,} rows/s | "
+              f"peak RSS +{result['peak_rss_delta_mb']:.1f} MB | {result['rows']:,} rows")
+
+if __name__ == "__main__":
+    main()
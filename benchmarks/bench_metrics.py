@@ -0,0 +1,58 @@
+"""Metrics engine: warehouse pushdown vs local vectorized mode on synthetic data.
+
+The pushdown path runs against an in-process DuckDB stand-in for the
+warehouse, so both paths can be timed side by side; tests/test_metrics.py
+checks that they return identical results.
+
+Run from the repository root:
+    python -m benchmarks.bench_metrics --rows 2000000
+"""
+import argparse
+import time
+from database.connector import configure_pool
+from utils.metrics import MetricsCalculator
+from benchmarks.synthetic import generate_shipments
+
+SCENARIOS = [
+    ("rto by month", ['rto_rate'], None, ['MONTH']),
+    ("ndr by zone x tier", ['ndr_rate', 'ndr_resolution_rate', 'avg_attempts_after_ndr'], None, ['ZONE', 'CITY_TIER']),
+    ("fasr by courier, zone_a COD", ['fasr'], {'ZONE': 'z_a', 'MODE_OF_SHIPMENT': 'COD'}, ['PARENT_COURIER']),
+    ("tat + sla by day, one month", ['avg_tat_hours', 'sla_compliance', 'delivery_rate'],
+     {'start_date': '2024-03-01', 'end_date': '2024-03-31'}, ['DAY']),
+    ("all metrics, overall", ['rto_rate', 'ndr_rate', 'fasr', 'delivery_rate', 'avg_tat_hours', 'sla_compliance'], None, None)
+]
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - started) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    args = parser.parse_args()
+
+    frame, ms = timed(lambda: generate_shipments(args.rows))
+    print(f"generated {len(frame):,} rows in {ms:.0f} ms")
+
+    local = MetricsCalculator(frame=frame)
+    pushdown = None
+    try:
+        import duckdb
+        db = duckdb.connect()
+        db.execute("CREATE TABLE VIEW_TITANIUM_PLATINUM_REPORT AS SELECT * FROM frame")
+        configure_pool(db.cursor)
+        pushdown = MetricsCalculator()
+    except ImportError:
+        print("duckdb not installed; timing the local path only")
+
+    for name, metrics, filters, group_by in SCENARIOS:
+        local_result, local_ms = timed(lambda: local.compute(metrics, filters, group_by))
+        line = f"{name:32s} local {local_ms:8.1f} ms"
+        if pushdown is not None:
+            _, pushed_ms = timed(lambda: pushdown.compute(metrics, filters, group_by))
+            line += f" | pushdown {pushed_ms:8.1f} ms"
+        print(f"{line} | {len(local_result)} rows")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Per-message setup overhead: rebuilding the orchestrator vs the shared registry.
+
+Run from the repository root:
+    python -m benchmarks.bench_orchestrator_setup --iterations 50
+"""
+import argparse
+import os
+import statistics
+import time
+
+# LLM clients are constructed but never called
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("AGENT_MODEL", "gpt-3.5-turbo")
+
+from agents.orchestrator import (
+    OrchestratorAgent,
+    create_graph,
+    get_business_agent,
+    _create_business_agent,
+    warm_up
+)
+from benchmarks.bench_classifier import LegacyQueryClassifier
+
+AGENT_TYPES = ["operations", "delivery", "customer"]
+
+def rebuild_per_message(agent_type: str) -> None:
+    """What every chat message paid before the registry"""
+    create_graph()  # OrchestratorAgent.__init__
+    LegacyQueryClassifier()  # OrchestratorAgent.__init__
+    LegacyQueryClassifier()  # classify_query node
+    _create_business_agent(agent_type)  # route_to_agent node
+
+def shared_registry(agent_type: str) -> None:
+    """What a chat message pays with the process-level registry"""
+    OrchestratorAgent()
+    get_business_agent(agent_type)
+
+def measure(fn, iterations: int) -> dict:
+    timings = []
+    for i in range(iterations):
+        agent_type = AGENT_TYPES[i % len(AGENT_TYPES)]
+        started = time.perf_counter()
+        fn(agent_type)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "median_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(timings[int(len(timings) * 0.95) - 1], 3),
+        "total_ms": round(sum(timings), 1)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    warm_up()
+    print(f"warm_up: {(time.perf_counter() - started) * 1000:.1f} ms (once per process)")
+
+    for name, fn in [("before (rebuild per message)", rebuild_per_message),
+                     ("after (shared registry)", shared_registry)]:
+        print(f"{name}: {measure(fn, args.iterations)}")
+
+if __name__ == "__main__":
+    main()
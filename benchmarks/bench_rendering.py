@@ -0,0 +1,113 @@
+"""Chat history rendering: full re-render every rerun vs memoized, windowed history.
+
+Streamlit reruns the whole script on each interaction, so the cost of a turn
+is the cost of drawing the history. This replays a long session and measures
+the pandas-side work of one rerun after each turn: the old path rebuilds and
+styles every past result (Streamlit marshals a Styler by computing it), the
+new path draws only the recent window from the artifact cache. Widget
+serialisation itself is not included, so the old path's real cost is higher.
+
+Run from the repository root:
+    python -m benchmarks.bench_rendering --turns 200
+"""
+import argparse
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from config import RENDER_RECENT_TURNS
+from database.result_store import ResultStore
+from utils.rendering import ArtifactCache, visible_history
+
+MONTHS = pd.date_range("2023-01-01", periods=12, freq="MS").strftime("%Y-%m")
+COURIERS = ['Delhivery', 'BlueDart', 'Ekart', 'XpressBees', 'DTDC', 'Shadowfax', 'Ecom Express']
+
+def make_result(turn: int, rng: np.random.Generator) -> pd.DataFrame:
+    """Cycle through the result shapes the operations agent typically returns"""
+    kind = turn % 3
+    if kind == 0:
+        return pd.DataFrame({
+            'MONTH': MONTHS,
+            'TOTAL_SHIPMENTS': rng.integers(10_000, 50_000, len(MONTHS)),
+            'RTO_RATE': rng.random(len(MONTHS)) * 20
+        })
+    if kind == 1:
+        return pd.DataFrame({
+            'PARENT_COURIER': COURIERS,
+            'SHIPMENTS': rng.integers(1_000, 9_000, len(COURIERS)),
+            'SUCCESS_RATE': rng.random(len(COURIERS)) * 100,
+            'AVG_TAT_HOURS': rng.random(len(COURIERS)) * 120
+        })
+    rows = 500
+    return pd.DataFrame({
+        'AWB_CODE': [f"AWB{turn:04d}{i:05d}" for i in range(rows)],
+        'PARENT_COURIER': rng.choice(COURIERS, rows),
+        'NO_OF_ATTEMPTS': rng.integers(1, 4, rows),
+        'CHARGED_WEIGHT': rng.random(rows) * 5
+    })
+
+def legacy_render(history) -> None:
+    """The old display_query_and_results for every message in history"""
+    for message in history:
+        if "results" not in message:
+            continue
+        df = pd.DataFrame(message["results"])
+        styler = df.style.format({
+            col: '{:.2f}' for col in df.select_dtypes(include=['float64']).columns
+        })
+        styler._compute()
+        if len(df) > 0 and df.select_dtypes(include=['float64', 'int64']).columns.any():
+            numeric_cols = df.select_dtypes(include=['float64', 'int64']).columns
+            if 'month' in df.columns.str.lower() and len(numeric_cols) > 0:
+                df.set_index('MONTH')[numeric_cols]
+            elif len(df) <= 10:
+                df.set_index(df.columns[0])[numeric_cols]
+
+def windowed_render(history, cache: ArtifactCache, visible_turns: int) -> None:
+    """The memoized path over the visible window only"""
+    _, messages = visible_history(history, visible_turns)
+    for message in messages:
+        if "result" in message:
+            cache.get(message["result"], 0)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--visible-turns", type=int, default=RENDER_RECENT_TURNS)
+    parser.add_argument("--report-every", type=int, default=25)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    store = ResultStore(directory=tempfile.mkdtemp(prefix="bench_rendering_"))
+    cache = ArtifactCache()
+    legacy_history, history = [], []
+    legacy_total = windowed_total = 0.0
+
+    print(f"{'turn':>5} | {'full re-render':>15} | {'windowed + memoized':>20}")
+    for turn in range(1, args.turns + 1):
+        df = make_result(turn, rng)
+        question = {"role": "user", "content": f"question {turn}"}
+        # Before the result store, messages carried the rows themselves
+        legacy_history += [question, {"role": "assistant", "content": "answer",
+                                      "sql_query": "SELECT 1", "results": df.to_dict('records')}]
+        history += [question, {"role": "assistant", "content": "answer",
+                               "sql_query": "SELECT 1", "result": store.put(df)}]
+
+        started = time.perf_counter()
+        legacy_render(legacy_history)
+        legacy_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        windowed_render(history, cache, args.visible_turns)
+        windowed_seconds = time.perf_counter() - started
+
+        legacy_total += legacy_seconds
+        windowed_total += windowed_seconds
+        if turn == 1 or turn % args.report_every == 0:
+            print(f"{turn:5d} | {legacy_seconds * 1000:12.2f} ms | {windowed_seconds * 1000:17.2f} ms")
+
+    print(f"\nwhole session: full re-render {legacy_total:.2f} s, windowed {windowed_total:.2f} s")
+    print(f"artifact cache: {cache.stats()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Memory per shipment row: fetched as-is vs the compact schema of database.schema.
+
+Loads synthetic shipments into an in-process DuckDB stand-in for the
+warehouse, fetches them back each way and reports bytes per row, fetch time,
+and that metrics computed locally agree on both representations.
+
+Run from the repository root:
+    python -m benchmarks.bench_schema --rows 1000000
+"""
+import argparse
+import sys
+import time
+import warnings
+import pandas as pd
+from database.connector import configure_pool, run_query
+from database.models import ShipmentTracking
+from database.schema import SHIPMENT_SCHEMA, memory_report
+from benchmarks.synthetic import generate_shipments
+from utils.metrics import MetricsCalculator, METRICS
+
+EXPORT_SQL = "SELECT * FROM VIEW_TITANIUM_PLATINUM_REPORT"
+
+def create_warehouse(num_rows: int):
+    import duckdb
+
+    frame = generate_shipments(num_rows)
+    for col, kind in SHIPMENT_SCHEMA.items():
+        if kind == 'bool':
+            frame[col] = frame[col].astype(bool)
+    db = duckdb.connect()
+    db.register('shipments', frame)
+    db.execute("CREATE TABLE VIEW_TITANIUM_PLATINUM_REPORT AS SELECT * FROM shipments")
+    db.unregister('shipments')
+    return db
+
+def dict_bytes_per_row(records) -> float:
+    """Deep size of ShipmentTracking.to_dict()-style rows"""
+    total = sum(sys.getsizeof(row) + sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in row.items())
+                for row in records)
+    return total / max(len(records), 1)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--columns", action="store_true", help="show bytes per row for each column")
+    args = parser.parse_args()
+
+    db = create_warehouse(args.rows)
+    configure_pool(db.cursor)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")  # pandas warns about non-SQLAlchemy connections
+        started = time.perf_counter()
+        legacy = pd.read_sql_query(EXPORT_SQL, db.cursor())
+        legacy_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    plain = run_query(EXPORT_SQL, timeout=None, max_rows=None, max_bytes=None).frame
+    plain_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    compact = run_query(EXPORT_SQL, timeout=None, max_rows=None, max_bytes=None, compact=True).frame
+    compact_seconds = time.perf_counter() - started
+
+    # pandas < 3 (and DBAPI tuples) hold every string as a Python object
+    object_typed = legacy.astype({col: object for col in legacy.columns if pd.api.types.is_string_dtype(legacy[col])})
+
+    sample = legacy.head(10_000).to_dict('records')
+    reports = {
+        'object strings': (memory_report(object_typed), None),
+        'read_sql_query': (memory_report(legacy), legacy_seconds),
+        'run_query': (memory_report(plain), plain_seconds),
+        'run_query(compact)': (memory_report(compact), compact_seconds)
+    }
+    compact_total = reports['run_query(compact)'][0]['total']
+    print(f"{'to_dict() rows':20s} {dict_bytes_per_row(sample):8.1f} B/row")
+    for name, (report, seconds) in reports.items():
+        fetch = "" if seconds is None else f" | fetch {seconds:6.2f} s"
+        print(f"{name:20s} {report['total']:8.1f} B/row | {report['total'] / compact_total:5.1f}x compact{fetch}")
+
+    if args.columns:
+        print(f"\n{'column':45s} {'objects':>12s} {'compact':>10s}  dtype")
+        for col in ShipmentTracking.__table__.columns.keys():
+            print(f"{col:45s} {reports['object strings'][0][col]:12.1f} "
+                  f"{reports['run_query(compact)'][0][col]:10.1f}  {compact[col].dtype}")
+
+    # Local analysis gives the same answers on the compact frame
+    metrics = list(METRICS)
+    for group_by in ([], ['ZONE'], ['MONTH', 'PARENT_COURIER']):
+        expected = MetricsCalculator(legacy).compute(metrics, group_by=group_by)
+        actual = MetricsCalculator(compact).compute(metrics, group_by=group_by)
+        sort = group_by or metrics
+        pd.testing.assert_frame_equal(
+            expected.sort_values(sort).reset_index(drop=True),
+            actual.sort_values(sort).reset_index(drop=True),
+            check_dtype=False, check_categorical=False, rtol=1e-5
+        )
+    print("\nmetrics on compact frame match")
+
+if __name__ == "__main__":
+    main()
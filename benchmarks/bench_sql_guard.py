@@ -0,0 +1,57 @@
+"""Per-query parse + rewrite overhead of the SQL guard on typical generated SQL.
+
+Run from the repository root:
+    python -m benchmarks.bench_sql_guard --iterations 200
+"""
+import argparse
+import statistics
+
+from utils.sql_guard import SQLGuard
+
+# The kind of SQL the operations agent's NL-to-SQL prompt produces
+GENERATED_SQL = [
+    """```sql
+SELECT DATE_TRUNC('MONTH', ASSIGNED_DATE_TIME) AS MONTH,
+       ROUND(100.0 * SUM(RTO_SHIPMENTS) / COUNT(*), 2) AS RTO_RATE
+FROM VIEW_TITANIUM_PLATINUM_REPORT
+GROUP BY DATE_TRUNC('MONTH', ASSIGNED_DATE_TIME)
+ORDER BY MONTH DESC;
+```""",
+    """SELECT ZONE, ROUND(100.0 * AVG(NDR_RAISED_SHIPMENTS), 2) AS NDR_RATE
+FROM VIEW_TITANIUM_PLATINUM_REPORT
+WHERE ASSIGNED_DATE_TIME >= DATEADD('day', -7, CURRENT_DATE())
+GROUP BY ZONE ORDER BY NDR_RATE DESC""",
+    """SELECT PARENT_COURIER,
+       ROUND(AVG(DATEDIFF('hour', ASSIGNED_DATE_TIME, AWB_DELIVERED_DATE)), 2) AS AVG_TAT_HOURS
+FROM VIEW_TITANIUM_PLATINUM_REPORT
+WHERE AWB_DELIVERED_DATE IS NOT NULL AND CITY_TIER = 'Tier1'
+GROUP BY PARENT_COURIER ORDER BY AVG_TAT_HOURS""",
+    """WITH courier_stats AS (
+    SELECT PARENT_COURIER, COUNT(*) AS TOTAL, SUM(FASR_SHIPMENT) AS FIRST_ATTEMPT
+    FROM VIEW_TITANIUM_PLATINUM_REPORT t
+    WHERE MODE_OF_SHIPMENT = 'COD'
+    GROUP BY PARENT_COURIER
+)
+SELECT PARENT_COURIER, ROUND(100.0 * FIRST_ATTEMPT / TOTAL, 2) AS FASR
+FROM courier_stats ORDER BY FASR DESC LIMIT 10""",
+    """SELECT * FROM VIEW_TITANIUM_PLATINUM_REPORT WHERE SHIPMENT_STATUS = 'IN TRANSIT'""",
+]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    guard = SQLGuard(explain=False)
+    for i, sql in enumerate(GENERATED_SQL):
+        parse, rewrite = [], []
+        for _ in range(args.iterations):
+            guarded = guard.check(sql)
+            parse.append(guarded.parse_ms)
+            rewrite.append(guarded.rewrite_ms)
+        print(f"query {i}: parse {statistics.median(parse):.3f} ms, "
+              f"rewrite {statistics.median(rewrite):.3f} ms, rewrites {guarded.rewrites}")
+    print(guard.stats())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Incremental sync of the Parquet mirror against a full re-export.
+
+A DuckDB file of synthetic shipments stands in for Snowflake. The first
+IncrementalSync run bootstraps the mirror; then a share of the in-flight
+shipments is delivered and new ones are booked in the stand-in, and the next
+run applies just those changes. Reports rows per second, sync lag and how
+long a full re-export takes instead, and checks every month of the mirror
+against the source (row count and a checksum of all AWBs, statuses and
+delivery dates). With --interrupt, a run is cut off after its first month
+and must be finished by the next one. The stand-in is in-process, so reading
+from it is far cheaper than from Snowflake; rows read is the number to watch.
+
+Run from the repository root:
+    python -m benchmarks.bench_sync --rows 5000000 --changes 0.01 --inserts 50000
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from config import TABLE_NAME
+from database.backends import ParquetMirror
+from database.connector import configure_pool
+from database.sync import IncrementalSync
+from benchmarks.synthetic import generate_shipments
+from benchmarks.warehouse import build_warehouse, connector
+
+CHECKSUM = """
+    SELECT strftime(ASSIGNED_DATE_TIME, '%Y-%m') AS MONTH, COUNT(*) AS ROWS,
+           SUM(hash(AWB_CODE, SHIPMENT_STATUS, AWB_DELIVERED_DATE)) AS CHECKSUM
+    FROM {source} WHERE ASSIGNED_DATE_TIME IS NOT NULL GROUP BY 1 ORDER BY 1
+"""
+
+class InterruptedMirror(ParquetMirror):
+    """Mirror whose process 'dies' after swapping in one month"""
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self.swaps = 0
+
+    def replace_month(self, month: str, new_dir: str) -> None:
+        if self.swaps:
+            raise KeyboardInterrupt("sync interrupted")
+        super().replace_month(month, new_dir)
+        self.swaps += 1
+
+def change_source(db, num_rows: int, changed: float, inserted: int, seed: int) -> None:
+    """Deliver a share of the in-flight shipments and book new ones, all within the last few seconds"""
+    now = pd.Timestamp.now().floor('s')
+    db.execute(f"""
+        UPDATE {TABLE_NAME}
+        SET SHIPMENT_STATUS = 'DELIVERED', DELIVERED_SHIPMENTS = 1,
+            AWB_DELIVERED_DATE = TIMESTAMP '{now}' - INTERVAL (hash(AWB_CODE) % 10) SECOND
+        WHERE AWB_CODE IN (
+            SELECT AWB_CODE FROM (SELECT AWB_CODE FROM {TABLE_NAME} WHERE SHIPMENT_STATUS <> 'DELIVERED')
+            USING SAMPLE {int(num_rows * changed)} ROWS
+        )
+    """)
+    if inserted:
+        fresh = generate_shipments(inserted, seed=seed, awb_offset=num_rows + seed)
+        shift = now - pd.to_timedelta(np.random.default_rng(seed).integers(0, 10, inserted), unit='s') \
+            - fresh['ASSIGNED_DATE_TIME']
+        for col in fresh.select_dtypes('datetime').columns:
+            fresh[col] += shift
+        db.register('fresh', fresh)
+        db.execute(f"INSERT INTO {TABLE_NAME} SELECT * FROM fresh")
+        db.unregister('fresh')
+    settle(db, now)
+
+def settle(db, now: pd.Timestamp) -> None:
+    """Clear the events the synthetic shipments have dated after ``now``; they have not happened yet"""
+    for col in ('PICKED_DATE', 'PICKED_UP_DATE', 'FIRST_NDR_RAISED', 'FIRST_ATTEMPT_DATE', 'AWB_DELIVERED_DATE'):
+        db.execute(f"UPDATE {TABLE_NAME} SET {col} = NULL WHERE {col} > TIMESTAMP '{now}'")
+
+def mismatched_months(db, mirror: ParquetMirror) -> list:
+    source = db.execute(CHECKSUM.format(source=TABLE_NAME)).df()
+    local = db.execute(CHECKSUM.format(source=f"read_parquet('{mirror.glob}', union_by_name = true)")).df()
+    merged = source.merge(local, on='MONTH', how='outer', suffixes=('_source', '_mirror'))
+    differs = (merged['ROWS_source'] != merged['ROWS_mirror']) | (merged['CHECKSUM_source'] != merged['CHECKSUM_mirror'])
+    return merged.loc[differs, 'MONTH'].tolist()
+
+def report(label: str, result: dict) -> None:
+    print(f"{label:12s} {result['rows']:>10,} rows ({result.get('inserted', 0):,} new, {result.get('updated', 0):,} updated) "
+          f"in {len(result['months'])} months, {result['seconds']:.2f} s, {result['rows_per_second']:,} rows/s, "
+          f"lag {result['lag_seconds']} s, compacted {result.get('compacted', [])}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--changes", type=float, default=0.01, help="share of shipments delivered between syncs")
+    parser.add_argument("--inserts", type=int, default=50_000, help="shipments booked between syncs")
+    parser.add_argument("--rounds", type=int, default=3, help="incremental syncs")
+    parser.add_argument("--overlap", type=int, default=60,
+                        help="seconds re-read before the watermarks (SYNC_OVERLAP_SECONDS; syncs here are seconds apart)")
+    parser.add_argument("--compact-max-files", type=int, default=8)
+    parser.add_argument("--interrupt", action="store_true", help="also cut a sync short and resume it")
+    args = parser.parse_args()
+
+    workdir = os.path.join(tempfile.gettempdir(), "bench_sync")
+    os.makedirs(workdir, exist_ok=True)
+    # The source is changed by the run, so work on a copy of the generated one
+    pristine = os.path.join(workdir, f"warehouse_{args.rows}.duckdb")
+    build_warehouse(pristine, args.rows).close()
+    source_path = os.path.join(workdir, "source.duckdb")
+    shutil.copy(pristine, source_path)
+    if os.path.exists(source_path + ".wal"):
+        os.remove(source_path + ".wal")  # left by an earlier run; it would replay its changes
+    import duckdb
+    db = duckdb.connect(source_path)
+    settle(db, pd.Timestamp.now().floor('s'))
+    configure_pool(connector(db))
+
+    mirror_path = os.path.join(workdir, "mirror")
+    shutil.rmtree(mirror_path, ignore_errors=True)
+    sync = IncrementalSync(ParquetMirror(mirror_path), overlap_seconds=args.overlap,
+                           compact_max_files=args.compact_max_files)
+    report("bootstrap", sync.run())
+
+    for round_ in range(args.rounds):
+        change_source(db, args.rows, args.changes, args.inserts, seed=(round_ + 1) * args.inserts)
+        report(f"sync {round_ + 1}", sync.run())
+    print(f"mirror matches the source: {not mismatched_months(db, sync.mirror) or mismatched_months(db, sync.mirror)}")
+
+    if args.interrupt:
+        change_source(db, args.rows, args.changes, args.inserts, seed=(args.rounds + 1) * args.inserts)
+        try:
+            IncrementalSync(InterruptedMirror(mirror_path), overlap_seconds=args.overlap).run()
+        except KeyboardInterrupt:
+            print("interrupted after one month; mirror matches the source: "
+                  f"{not mismatched_months(db, sync.mirror)}")
+        report("resumed", sync.run())
+        print(f"mirror matches the source: {not mismatched_months(db, sync.mirror) or mismatched_months(db, sync.mirror)}")
+
+    full_path = os.path.join(workdir, "mirror_full")
+    shutil.rmtree(full_path, ignore_errors=True)
+    export = ParquetMirror(full_path).export(full=True)
+    print(f"\nfull re-export: {export['rows']:,} rows in {export['seconds']:.2f} s ({export['rows_per_second']:,} rows/s)")
+    stats = sync.stats()
+    print(f"last sync {stats['last_run']['seconds']:.2f} s, {stats['runs']} runs, "
+          f"average {stats['avg_rows_per_second']:,} rows/s; watermarks {stats['watermarks']}")
+
+if __name__ == "__main__":
+    main()
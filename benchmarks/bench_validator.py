@@ -0,0 +1,90 @@
+"""Shipment validation: per-record validate_data/clean_data vs frame-level validate_frame/clean_frame.
+
+Rows come from a synthetic export with dates as text and a sprinkling of bad
+zones, tiers, dates and flags. The per-record path is timed on a sample and
+checked against the frame path on the same rows.
+
+Run from the repository root:
+    python -m benchmarks.bench_validator --rows 1000000
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from agents.support.data_validator import DataValidator, DATE_FIELDS, BOOL_FIELDS
+from benchmarks.synthetic import generate_shipments
+
+def make_export(num_rows: int, seed: int = 0) -> pd.DataFrame:
+    """Shipments as they arrive in a CSV export, with about 1% dirty values"""
+    rng = np.random.default_rng(seed)
+    df = generate_shipments(num_rows, seed=seed)
+    for field in DATE_FIELDS:
+        df[field] = df[field].dt.strftime('%Y-%m-%d %H:%M:%S').astype(object)
+    df['RTO_SHIPMENTS'] = np.where(df['RTO_SHIPMENTS'] == 1, 'true', 'false').astype(object)
+
+    def dirty(fraction: float) -> np.ndarray:
+        return rng.random(num_rows) < fraction
+
+    df.loc[dirty(0.01), 'ZONE'] = 'z_x'
+    df.loc[dirty(0.01), 'CITY_TIER'] = 'tier1'
+    df.loc[dirty(0.01), 'PICKED_DATE'] = 'not a date'
+    df.loc[dirty(0.005), 'ASSIGNED_DATE_TIME'] = '2024-03-05'
+    return df
+
+def per_record(validator: DataValidator, records) -> dict:
+    counts = {'ZONE': 0, 'CITY_TIER': 0}
+    cleaned = []
+    for record in records:
+        for field, _ in validator.validate_data(record)['invalid_values']:
+            counts[field] += 1
+        cleaned.append(validator.clean_data(record))
+    return {'counts': counts, 'cleaned': cleaned}
+
+def check_parity(frame_counts: dict, cleaned: pd.DataFrame, legacy: dict) -> None:
+    for field, count in legacy['counts'].items():
+        assert frame_counts.get(f'invalid:{field}', 0) == count, (field, count, frame_counts)
+    legacy_frame = pd.DataFrame(legacy['cleaned'])
+    for field in DATE_FIELDS:
+        pd.testing.assert_series_equal(pd.to_datetime(legacy_frame[field]).astype('datetime64[ns]'),
+                                       cleaned[field].reset_index(drop=True).astype('datetime64[ns]'))
+    for field in BOOL_FIELDS:
+        # clean_data turns every non-empty string, 'false' included, into True
+        if field != 'RTO_SHIPMENTS':
+            pd.testing.assert_series_equal(legacy_frame[field], cleaned[field].reset_index(drop=True))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--legacy-rows", type=int, default=20_000,
+                        help="rows validated per record (extrapolated to --rows)")
+    args = parser.parse_args()
+
+    df = make_export(args.rows)
+    validator = DataValidator()
+
+    sample = df.head(args.legacy_rows)
+    records = sample.to_dict('records')
+    started = time.perf_counter()
+    legacy = per_record(validator, records)
+    legacy_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    validation = validator.validate_frame(df)
+    validate_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    cleaned, _ = validator.clean_frame(df)
+    clean_seconds = time.perf_counter() - started
+
+    sample_cleaned, sample_validation = validator.clean_frame(sample)
+    check_parity(sample_validation.counts, sample_cleaned, legacy)
+
+    legacy_rate = len(records) / legacy_seconds
+    print(f"per-record validate+clean {legacy_rate:>12,.0f} rows/s "
+          f"(~{args.rows / legacy_rate:,.0f} s for {args.rows:,} rows)")
+    print(f"validate_frame            {args.rows / validate_seconds:>12,.0f} rows/s ({validate_seconds:.2f} s)")
+    print(f"clean_frame               {args.rows / clean_seconds:>12,.0f} rows/s ({clean_seconds:.2f} s)")
+    print(f"violations: {validation.summary()['violations']}")
+
+if __name__ == "__main__":
+    main()
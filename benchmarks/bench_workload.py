@@ -0,0 +1,223 @@
+"""End-to-end throughput of OrchestratorAgent.process_query, offline.
+
+ChatOpenAI is replaced by the deterministic FakeChatModel (configurable
+latency, canned SQL per question class) and Snowflake by a local DuckDB
+warehouse of synthetic shipments, so no OpenAI or Snowflake account is
+needed. A mixed workload of tracking, analytics and general questions runs at
+each concurrency level in a fresh process, so caches start cold and peak RSS
+reflects that level alone. Reports throughput, latency percentiles per
+question kind, time per stage (from utils.tracing) and memory.
+
+Run from the repository root:
+    python -m benchmarks.bench_workload --rows 1000000 --queries 400 --concurrency 1,8,32
+
+Save a run with --json and compare a later one against it with --baseline;
+the exit status is 1 when throughput or p95 latency regressed beyond --tolerance.
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+WORKDIR = os.path.join(tempfile.gettempdir(), "bench_workload")
+
+# Keep the run away from the application's caches and files
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("AGENT_MODEL", "gpt-3.5-turbo")
+os.environ.setdefault("QUERY_CACHE_URL", "")  # in-process result cache only
+os.environ.setdefault("ROLLUP_PATH", os.path.join(WORKDIR, "rollup_daily.parquet"))
+os.environ.setdefault("TRACE_PATH", os.path.join(WORKDIR, "traces.jsonl"))
+
+import numpy as np
+
+ZONES = ['a', 'b', 'c', 'd', 'e']
+
+# Question templates per kind; {awb}, {awbs} and {zone} are filled in per query
+QUESTIONS = {
+    'tracking': [
+        "Where is {awb}?",
+        "What is the status of {awb}",
+        "Track {awbs}"
+    ],
+    'analytics': [
+        "Show RTO rate month over month",
+        "What is the NDR rate by zone for COD orders in zone {zone}",
+        "Average delivery time by zone in the last 30 days",
+        "Shipment status distribution for zone {zone}",
+        "Compare courier wise FASR",
+        "Total shipments in zone {zone} this week, list by AWB"
+    ],
+    'general': [
+        "How do I change my delivery address?",
+        "Can I reschedule my delivery for tomorrow?",
+        "My package arrived damaged, what should I do?"
+    ]
+}
+
+DEFAULT_MIX = "tracking=0.5,analytics=0.3,general=0.2"
+
+def parse_mix(mix: str) -> dict:
+    weights = {kind: float(weight) for kind, weight in (part.split("=") for part in mix.split(","))}
+    unknown = set(weights) - set(QUESTIONS)
+    if unknown:
+        raise ValueError(f"Unknown question kinds: {sorted(unknown)}")
+    total = sum(weights.values())
+    return {kind: weight / total for kind, weight in weights.items()}
+
+def make_workload(num_queries: int, num_rows: int, mix: dict, seed: int = 0) -> list:
+    """(kind, question) pairs; the same arguments always give the same workload"""
+    rng = random.Random(seed)
+    kinds = rng.choices(list(mix), weights=list(mix.values()), k=num_queries)
+
+    def awb() -> str:
+        return f"AWB{rng.randrange(num_rows):08d}"
+
+    workload = []
+    for kind in kinds:
+        template = rng.choice(QUESTIONS[kind])
+        workload.append((kind, template.format(
+            awb=awb(),
+            awbs=", ".join(awb() for _ in range(rng.randint(2, 20))),
+            zone=rng.choice(ZONES)
+        )))
+    return workload
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def percentiles(values) -> dict:
+    if not values:
+        return {}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {'p50_ms': round(float(p50), 1), 'p95_ms': round(float(p95), 1), 'p99_ms': round(float(p99), 1)}
+
+def run_scenario(args, concurrency: int) -> dict:
+    from agents.orchestrator import OrchestratorAgent, warm_up
+    from database.connector import configure_pool
+    from utils.llm import configure_chat_model
+    from utils.tracing import get_tracer
+    from benchmarks.fake_llm import fake_chat_model_factory
+    from benchmarks.warehouse import build_warehouse, connector
+
+    db = build_warehouse(args.warehouse, args.rows)
+    configure_pool(connector(db))
+    configure_chat_model(fake_chat_model_factory(args.llm_latency, args.token_latency))
+    warm_up()
+    orchestrator = OrchestratorAgent()
+    workload = make_workload(args.queries, args.rows, parse_mix(args.mix), args.seed)
+    baseline_rss = peak_rss_mb()
+
+    def ask(i: int):
+        kind, question = workload[i]
+        started = time.perf_counter()
+        response, _, _ = orchestrator.process_query(question, session_id=f"user-{i % args.sessions}")
+        return kind, (time.perf_counter() - started) * 1000, response.startswith("Error processing query")
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(ask, range(len(workload))))
+    seconds = time.perf_counter() - started
+
+    latencies = [ms for _, ms, _ in outcomes]
+    return {
+        'concurrency': concurrency,
+        'queries': len(outcomes),
+        'errors': sum(error for _, _, error in outcomes),
+        'seconds': round(seconds, 2),
+        'throughput_qps': round(len(outcomes) / seconds, 2),
+        'latency': percentiles(latencies),
+        'by_kind': {
+            kind: {'count': sum(k == kind for k, _, _ in outcomes),
+                   **percentiles([ms for k, ms, _ in outcomes if k == kind])}
+            for kind in QUESTIONS if any(k == kind for k, _, _ in outcomes)
+        },
+        'stages': {name: {key: round(value, 1) for key, value in stats.items()}
+                   for name, stats in get_tracer().stage_percentiles().items()},
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'peak_rss_delta_mb': round(peak_rss_mb() - baseline_rss, 1)
+    }
+
+def print_result(result: dict) -> None:
+    latency = result['latency']
+    print(f"concurrency {result['concurrency']:>3} | {result['throughput_qps']:8.2f} q/s | "
+          f"p50 {latency['p50_ms']:8.1f} ms | p95 {latency['p95_ms']:8.1f} ms | p99 {latency['p99_ms']:8.1f} ms | "
+          f"errors {result['errors']} | peak RSS {result['peak_rss_mb']:.0f} MB (+{result['peak_rss_delta_mb']:.0f})")
+    for kind, stats in result['by_kind'].items():
+        print(f"    {kind:10s} {stats['count']:>6} queries | p50 {stats['p50_ms']:8.1f} ms | p95 {stats['p95_ms']:8.1f} ms")
+    for name, stats in sorted(result['stages'].items()):
+        print(f"    stage {name:14s} {int(stats['count']):>6} spans | p50 {stats['p50']:8.1f} ms | p95 {stats['p95']:8.1f} ms")
+
+def compare(results: list, baseline: list, tolerance: float) -> list:
+    """Regressions of this run against a saved one, per concurrency level"""
+    previous = {result['concurrency']: result for result in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get(result['concurrency'])
+        if before is None:
+            continue
+        if result['throughput_qps'] < before['throughput_qps'] * (1 - tolerance):
+            regressions.append(f"concurrency {result['concurrency']}: throughput "
+                               f"{before['throughput_qps']} -> {result['throughput_qps']} q/s")
+        if result['latency']['p95_ms'] > before['latency']['p95_ms'] * (1 + tolerance):
+            regressions.append(f"concurrency {result['concurrency']}: p95 "
+                               f"{before['latency']['p95_ms']} -> {result['latency']['p95_ms']} ms")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000, help="synthetic shipments in the warehouse")
+    parser.add_argument("--queries", type=int, default=400, help="questions per concurrency level")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated levels")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="weights of tracking, analytics and general questions")
+    parser.add_argument("--sessions", type=int, default=50, help="distinct chat sessions asking")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="seconds before the fake LLM answers")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="seconds per streamed token")
+    parser.add_argument("--warehouse", default=None, help="DuckDB file, reused when it has --rows rows")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the results here")
+    parser.add_argument("--baseline", help="results of an earlier --json run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    parser.add_argument("--level", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    args.warehouse = args.warehouse or os.path.join(WORKDIR, f"warehouse_{args.rows}.duckdb")
+    os.makedirs(WORKDIR, exist_ok=True)
+
+    if args.level is not None:
+        print(json.dumps(run_scenario(args, args.level)))
+        return
+
+    from benchmarks.warehouse import build_warehouse
+
+    started = time.perf_counter()
+    build_warehouse(args.warehouse, args.rows).close()
+    print(f"warehouse: {args.rows:,} rows in {args.warehouse} ({time.perf_counter() - started:.1f} s)")
+
+    results = []
+    for level in (int(level) for level in args.concurrency.split(",")):
+        command = [sys.executable, "-m", "benchmarks.bench_workload", "--level", str(level)]
+        for option in ("rows", "queries", "mix", "sessions", "llm_latency", "token_latency", "warehouse", "seed"):
+            command += [f"--{option.replace('_', '-')}", str(getattr(args, option))]
+        output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print_result(result)
+        results.append(result)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
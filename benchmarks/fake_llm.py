@@ -0,0 +1,135 @@
+"""Deterministic stand-in for ChatOpenAI, for benchmarks that must not call OpenAI.
+
+Replies depend only on the prompt: the NL2SQL prompt gets canned SQL for the
+question's class, the classifier fallback gets a routing decision and
+everything else a fixed answer. Latency is simulated as a delay before the
+first token plus a delay per streamed token.
+"""
+import asyncio
+import json
+import re
+import time
+from typing import Any, Dict, Iterator, List, Optional
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+# Question class -> SQL the model "generates"; the first matching class wins
+CANNED_SQL: Dict[str, str] = {
+    'rto': """SELECT DATE_TRUNC('MONTH', ASSIGNED_DATE_TIME) AS MONTH,
+       ROUND(SUM(RTO_SHIPMENTS) * 100.0 / NULLIF(SUM(TOTAL_SHIPMENTS), 0), 2) AS RTO_RATE
+FROM VIEW_TITANIUM_PLATINUM_REPORT
+GROUP BY 1
+ORDER BY MONTH DESC""",
+    'ndr': """SELECT ZONE,
+       ROUND(SUM(NDR_RAISED_SHIPMENTS) * 100.0 / NULLIF(SUM(TOTAL_SHIPMENTS), 0), 2) AS NDR_RATE,
+       ROUND(SUM(NDR_DELIVERED_SHIPMENTS) * 100.0 / NULLIF(SUM(NDR_RAISED_SHIPMENTS), 0), 2) AS NDR_CONVERSION
+FROM VIEW_TITANIUM_PLATINUM_REPORT
+GROUP BY ZONE
+ORDER BY NDR_RATE DESC""",
+    'tat': """SELECT ZONE,
+       ROUND(AVG(DATEDIFF('hour', ASSIGNED_DATE_TIME, AWB_DELIVERED_DATE)), 1) AS AVG_DELIVERY_TIME_HOURS
+FROM VIEW_TITANIUM_PLATINUM_REPORT
+WHERE AWB_DELIVERED_DATE IS NOT NULL
+GROUP BY ZONE
+ORDER BY AVG_DELIVERY_TIME_HOURS DESC""",
+    'courier': """SELECT PARENT_COURIER,
+       COUNT(*) AS SHIPMENTS,
+       ROUND(SUM(FASR_SHIPMENT) * 100.0 / NULLIF(SUM(TOTAL_SHIPMENTS), 0), 2) AS FASR
+FROM VIEW_TITANIUM_PLATINUM_REPORT
+GROUP BY PARENT_COURIER
+ORDER BY SHIPMENTS DESC""",
+    'distribution': """SELECT SHIPMENT_STATUS, COUNT(*) AS SHIPMENTS
+FROM VIEW_TITANIUM_PLATINUM_REPORT
+GROUP BY SHIPMENT_STATUS
+ORDER BY SHIPMENTS DESC""",
+    'export': """SELECT AWB_CODE, ZONE, PARENT_COURIER, SHIPMENT_STATUS, ASSIGNED_DATE_TIME
+FROM VIEW_TITANIUM_PLATINUM_REPORT
+ORDER BY ASSIGNED_DATE_TIME DESC"""
+}
+
+# Words that put a question in a class of CANNED_SQL
+CLASS_TERMS: Dict[str, List[str]] = {
+    'rto': ['rto', 'return'],
+    'ndr': ['ndr', 'non delivery'],
+    'tat': ['tat', 'time', 'duration', 'turnaround'],
+    'courier': ['courier', 'partner', 'fasr'],
+    'distribution': ['distribution', 'breakdown', 'status'],
+    'export': ['list', 'export', 'all shipments']
+}
+_CLASS_PATTERNS = {
+    name: re.compile(r'\b(?:' + '|'.join(map(re.escape, terms)) + r')\b') for name, terms in CLASS_TERMS.items()
+}
+
+GENERAL_ANSWER = ("Thanks for reaching out. Shipments are usually delivered within three to five "
+                  "business days; share your AWB number and I can check its current status for you.")
+
+def question_class(question: str) -> str:
+    """Class of CANNED_SQL a question falls in ('distribution' when nothing matches)"""
+    question = question.lower()
+    for name, pattern in _CLASS_PATTERNS.items():
+        if pattern.search(question):
+            return name
+    return 'distribution'
+
+class FakeChatModel(BaseChatModel):
+    """Chat model answering from canned replies after a simulated delay"""
+
+    latency: float = 0.5  # seconds before the first token
+    token_latency: float = 0.0  # seconds per streamed token
+    canned_sql: Dict[str, str] = CANNED_SQL
+    answer: str = GENERAL_ANSWER
+    model_name: str = "fake"
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def reply(self, messages: List[BaseMessage]) -> str:
+        system = " ".join(str(m.content) for m in messages if m.type == "system")
+        human = str(messages[-1].content) if messages else ""
+        if "natural language queries to SQL" in system:
+            return self.canned_sql[question_class(human)]
+        if "You route questions" in system:
+            return json.dumps({"primary_agent": "customer", "confidence_score": 0.8})
+        return self.answer
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs) -> ChatResult:
+        text = self.reply(messages)
+        time.sleep(self.latency + self.token_latency * len(text.split()))
+        return self._result(messages, text)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs) -> ChatResult:
+        text = self.reply(messages)
+        await asyncio.sleep(self.latency + self.token_latency * len(text.split()))
+        return self._result(messages, text)
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Any = None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.latency)
+        for i, word in enumerate(self.reply(messages).split()):
+            if self.token_latency:
+                time.sleep(self.token_latency)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=word if i == 0 else " " + word))
+            if run_manager is not None:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    def _result(self, messages: List[BaseMessage], text: str) -> ChatResult:
+        prompt_tokens = sum(len(str(m.content)) for m in messages) // 4
+        completion_tokens = len(text) // 4
+        message = AIMessage(content=text, usage_metadata={
+            'input_tokens': prompt_tokens,
+            'output_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens
+        })
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+def fake_chat_model_factory(latency: float = 0.5, token_latency: float = 0.0):
+    """Factory for utils.llm.configure_chat_model"""
+    def create(model_name: Optional[str] = None, **kwargs) -> FakeChatModel:
+        kwargs.pop('temperature', None)
+        return FakeChatModel(latency=latency, token_latency=token_latency, **kwargs)
+    return create
@@ -0,0 +1,75 @@
+"""Synthetic shipments shaped like VIEW_TITANIUM_PLATINUM_REPORT."""
+from typing import Optional
+import numpy as np
+import pandas as pd
+from database.models import ShipmentTracking
+
+STATUSES = ['DELIVERED', 'IN TRANSIT', 'OUT FOR DELIVERY', 'UNDELIVERED', 'RTO INITIATED', 'RTO DELIVERED']
+STATUS_WEIGHTS = [0.70, 0.10, 0.04, 0.04, 0.04, 0.08]
+COURIERS = ['Delhivery', 'BlueDart', 'Ekart', 'XpressBees', 'DTDC', 'Shadowfax', 'Ecom Express']
+STATES = ['Maharashtra', 'Karnataka', 'Delhi', 'Tamil Nadu', 'Uttar Pradesh', 'Gujarat', 'West Bengal']
+
+def _enum_values(column: str):
+    return list(ShipmentTracking.__table__.columns[column].type.enums)
+
+def generate_shipments(num_rows: int,
+                       seed: int = 0,
+                       start: str = "2024-01-01",
+                       days: int = 180,
+                       awb_offset: int = 0,
+                       rng: Optional[np.random.Generator] = None) -> pd.DataFrame:
+    """Generate ``num_rows`` shipments with internally consistent flags"""
+    rng = rng or np.random.default_rng(seed)
+    n = num_rows
+
+    awb_numbers = np.arange(awb_offset, awb_offset + n).astype('U8')
+    assigned = pd.Timestamp(start) + pd.to_timedelta(rng.integers(0, days * 86400, n), unit='s')
+
+    status = rng.choice(STATUSES, n, p=STATUS_WEIGHTS)
+    delivered = status == 'DELIVERED'
+    rto = np.char.startswith(status.astype(str), 'RTO')
+    ndr = (rng.random(n) < 0.12) | rto | (status == 'UNDELIVERED')
+    attempts = np.where(status == 'IN TRANSIT', 0, rng.integers(1, 4, n))
+    attempts = np.where(ndr, np.maximum(attempts, 1), attempts)
+
+    transit_seconds = rng.gamma(shape=3.0, scale=30 * 3600, size=n).astype('int64')
+    delivered_at = pd.Series(assigned + pd.to_timedelta(transit_seconds, unit='s'))
+    delivered_at[~delivered] = pd.NaT
+
+    applied_weight = np.round(rng.gamma(2.0, 0.4, n), 2)
+    charged_weight = np.round(applied_weight * rng.choice([1.0, 1.0, 1.0, 1.5], n), 2)
+
+    return pd.DataFrame({
+        'AWB_CODE': np.char.add('AWB', np.char.zfill(awb_numbers, 8)),
+        'ZONE': rng.choice(_enum_values('ZONE'), n),
+        'CITY_TIER': rng.choice(_enum_values('CITY_TIER'), n),
+        'DELIVERY_STATE': rng.choice(STATES, n),
+        'ASSIGNED_DATE_TIME': assigned,
+        'PICKED_DATE': assigned + pd.to_timedelta(rng.integers(3600, 86400, n), unit='s'),
+        'PICKED_UP_DATE': assigned + pd.to_timedelta(rng.integers(3600, 86400, n), unit='s'),
+        'FIRST_NDR_RAISED': pd.Series(assigned).where(ndr) + pd.Timedelta(days=2),
+        'FIRST_ATTEMPT_DATE': pd.Series(assigned).where(attempts > 0) + pd.Timedelta(days=1),
+        'AWB_DELIVERED_DATE': delivered_at,
+        'COMPANY_ID': rng.integers(1000, 1500, n).astype(str),
+        'ORDER_ID': np.char.add('ORD', awb_numbers),
+        'PARENT_COURIER': rng.choice(COURIERS, n),
+        'MODE_OF_SHIPMENT': rng.choice(_enum_values('MODE_OF_SHIPMENT'), n, p=[0.4, 0.6]),
+        'COURIER_MODE': rng.choice(_enum_values('COURIER_MODE'), n, p=[0.2, 0.8]),
+        'SHIP_TYPE': rng.choice(_enum_values('SHIP_TYPE'), n),
+        'IS_DELIVERYBOOST': (rng.random(n) < 0.1).astype('int8'),
+        'SHIPMENT_STATUS': status,
+        'TOTAL_SHIPMENTS': np.ones(n, dtype='int8'),
+        'RTO_SHIPMENTS': rto.astype('int8'),
+        'NOT_ATTEMPTED': (attempts == 0).astype('int8'),
+        'FASR_SHIPMENT': (delivered & (attempts == 1) & ~ndr).astype('int8'),
+        'NO_OF_ATTEMPTS': attempts.astype('int8'),
+        'NDR_RAISED_SHIPMENTS': ndr.astype('int8'),
+        'NDR_DELIVERED_SHIPMENTS': (ndr & delivered).astype('int8'),
+        'DELIVERED_SHIPMENTS': delivered.astype('int8'),
+        'IS_WEIGHT_DESCRIPANCY': (charged_weight > applied_weight).astype('int8'),
+        'APPLIED_WEIGHT': applied_weight,
+        'COURIER_CHARGED_WEIGHT': charged_weight,
+        'ORDER_VALUE': np.round(rng.gamma(2.0, 600.0, n), 2),
+        'BUYER_POSITIVE_RESPONSE_TOTAL_SHIPMENTS': (rng.random(n) < 0.3).astype('int8'),
+        'BUYER_POSITIVE_RESPONSE_DELIVERED_SHIPMENTS': (delivered & (rng.random(n) < 0.3)).astype('int8')
+    })
@@ -0,0 +1,69 @@
+"""Local DuckDB stand-in for the Snowflake warehouse, filled with synthetic shipments.
+
+The database file holds VIEW_TITANIUM_PLATINUM_REPORT with the columns of
+ShipmentTracking, generated in chunks so tens of millions of rows fit in
+memory, and is reused across runs. Statements arrive in Snowflake SQL (from
+the agents and the SQL guard) and are transpiled to DuckDB, as by the duckdb
+backend of database.backends.
+
+Build a warehouse on its own:
+    python -m benchmarks.warehouse --rows 10000000 --path /tmp/warehouse.duckdb
+"""
+import argparse
+import os
+import time
+from typing import Callable
+import pandas as pd
+from config import TABLE_NAME
+from database.backends import TranspilingConnection
+from benchmarks.synthetic import generate_shipments
+
+CHUNK_ROWS = 1_000_000
+HISTORY_DAYS = 180  # shipments are spread over the days up to today
+
+def row_count(db) -> int:
+    try:
+        return db.execute(f"SELECT COUNT(*) FROM {TABLE_NAME}").fetchone()[0]
+    except Exception:
+        return 0
+
+def build_warehouse(path: str, num_rows: int, seed: int = 0, chunk_rows: int = CHUNK_ROWS):
+    """Open the warehouse at ``path``, (re)generating it unless it already has ``num_rows`` rows"""
+    import duckdb
+
+    db = duckdb.connect(path)
+    if row_count(db) == num_rows:
+        return db
+
+    start = (pd.Timestamp.now().normalize() - pd.Timedelta(days=HISTORY_DAYS)).strftime('%Y-%m-%d')
+    db.execute(f"DROP TABLE IF EXISTS {TABLE_NAME}")
+    for offset in range(0, num_rows, chunk_rows):
+        chunk = generate_shipments(min(chunk_rows, num_rows - offset), seed=seed + offset,
+                                   start=start, days=HISTORY_DAYS, awb_offset=offset)
+        db.register('chunk', chunk)
+        if offset == 0:
+            db.execute(f"CREATE TABLE {TABLE_NAME} AS SELECT * FROM chunk")
+        else:
+            db.execute(f"INSERT INTO {TABLE_NAME} SELECT * FROM chunk")
+        db.unregister('chunk')
+    db.execute("CHECKPOINT")
+    return db
+
+def connector(db) -> Callable[[], TranspilingConnection]:
+    """Connection factory for database.connector.configure_pool"""
+    return lambda: TranspilingConnection(db.cursor(), 'duckdb')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--path", required=True)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    db = build_warehouse(args.path, args.rows, args.seed)
+    print(f"{row_count(db):,} rows in {args.path} ({os.path.getsize(args.path) / 1024 ** 2:,.0f} MB, "
+          f"{time.perf_counter() - started:.1f} s)")
+
+if __name__ == "__main__":
+    main()
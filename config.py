@@ -8,6 +8,16 @@ load_dotenv()
 DB_PATH = os.getenv("DB_PATH")
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+# Query Result Cache
+QUERY_CACHE_URL = os.getenv("QUERY_CACHE_URL", DATABASE_URL or "sqlite:///query_cache.db")
+QUERY_CACHE_TTL = int(os.getenv("QUERY_CACHE_TTL", 900))  # seconds
+QUERY_CACHE_MAX_BYTES = int(os.getenv("QUERY_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+QUERY_CACHE_WATERMARK_INTERVAL = int(os.getenv("QUERY_CACHE_WATERMARK_INTERVAL", 60))  # seconds
+
+# NL-to-SQL Cache
+SQL_CACHE_MAX_ENTRIES = int(os.getenv("SQL_CACHE_MAX_ENTRIES", 2000))
+SQL_CACHE_SIMILARITY_THRESHOLD = float(os.getenv("SQL_CACHE_SIMILARITY_THRESHOLD", 0.85))
+
 # OpenAI
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
@@ -28,9 +38,66 @@ AGENT_TYPES = {
     "operations": "Operations Agent"
 }
 
+# Cross-domain questions fan out to several agents at once
+AGENT_FANOUT_MAX_WORKERS = int(os.getenv("AGENT_FANOUT_MAX_WORKERS", 8))
+AGENT_DEADLINE = float(os.getenv("AGENT_DEADLINE", 60))  # seconds, per agent in a fan-out
+AGENT_DEADLINES = {
+    agent: float(os.getenv(f"AGENT_DEADLINE_{agent.upper()}", AGENT_DEADLINE)) for agent in AGENT_TYPES
+}
+
+# Delivery SLA used for compliance metrics
+DELIVERY_SLA_HOURS = float(os.getenv("DELIVERY_SLA_HOURS", 120))
+
+# Local daily rollup of the shipment view
+ROLLUP_PATH = os.getenv("ROLLUP_PATH", "data/rollup_daily.parquet")
+ROLLUP_LOOKBACK_DAYS = int(os.getenv("ROLLUP_LOOKBACK_DAYS", 7))  # recent days always re-aggregated on refresh, next to changed ones
+ROLLUP_START_DATE = os.getenv("ROLLUP_START_DATE")  # None keeps the full history
+ROLLUP_MAX_AGE = int(os.getenv("ROLLUP_MAX_AGE", 3600))  # seconds since the last refresh before questions go to the warehouse
+
+# Server-side store for query results shown in the chat
+RESULT_STORE_DIR = os.getenv("RESULT_STORE_DIR", "data/results")
+RESULT_STORE_MAX_MEMORY_BYTES = int(os.getenv("RESULT_STORE_MAX_MEMORY_BYTES", 128 * 1024 * 1024))  # spilled to Parquet beyond this
+RESULT_STORE_TTL = int(os.getenv("RESULT_STORE_TTL", 86400))  # seconds
+RESULT_PAGE_SIZE = int(os.getenv("RESULT_PAGE_SIZE", 100))  # rows rendered at a time
+
+# Chat rendering
+RENDER_RECENT_TURNS = int(os.getenv("RENDER_RECENT_TURNS", 10))  # turns shown before "show earlier"
+RENDER_CACHE_MAX_ENTRIES = int(os.getenv("RENDER_CACHE_MAX_ENTRIES", 256))  # prepared result pages kept
+TTFT_HISTORY_SIZE = int(os.getenv("TTFT_HISTORY_SIZE", 100))  # recent answers per session behind the TTFT metrics
+
+# Latency tracing
+TRACE_ENABLED = os.getenv("TRACE_ENABLED", "true").lower() == "true"
+TRACE_PATH = os.getenv("TRACE_PATH", "data/traces.jsonl")  # OpenTelemetry-style span records
+TRACE_MAX_BYTES = int(os.getenv("TRACE_MAX_BYTES", 64 * 1024 * 1024))  # rotated to TRACE_PATH.1 beyond this
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", 1000))  # recent spans per stage for percentiles
+
+# Warehouse backends: 'snowflake', or 'duckdb' over the local Parquet mirror
+WAREHOUSE_BACKEND = os.getenv("WAREHOUSE_BACKEND", "snowflake")
+ANALYTICS_BACKEND = os.getenv("ANALYTICS_BACKEND", WAREHOUSE_BACKEND)  # generated SQL and metric aggregates
+MIRROR_PATH = os.getenv("MIRROR_PATH", "data/mirror")  # month=YYYY-MM/*.parquet
+MIRROR_MONTHS = int(os.getenv("MIRROR_MONTHS", 3))  # months re-exported per mirror run, after a --full one
+DUCKDB_THREADS = int(os.getenv("DUCKDB_THREADS", 4))
+SYNC_CHANGE_COLUMNS = os.getenv(
+    "SYNC_CHANGE_COLUMNS", "ASSIGNED_DATE_TIME,FIRST_ATTEMPT_DATE,FIRST_NDR_RAISED,AWB_DELIVERED_DATE"
+).split(",")  # a row changed when any of these passed its watermark
+SYNC_OVERLAP_SECONDS = int(os.getenv("SYNC_OVERLAP_SECONDS", 3600))  # re-read before the watermark, for late commits
+SYNC_BATCH_ROWS = int(os.getenv("SYNC_BATCH_ROWS", 500000))  # changed rows upserted at a time
+SYNC_COMPACT_MAX_FILES = int(os.getenv("SYNC_COMPACT_MAX_FILES", 8))  # files per month before they are merged
+SYNC_HISTORY_RUNS = int(os.getenv("SYNC_HISTORY_RUNS", 50))  # sync runs kept in the mirror's state
+
 # Query Classification Thresholds
 CONFIDENCE_THRESHOLD = 0.7
-MAX_CONTEXT_LENGTH = 5
+MAX_CONTEXT_LENGTH = 5  # recent turns kept verbatim per session
+
+# Conversation context
+CONTEXT_MAX_ENTITIES = int(os.getenv("CONTEXT_MAX_ENTITIES", 50))  # least recently seen evicted first
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 1500))  # tokens of context handed to agents
+CONTEXT_MAX_RESPONSE_CHARS = int(os.getenv("CONTEXT_MAX_RESPONSE_CHARS", 2000))  # stored per turn
+CONTEXT_SUMMARY_MAX_CHARS = int(os.getenv("CONTEXT_SUMMARY_MAX_CHARS", 1200))
+CONTEXT_STORE = os.getenv("CONTEXT_STORE", "memory")  # 'memory' or 'sqlite'
+CONTEXT_STORE_PATH = os.getenv("CONTEXT_STORE_PATH", "data/context.db")
+CONTEXT_STORE_MAX_SESSIONS = int(os.getenv("CONTEXT_STORE_MAX_SESSIONS", 10000))  # in-memory store only
+CONTEXT_TTL = int(os.getenv("CONTEXT_TTL", 86400))  # seconds since a session's last turn
 import os
 from dotenv import load_dotenv
 
@@ -52,4 +119,46 @@ SNOWFLAKE_CONFIG = {
 TABLE_NAME = "VIEW_TITANIUM_PLATINUM_REPORT"
 SCHEMA_NAME = SNOWFLAKE_CONFIG['schema']
 
+# Bulk AWB lookups per IN-list query, kept under driver bind-parameter limits
+TRACKING_CHUNK_SIZE = int(os.getenv('TRACKING_CHUNK_SIZE', 500))
+TRACKING_QUERY_TIMEOUT = float(os.getenv('TRACKING_QUERY_TIMEOUT', 30))  # seconds per IN-list query
+
+# Tracking Row Cache
+TRACKING_CACHE_MAX_ENTRIES = int(os.getenv('TRACKING_CACHE_MAX_ENTRIES', 200000))
+TRACKING_CACHE_TERMINAL_TTL = int(os.getenv('TRACKING_CACHE_TERMINAL_TTL', 86400))  # delivered, RTO, ...
+TRACKING_CACHE_ACTIVE_TTL = int(os.getenv('TRACKING_CACHE_ACTIVE_TTL', 300))  # in transit
+TRACKING_CACHE_MISS_TTL = int(os.getenv('TRACKING_CACHE_MISS_TTL', 60))  # unknown AWBs
+
+# Local AWB Index (memory-mapped tracking columns, kept current by database.sync)
+AWB_INDEX_PATH = os.getenv('AWB_INDEX_PATH', 'data/awb_index')
+AWB_INDEX_MAX_AGE = int(os.getenv('AWB_INDEX_MAX_AGE', 900))  # seconds since the last sync before active AWBs go to the warehouse
+AWB_INDEX_MAX_DELTAS = int(os.getenv('AWB_INDEX_MAX_DELTAS', 16))  # delta segments before they are merged
+
+# Connection Pool Configuration
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 30))  # seconds to wait for a free connection
+DB_POOL_MAX_IDLE = float(os.getenv('DB_POOL_MAX_IDLE', 600))  # seconds before an idle connection is closed
+DB_POOL_PING_INTERVAL = float(os.getenv('DB_POOL_PING_INTERVAL', 60))  # idle seconds before a health check
+
+# Warehouse Query Limits
+QUERY_TIMEOUT = float(os.getenv('QUERY_TIMEOUT', 120))  # seconds per statement
+QUERY_TIMEOUT_CEILING = int(os.getenv('QUERY_TIMEOUT_CEILING', 600))  # STATEMENT_TIMEOUT_IN_SECONDS of pooled sessions
+QUERY_MAX_ROWS = int(os.getenv('QUERY_MAX_ROWS', 100000))
+QUERY_MAX_BYTES = int(os.getenv('QUERY_MAX_BYTES', 256 * 1024 * 1024))
+QUERY_FETCH_SIZE = int(os.getenv('QUERY_FETCH_SIZE', 10000))  # rows per fetch round trip
+
+# Async Pipeline Concurrency (per process)
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', 8))
+WAREHOUSE_MAX_CONCURRENCY = int(os.getenv('WAREHOUSE_MAX_CONCURRENCY', DB_POOL_SIZE))
+
+# Guardrails for LLM-generated SQL
+SQL_GUARD_DIALECT = os.getenv('SQL_GUARD_DIALECT', 'snowflake')
+SQL_GUARD_WINDOW_DAYS = int(os.getenv('SQL_GUARD_WINDOW_DAYS', 90))  # injected when no ASSIGNED_DATE_TIME filter
+SQL_GUARD_ROW_LIMIT = int(os.getenv('SQL_GUARD_ROW_LIMIT', 10000))
+SQL_GUARD_EXPLAIN = os.getenv('SQL_GUARD_EXPLAIN', 'false').lower() == 'true'
+SQL_GUARD_MAX_BYTES_SCANNED = int(os.getenv('SQL_GUARD_MAX_BYTES_SCANNED', 10 * 1024 ** 3))
+SQL_GUARD_MAX_PARTITIONS = int(os.getenv('SQL_GUARD_MAX_PARTITIONS', 5000))
+SQL_GUARD_BUDGET_ACTION = os.getenv('SQL_GUARD_BUDGET_ACTION', 'rewrite')  # 'rewrite' or 'refuse'
+SQL_GUARD_REWRITE_WINDOW_DAYS = int(os.getenv('SQL_GUARD_REWRITE_WINDOW_DAYS', 30))
+
 # Other configurations remain the same...
\ No newline at end of file
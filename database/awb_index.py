@@ -0,0 +1,286 @@
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from config import AWB_INDEX_PATH, AWB_INDEX_MAX_AGE, AWB_INDEX_MAX_DELTAS
+from database.tracking_cache import TERMINAL_STATUSES, normalize_status
+from utils.tracing import get_tracer
+
+KEY_COLUMN = 'AWB_CODE'
+
+# The tracking columns of DeliveryAgent and how each is stored
+INDEX_COLUMNS = {
+    'SHIPMENT_STATUS': 'category',
+    'ASSIGNED_DATE_TIME': 'datetime',
+    'FIRST_ATTEMPT_DATE': 'datetime',
+    'AWB_DELIVERED_DATE': 'datetime',
+    'NO_OF_ATTEMPTS': 'number',
+    'NDR_RAISED_SHIPMENTS': 'number',
+    'PARENT_COURIER': 'category',
+    'ZONE': 'category',
+    'CITY_TIER': 'category'
+}
+
+class _Segment:
+    """One immutable, memory-mapped run of tracking rows sorted by AWB.
+
+    ``keys.npy`` holds the AWB codes as fixed-width bytes; every column is an
+    array aligned with it: dictionary codes (-1 for null) for text,
+    datetime64 for timestamps and float32 (NaN for null) for numbers.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.categories = json.load(f)['categories']
+        self.keys = np.load(os.path.join(path, "keys.npy"), mmap_mode='r')
+        self.columns = {col: np.load(os.path.join(path, f"{col}.npy"), mmap_mode='r') for col in INDEX_COLUMNS}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def find(self, keys: np.ndarray) -> np.ndarray:
+        """Row of each key, or -1; ``keys`` must have this segment's dtype"""
+        if not len(self.keys):
+            return np.full(len(keys), -1)
+        positions = np.searchsorted(self.keys, keys)
+        clipped = np.minimum(positions, len(self.keys) - 1)
+        return np.where(self.keys[clipped] == keys, clipped, -1)
+
+    def row(self, position: int) -> Dict[str, Any]:
+        row = {KEY_COLUMN: self.keys[position].decode()}
+        for col, kind in INDEX_COLUMNS.items():
+            value = self.columns[col][position]
+            if kind == 'category':
+                row[col] = self.categories[col][value] if value >= 0 else None
+            elif kind == 'datetime':
+                row[col] = pd.Timestamp(value)  # NaT when null, as from the warehouse
+            else:
+                row[col] = None if np.isnan(value) else int(value)
+        return row
+
+    def table(self) -> pa.Table:
+        """The segment's rows, for merging segments"""
+        data = {KEY_COLUMN: pa.array(np.char.decode(np.asarray(self.keys)))}
+        for col, kind in INDEX_COLUMNS.items():
+            values = np.asarray(self.columns[col])
+            if kind == 'category':
+                # Code -1 picks the trailing None
+                data[col] = pa.array(np.array(self.categories[col] + [None], dtype=object)[values], pa.string())
+            else:
+                data[col] = pa.array(values, from_pandas=True)
+        return pa.table(data)
+
+class AwbIndex:
+    """Memory-mapped AWB -> tracking row index of the local mirror.
+
+    A base segment is built from the whole mirror; each sync adds a delta
+    segment of the rows it changed, and lookups try the newest segment first,
+    so a binary search per segment finds the current row. Deltas are merged
+    once there are more than ``max_deltas``, into the base when they have
+    grown to a tenth of it. ``_index.json`` lists the live segments and is
+    replaced atomically; readers in other processes notice and remap.
+
+    Only pages touched by lookups are resident: about 50 bytes per AWB on
+    disk, so tens of millions of AWBs stay in the page cache's hands.
+    """
+
+    def __init__(self,
+                 path: str = AWB_INDEX_PATH,
+                 max_age: int = AWB_INDEX_MAX_AGE,
+                 max_deltas: int = AWB_INDEX_MAX_DELTAS,
+                 terminal_statuses=TERMINAL_STATUSES):
+        self.path = path
+        self.manifest_path = os.path.join(path, "_index.json")
+        self.max_age = max_age
+        self.max_deltas = max_deltas
+        self.terminal_statuses = {normalize_status(s) for s in terminal_statuses}
+        self._segments: List[_Segment] = []
+        self._manifest: Dict[str, Any] = {}
+        self._signature = None
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def get_many(self, awbs: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Rows for the AWBs the index can answer.
+
+        Shipments in a terminal status are served however old the index is;
+        others only while the last sync is at most ``max_age`` seconds old.
+        Anything missing is for the caller to fetch from the warehouse.
+        """
+        with get_tracer().span("awb_index", "index", awbs=len(awbs)) as span:
+            segments, manifest = self._current()
+            fresh = time.time() - manifest.get('synced_at', 0) <= self.max_age
+            rows: Dict[str, Dict[str, Any]] = {}
+            pending = list(dict.fromkeys(awb.upper() for awb in awbs))
+            for segment in reversed(segments):  # newest first
+                if not pending:
+                    break
+                width = segment.keys.dtype.itemsize
+                candidates = [awb for awb in pending if len(awb.encode()) <= width]
+                if not candidates:
+                    continue
+                positions = segment.find(np.array([awb.encode() for awb in candidates], dtype=segment.keys.dtype))
+                found = set()
+                for awb, position in zip(candidates, positions):
+                    if position < 0:
+                        continue
+                    found.add(awb)
+                    row = segment.row(int(position))
+                    if fresh or normalize_status(row['SHIPMENT_STATUS']) in self.terminal_statuses:
+                        rows[awb] = row
+                pending = [awb for awb in pending if awb not in found]
+            span.set(hits=len(rows))
+            return rows
+
+    @property
+    def built(self) -> bool:
+        return bool(self._read_manifest().get('segments'))
+
+    def get(self, awb: str) -> Optional[Dict[str, Any]]:
+        return self.get_many([awb]).get(awb.upper())
+
+    def build(self, mirror) -> Dict[str, Any]:
+        """Rebuild the index from every file of a ParquetMirror"""
+        started = time.perf_counter()
+        files = [f for month in mirror.months() for f in mirror.files(month)]
+        columns = [KEY_COLUMN, *INDEX_COLUMNS]
+        tables = []
+        for path in files:
+            available = set(pq.read_schema(path).names)
+            tables.append(pq.read_table(path, columns=[c for c in columns if c in available]))
+        table = pa.concat_tables(tables, promote_options='default') if tables else pa.table({KEY_COLUMN: pa.array([], pa.string())})
+        with self._write_lock:
+            name = self._write_segment(table)
+            self._publish([name], synced_at=time.time())
+        return {'rows': table.num_rows, 'seconds': round(time.perf_counter() - started, 2)}
+
+    def add(self, rows) -> None:
+        """Add changed rows (a DataFrame or Arrow table) as a delta segment"""
+        table = rows if isinstance(rows, pa.Table) else pa.Table.from_pandas(rows, preserve_index=False)
+        with self._write_lock:
+            manifest = self._read_manifest()
+            name = self._write_segment(table)
+            segments = manifest.get('segments', []) + [name]
+            if len(segments) - 1 > self.max_deltas:
+                segments = self._merge(segments)
+            self._publish(segments, synced_at=manifest.get('synced_at', 0))
+
+    def mark_synced(self) -> None:
+        """Record that the index reflects a sync that has just finished"""
+        with self._write_lock:
+            manifest = self._read_manifest()
+            if manifest.get('segments'):
+                self._publish(manifest['segments'], synced_at=time.time())
+
+    def stats(self) -> Dict[str, Any]:
+        segments, manifest = self._current()
+        return {
+            'segments': len(segments),
+            'rows': sum(len(s) for s in segments),
+            'bytes': sum(os.path.getsize(os.path.join(s.path, f)) for s in segments for f in os.listdir(s.path)),
+            'synced_at': manifest.get('synced_at'),
+            'updated_at': manifest.get('updated_at')
+        }
+
+    def _current(self):
+        """Live segments, remapped when another process has published new ones"""
+        try:
+            st = os.stat(self.manifest_path)
+            signature = (st.st_ino, st.st_mtime_ns)
+        except OSError:
+            return [], {}
+        if signature != self._signature:
+            with self._lock:
+                if signature != self._signature:
+                    try:
+                        manifest = self._read_manifest()
+                        self._segments = [_Segment(os.path.join(self.path, name)) for name in manifest.get('segments', [])]
+                        self._manifest = manifest
+                        self._signature = signature
+                    except (OSError, ValueError, KeyError):
+                        return [], {}  # mid-publish; the warehouse answers meanwhile
+        return self._segments, self._manifest
+
+    def _merge(self, segments: List[str]) -> List[str]:
+        """Merge the deltas, into the base too once they have grown to a tenth of it"""
+        loaded = [_Segment(os.path.join(self.path, name)) for name in segments]
+        base, deltas = loaded[0], loaded[1:]
+        if sum(len(d) for d in deltas) * 10 >= len(base):
+            return [self._write_segment(pa.concat_tables([s.table() for s in loaded], promote_options='default'))]
+        return [segments[0], self._write_segment(pa.concat_tables([d.table() for d in deltas], promote_options='default'))]
+
+    def _write_segment(self, table: pa.Table) -> str:
+        """Write rows as a new segment; the last row of a repeated AWB wins"""
+        table = table.filter(pc.is_valid(table[KEY_COLUMN]))
+        keys = pc.utf8_upper(table[KEY_COLUMN].cast(pa.string())).to_numpy(zero_copy_only=False)
+        keys = keys.astype('S') if len(keys) else np.array([], dtype='S1')
+        order = np.argsort(keys, kind='stable')
+        keys = keys[order]
+        last = np.append(keys[1:] != keys[:-1], True) if len(keys) else np.array([], dtype=bool)
+        order, keys = order[last], keys[last]
+
+        name = f"seg-{time.time_ns():x}"
+        staging = os.path.join(self.path, f".tmp-{name}")
+        os.makedirs(staging)
+        np.save(os.path.join(staging, "keys.npy"), keys)
+        categories = {}
+        for col, kind in INDEX_COLUMNS.items():
+            column = table[col] if col in table.column_names else pa.chunked_array([pa.nulls(table.num_rows)])
+            if kind == 'category':
+                encoded = pc.dictionary_encode(column.cast(pa.string())).combine_chunks()
+                values = encoded.indices.fill_null(-1).to_numpy(zero_copy_only=False).astype('int32')
+                categories[col] = encoded.dictionary.to_pylist()
+            elif kind == 'datetime':
+                values = column.cast(pa.timestamp('us')).to_numpy(zero_copy_only=False)
+            else:
+                values = column.cast(pa.float32()).to_numpy(zero_copy_only=False)
+            np.save(os.path.join(staging, f"{col}.npy"), values[order])
+        with open(os.path.join(staging, "meta.json"), "w") as f:
+            json.dump({'rows': len(keys), 'categories': categories}, f)
+        os.replace(staging, os.path.join(self.path, name))
+        return name
+
+    def _publish(self, segments: List[str], synced_at: float) -> None:
+        """Make ``segments`` the live ones and drop the rest"""
+        manifest = {'segments': segments, 'synced_at': synced_at, 'updated_at': datetime.now().isoformat()}
+        with open(self.manifest_path + ".tmp", "w") as f:
+            json.dump(manifest, f)
+        os.replace(self.manifest_path + ".tmp", self.manifest_path)
+        # Readers that mapped a dropped segment keep their mapping until they remap
+        for entry in os.listdir(self.path):
+            if entry.startswith(("seg-", ".tmp-seg-")) and entry not in segments:
+                shutil.rmtree(os.path.join(self.path, entry), ignore_errors=True)
+
+    def _read_manifest(self) -> Dict[str, Any]:
+        os.makedirs(self.path, exist_ok=True)
+        try:
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+_index: Optional[AwbIndex] = None
+_index_lock = threading.Lock()
+
+def get_awb_index() -> AwbIndex:
+    """Get the process-wide AWB index, creating it on first use"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = AwbIndex()
+    return _index
+
+if __name__ == "__main__":
+    # Rebuild from the mirror, e.g. after python -m database.backends: python -m database.awb_index
+    from database.backends import ParquetMirror
+    print(get_awb_index().build(ParquetMirror()))
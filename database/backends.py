@@ -0,0 +1,337 @@
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import sqlglot
+from config import (
+    SNOWFLAKE_CONFIG,
+    TABLE_NAME,
+    WAREHOUSE_BACKEND,
+    MIRROR_PATH,
+    MIRROR_MONTHS,
+    DUCKDB_THREADS
+)
+
+# Agents, metrics and the SQL guard all write Snowflake SQL
+SOURCE_DIALECT = 'snowflake'
+
+DATE_COLUMN = 'ASSIGNED_DATE_TIME'
+
+class MirrorNotReadyError(Exception):
+    """Raised when the local mirror has no data to query yet"""
+
+@lru_cache(maxsize=4096)
+def transpile(sql: str, dialect: str) -> str:
+    """Snowflake SQL rewritten for ``dialect``; memoized, as agents repeat their queries"""
+    if dialect == SOURCE_DIALECT:
+        return sql
+    return sqlglot.transpile(sql, read=SOURCE_DIALECT, write=dialect)[0]
+
+class TranspilingCursor:
+    """Cursor that takes Snowflake SQL and runs it in another dialect"""
+
+    def __init__(self, cursor, dialect: str):
+        self._cursor = cursor
+        self._dialect = dialect
+
+    def execute(self, query: str, params: Any = None):
+        query = transpile(query, self._dialect)
+        return self._cursor.execute(query, params) if params else self._cursor.execute(query)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._cursor, name)  # fetch*, description, interrupt, close, ...
+
+class TranspilingConnection:
+    """Connection handing out TranspilingCursors"""
+
+    def __init__(self, connection, dialect: str):
+        self._connection = connection
+        self._dialect = dialect
+
+    def cursor(self) -> TranspilingCursor:
+        return TranspilingCursor(self._connection.cursor(), self._dialect)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._connection, name)
+
+class WarehouseBackend:
+    """Where statements on the shipment view run; ``connect`` feeds a ConnectionPool"""
+
+    name = 'base'
+    dialect = SOURCE_DIALECT
+
+    @property
+    def table(self) -> str:
+        """The shipment view as statements on this backend name it"""
+        return TABLE_NAME
+
+    def connect(self):
+        raise NotImplementedError
+
+    def ready(self) -> bool:
+        """Whether it holds the whole view, so any query may be routed to it"""
+        return True
+
+class SnowflakeBackend(WarehouseBackend):
+    """The Snowflake warehouse, the source of truth"""
+
+    name = 'snowflake'
+
+    @property
+    def table(self) -> str:
+        schema = SNOWFLAKE_CONFIG['schema']
+        return f"{schema}.{TABLE_NAME}" if schema else TABLE_NAME
+
+    def connect(self):
+        from database.connector import get_db_connection
+        return get_db_connection()
+
+class DuckDBBackend(WarehouseBackend):
+    """In-process DuckDB over the local Parquet mirror of the shipment view.
+
+    Statements are transpiled from Snowflake SQL, so agents, generated SQL
+    and cached SQL need no changes. Each connection is a cursor of one shared
+    in-memory database, which DuckDB allows to be used from its own thread.
+    """
+
+    name = 'duckdb'
+    dialect = 'duckdb'
+
+    def __init__(self, mirror_path: str = MIRROR_PATH, threads: int = DUCKDB_THREADS):
+        self.mirror = ParquetMirror(mirror_path)
+        self.threads = threads
+        self._db = None
+        self._ready = False
+        self._lock = threading.Lock()
+
+    def connect(self) -> TranspilingConnection:
+        return TranspilingConnection(self.database().cursor(), self.dialect)
+
+    def ready(self) -> bool:
+        # A mirror of the latest months would answer older periods with partial sums
+        if not self._ready:
+            self._ready = self.mirror.full_history
+        return self._ready
+
+    def database(self):
+        """The shared DuckDB database, with the shipment view over the mirror's files"""
+        if self._db is None:
+            with self._lock:
+                if self._db is None:
+                    import duckdb
+
+                    if not self.mirror.months():
+                        raise MirrorNotReadyError(
+                            f"No mirrored data in {self.mirror.path}; run python -m database.sync or "
+                            "python -m database.backends --full first"
+                        )
+                    db = duckdb.connect(config={'threads': self.threads})
+                    # The glob is expanded per query, so newly mirrored months are picked up
+                    db.execute(f"""
+                        CREATE VIEW {TABLE_NAME} AS
+                        SELECT * FROM read_parquet('{self.mirror.glob}', union_by_name = true)
+                    """)
+                    self._db = db
+        return self._db
+
+class ParquetMirror:
+    """Local copy of the shipment view as Parquet, one directory per month.
+
+    Files live in ``<path>/month=YYYY-MM/``. ``export`` re-reads whole months
+    of ASSIGNED_DATE_TIME from the warehouse and swaps each month in once it
+    is completely written, so readers never see a half-written month (only,
+    for the instant between two renames, none).
+    """
+
+    def __init__(self, path: str = MIRROR_PATH):
+        self.path = path
+        self.state_path = os.path.join(path, "_mirror.json")
+        self._lock = threading.Lock()
+
+    @property
+    def glob(self) -> str:
+        return os.path.join(self.path, "month=*", "*.parquet")
+
+    def months(self) -> List[str]:
+        """Mirrored months, oldest first"""
+        try:
+            entries = os.listdir(self.path)
+        except OSError:
+            return []
+        return sorted(entry[len("month="):] for entry in entries if entry.startswith("month="))
+
+    @property
+    def full_history(self) -> bool:
+        """Whether every month of the view has been exported, not just the latest ones"""
+        return bool(self._state().get('full_history')) and bool(self.months())
+
+    def month_dir(self, month: str) -> str:
+        return os.path.join(self.path, f"month={month}")
+
+    def files(self, month: str) -> List[str]:
+        """Parquet files currently holding a month"""
+        month_dir = self.month_dir(month)
+        try:
+            return sorted(os.path.join(month_dir, f) for f in os.listdir(month_dir) if f.endswith(".parquet"))
+        except OSError:
+            return []
+
+    def staging_dir(self, month: str) -> str:
+        """Empty directory to write a month's next version into, for replace_month"""
+        staging = os.path.join(self.path, f".tmp-{month}")
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        return staging
+
+    def recover(self) -> None:
+        """Finish or undo month swaps cut short by a crash"""
+        try:
+            entries = os.listdir(self.path)
+        except OSError:
+            return
+        for entry in entries:
+            if entry.startswith(".old-"):
+                target = self.month_dir(entry[len(".old-"):])
+                if os.path.exists(target):
+                    shutil.rmtree(os.path.join(self.path, entry), ignore_errors=True)
+                else:
+                    os.replace(os.path.join(self.path, entry), target)
+            elif entry.startswith(".tmp-"):
+                shutil.rmtree(os.path.join(self.path, entry), ignore_errors=True)
+
+    def export(self, months: int = MIRROR_MONTHS, full: bool = False, pool=None) -> Dict[str, Any]:
+        """Copy the latest ``months`` months (all of them with ``full``) from the warehouse.
+
+        ``pool`` is where the view is read from; by default the process-wide pool.
+        """
+        from database.connector import run_query
+
+        started = time.perf_counter()
+        with self._lock:
+            self.recover()
+            bounds = run_query(f"SELECT MIN({DATE_COLUMN}), MAX({DATE_COLUMN}) FROM {TABLE_NAME}", pool=pool).frame
+            first, last = bounds.iloc[0, 0], bounds.iloc[0, 1]
+            if pd.isna(last):
+                return {'months': [], 'rows': 0, 'seconds': 0.0}
+            last_month = pd.Timestamp(last).to_period('M')
+            first_month = pd.Timestamp(first).to_period('M') if full else last_month - (months - 1)
+
+            exported, rows = [], 0
+            for period in pd.period_range(first_month, last_month, freq='M'):
+                rows += self._export_month(period, pool)
+                exported.append(str(period))
+
+            state = self._state()
+            state.update({'exported_at': datetime.now().isoformat(), 'last_export': exported})
+            if full:
+                state['full_history'] = True
+            self._write_state(state)
+        seconds = time.perf_counter() - started
+        return {'months': exported, 'rows': rows, 'seconds': round(seconds, 2),
+                'rows_per_second': int(rows / seconds) if seconds else 0}
+
+    def _export_month(self, period: pd.Period, pool=None) -> int:
+        from database.connector import iter_query_batches
+
+        query = f"SELECT * FROM {TABLE_NAME} WHERE {DATE_COLUMN} >= ? AND {DATE_COLUMN} < ?"
+        params = [period.start_time.to_pydatetime(), (period + 1).start_time.to_pydatetime()]
+        tmp_dir = self.staging_dir(str(period))
+
+        rows, writer = 0, None
+        try:
+            for frame in iter_query_batches(query, params, timeout=None, pool=pool):
+                table = pa.Table.from_pandas(frame, preserve_index=False)
+                if writer is not None and not table.schema.equals(writer.schema):
+                    try:
+                        table = table.cast(writer.schema)
+                    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+                        # e.g. a column that was all null so far; readers merge files by name
+                        writer.close()
+                        writer = None
+                if writer is None:
+                    writer = pq.ParquetWriter(os.path.join(tmp_dir, f"part-{uuid.uuid4().hex[:8]}.parquet"),
+                                              table.schema)
+                writer.write_table(table)
+                rows += table.num_rows
+        finally:
+            if writer is not None:
+                writer.close()
+        self.replace_month(str(period), tmp_dir)
+        return rows
+
+    def replace_month(self, month: str, new_dir: str) -> None:
+        """Swap a fully written directory in as the month's data"""
+        target = self.month_dir(month)
+        old_dir = os.path.join(self.path, f".old-{month}")
+        shutil.rmtree(old_dir, ignore_errors=True)
+        if os.path.exists(target):
+            os.replace(target, old_dir)
+        if os.listdir(new_dir):
+            os.replace(new_dir, target)
+        else:
+            shutil.rmtree(new_dir)  # no rows left in that month
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+    def stats(self) -> Dict[str, Any]:
+        months = self.months()
+        files = [f for m in months for f in self.files(m)]
+        return {
+            'months': len(months),
+            'first_month': months[0] if months else None,
+            'last_month': months[-1] if months else None,
+            'files': len(files),
+            'bytes': sum(os.path.getsize(f) for f in files),
+            'exported_at': self._state().get('exported_at')
+        }
+
+    def _state(self) -> Dict[str, Any]:
+        try:
+            with open(self.state_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_state(self, state: Dict[str, Any]) -> None:
+        os.makedirs(self.path, exist_ok=True)
+        with open(self.state_path + ".tmp", "w") as f:
+            json.dump(state, f)
+        os.replace(self.state_path + ".tmp", self.state_path)
+
+BACKENDS = {
+    'snowflake': SnowflakeBackend,
+    'duckdb': DuckDBBackend
+}
+
+_backends: Dict[str, WarehouseBackend] = {}
+_backends_lock = threading.Lock()
+
+def get_backend(name: Optional[str] = None) -> WarehouseBackend:
+    """Get the process-wide backend called ``name`` (default WAREHOUSE_BACKEND)"""
+    name = (name or WAREHOUSE_BACKEND).lower()
+    if name not in _backends:
+        with _backends_lock:
+            if name not in _backends:
+                if name not in BACKENDS:
+                    raise ValueError(f"Unknown warehouse backend: {name} (expected one of {sorted(BACKENDS)})")
+                _backends[name] = BACKENDS[name]()
+    return _backends[name]
+
+if __name__ == "__main__":
+    # Scheduled mirror job, run against Snowflake: python -m database.backends [--months N | --full]
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Mirror the shipment view into local Parquet")
+    parser.add_argument("--months", type=int, default=MIRROR_MONTHS)
+    parser.add_argument("--full", action="store_true")
+    args = parser.parse_args()
+
+    from database.connector import ConnectionPool
+    print(ParquetMirror().export(args.months, args.full, pool=ConnectionPool(SnowflakeBackend().connect)))
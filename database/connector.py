@@ -1,26 +1,344 @@
+import itertools
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
 import snowflake.connector
 from snowflake.connector.pandas_tools import write_pandas
 import pandas as pd
-from config import SNOWFLAKE_CONFIG
+import pyarrow as pa
+from config import (
+    SNOWFLAKE_CONFIG,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT,
+    DB_POOL_MAX_IDLE,
+    DB_POOL_PING_INTERVAL,
+    QUERY_TIMEOUT,
+    QUERY_TIMEOUT_CEILING,
+    QUERY_MAX_ROWS,
+    QUERY_MAX_BYTES,
+    QUERY_FETCH_SIZE,
+    WAREHOUSE_BACKEND,
+    ANALYTICS_BACKEND
+)
 from contextlib import contextmanager
+from database.schema import compact_arrow, compact_shipments
+from database.backends import get_backend
+from utils.tracing import Span, current_span, get_tracer
+
+# Agents bind parameters with '?' placeholders
+snowflake.connector.paramstyle = 'qmark'
+
+class PoolTimeoutError(Exception):
+    """Raised when no pooled connection becomes available in time"""
+
+class QueryTimeoutError(Exception):
+    """Raised when a statement runs longer than its timeout"""
+
+class QueryCancelledError(Exception):
+    """Raised when a statement is cancelled through its CancellationToken"""
+
+class CancellationToken:
+    """Cooperative cancellation flag shared by the UI and the queries it started.
+
+    Running queries register an interrupt callback, so cancelling also stops
+    a statement that is still executing in the warehouse.
+    """
+
+    def __init__(self):
+        self._cancelled = False
+        self._callbacks: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    def cancel(self) -> None:
+        with self._lock:
+            if self._cancelled:
+                return
+            self._cancelled = True
+            callbacks = list(self._callbacks)
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+    def raise_if_cancelled(self) -> None:
+        if self._cancelled:
+            raise QueryCancelledError("Query was cancelled")
+
+    def register(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """Call ``callback`` on cancel (immediately if already cancelled); returns an unregister function"""
+        with self._lock:
+            if not self._cancelled:
+                self._callbacks.append(callback)
+                return lambda: self._unregister(callback)
+        callback()
+        return lambda: None
+
+    def _unregister(self, callback: Callable[[], None]) -> None:
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+class QueryResult:
+    """Rows fetched by ``run_query``, possibly cut off at the row or byte cap"""
+
+    def __init__(self, frame: pd.DataFrame, truncated: bool, truncated_by: Optional[str],
+                 num_bytes: int, elapsed: float):
+        self.frame = frame
+        self.truncated = truncated
+        self.truncated_by = truncated_by  # 'max_rows' or 'max_bytes'
+        self.num_bytes = num_bytes
+        self.elapsed = elapsed
+
+    @property
+    def row_count(self) -> int:
+        return len(self.frame)
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of database connections.
+
+    Connections are created lazily through ``connect`` so the pool works with
+    any DBAPI driver, e.g. ``sqlite3`` as a local stand-in for Snowflake.
+    """
+
+    def __init__(self,
+                 connect: Callable[[], Any],
+                 max_size: int = DB_POOL_SIZE,
+                 checkout_timeout: float = DB_POOL_TIMEOUT,
+                 max_idle: float = DB_POOL_MAX_IDLE,
+                 ping_interval: float = DB_POOL_PING_INTERVAL,
+                 ping_query: str = "SELECT 1"):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self._connect = connect
+        self.max_size = max_size
+        self.checkout_timeout = checkout_timeout
+        self.max_idle = max_idle
+        self.ping_interval = ping_interval
+        self.ping_query = ping_query
+
+        self._idle = deque()  # (connection, returned_at), most recent on the right
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition(threading.Lock())
+        self._stats = {
+            'created': 0,
+            'closed': 0,
+            'checkouts': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'evicted_idle': 0,
+            'health_check_failures': 0,
+            'total_wait_seconds': 0.0
+        }
+
+    def acquire(self, timeout: Optional[float] = None):
+        """Check out a healthy connection, waiting up to ``timeout`` seconds"""
+        timeout = self.checkout_timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+
+        while True:
+            conn, returned_at = self._checkout(deadline)
+            if conn is None:
+                # A slot was reserved for a new connection
+                try:
+                    conn = self._connect()
+                except Exception:
+                    self._release_slot()
+                    raise
+                with self._cond:
+                    self._stats['created'] += 1
+            elif time.monotonic() - returned_at >= self.ping_interval and not self._is_healthy(conn):
+                with self._cond:
+                    self._stats['health_check_failures'] += 1
+                self._discard(conn)
+                continue
+
+            with self._cond:
+                self._stats['checkouts'] += 1
+                self._stats['total_wait_seconds'] += time.monotonic() - started
+            return conn
+
+    def release(self, conn, discard: bool = False) -> None:
+        """Return a connection to the pool"""
+        if discard or self._closed or self._is_closed(conn):
+            self._discard(conn)
+            return
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None):
+        """Borrow a connection for the duration of a ``with`` block"""
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool-level counters and current occupancy"""
+        with self._cond:
+            self._evict_idle()
+            stats = dict(self._stats)
+            stats.update({
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle)
+            })
+        checkouts = stats['checkouts']
+        stats['avg_wait_ms'] = round(stats.pop('total_wait_seconds') / checkouts * 1000, 3) if checkouts else 0.0
+        return stats
+
+    def close(self) -> None:
+        """Close idle connections; borrowed ones are closed when released"""
+        with self._cond:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._cond.notify_all()
+        for conn in idle:
+            self._discard(conn)
+
+    def _checkout(self, deadline: float):
+        """Pop an idle connection or reserve a slot for a new one"""
+        with self._cond:
+            waited = False
+            while True:
+                if self._closed:
+                    raise PoolTimeoutError("Connection pool is closed")
+                self._evict_idle()
+                if self._idle:
+                    return self._idle.pop()
+                if self._size < self.max_size:
+                    self._size += 1
+                    return None, None
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolTimeoutError(
+                        f"No database connection available after waiting; "
+                        f"{self._size} of {self.max_size} in use"
+                    )
+                if not waited:
+                    self._stats['waits'] += 1
+                    waited = True
+                self._cond.wait(remaining)
+
+    def _evict_idle(self) -> None:
+        """Close connections idle for longer than ``max_idle`` (lock held)"""
+        now = time.monotonic()
+        while self._idle and now - self._idle[0][1] > self.max_idle:
+            conn, _ = self._idle.popleft()
+            self._size -= 1
+            self._stats['evicted_idle'] += 1
+            self._stats['closed'] += 1
+            self._close_quietly(conn)
+
+    def _discard(self, conn) -> None:
+        self._close_quietly(conn)
+        with self._cond:
+            self._stats['closed'] += 1
+        self._release_slot()
+
+    def _release_slot(self) -> None:
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def _is_healthy(self, conn) -> bool:
+        try:
+            cur = conn.cursor()
+            try:
+                cur.execute(self.ping_query)
+                cur.fetchall()
+            finally:
+                cur.close()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _is_closed(conn) -> bool:
+        is_closed = getattr(conn, 'is_closed', None)
+        try:
+            return bool(is_closed()) if callable(is_closed) else False
+        except Exception:
+            return True
+
+    @staticmethod
+    def _close_quietly(conn) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+_pool: Optional[ConnectionPool] = None
+_analytics_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> ConnectionPool:
+    """Get the process-wide connection pool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(get_backend().connect)
+    return _pool
+
+def get_analytics_pool() -> ConnectionPool:
+    """Pool for read-heavy analytics; the main pool unless ANALYTICS_BACKEND differs.
+
+    Also the main pool until that backend holds the whole view (a full mirror),
+    since a query for an older period would otherwise get partial sums.
+    """
+    global _analytics_pool
+    if ANALYTICS_BACKEND.lower() == WAREHOUSE_BACKEND.lower():
+        return get_pool()
+    backend = get_backend(ANALYTICS_BACKEND)
+    if not backend.ready():
+        return get_pool()
+    if _analytics_pool is None:
+        with _pool_lock:
+            if _analytics_pool is None:
+                _analytics_pool = ConnectionPool(backend.connect)
+    return _analytics_pool
+
+def configure_pool(connect: Callable[[], Any] = None, **pool_kwargs) -> ConnectionPool:
+    """Replace the process-wide pool, e.g. with a local stand-in backend; by default on WAREHOUSE_BACKEND"""
+    global _pool
+    with _pool_lock:
+        old_pool = _pool
+        _pool = ConnectionPool(connect or get_backend().connect, **pool_kwargs)
+    if old_pool is not None:
+        old_pool.close()
+    return _pool
 
 def init_db():
     """Initialize database connection and verify connectivity"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Test the connection
-        cursor.execute(f"SELECT 1 FROM {SNOWFLAKE_CONFIG['schema']}.VIEW_TITANIUM_PLATINUM_REPORT LIMIT 1")
-        
-        cursor.close()
-        conn.close()
+        with get_db_session() as conn:
+            cursor = conn.cursor()
+
+            # Test the connection
+            cursor.execute(f"SELECT 1 FROM {get_backend().table} LIMIT 1")
+
+            cursor.close()
         return True
     except Exception as e:
         raise Exception(f"Failed to initialize database connection: {str(e)}")
 
 def get_db_connection():
-    """Create Snowflake connection"""
+    """Create a new, unpooled Snowflake connection"""
     return snowflake.connector.connect(
         user=SNOWFLAKE_CONFIG['user'],
         password=SNOWFLAKE_CONFIG['password'],
@@ -28,19 +346,273 @@ def get_db_connection():
         warehouse=SNOWFLAKE_CONFIG['warehouse'],
         database=SNOWFLAKE_CONFIG['database'],
         schema=SNOWFLAKE_CONFIG['schema'],
-        role=SNOWFLAKE_CONFIG['role']
+        role=SNOWFLAKE_CONFIG['role'],
+        # Server-side backstop for statements whose client went away
+        session_parameters={'STATEMENT_TIMEOUT_IN_SECONDS': QUERY_TIMEOUT_CEILING}
     )
 
 @contextmanager
 def get_db_session():
-    """Get database session"""
-    conn = get_db_connection()
-    try:
+    """Borrow a connection from the pool"""
+    with get_pool().connection() as conn:
         yield conn
+
+def run_query(query: str,
+              params: Sequence = None,
+              timeout: Optional[float] = QUERY_TIMEOUT,
+              max_rows: Optional[int] = QUERY_MAX_ROWS,
+              max_bytes: Optional[int] = QUERY_MAX_BYTES,
+              cancel_token: Optional[CancellationToken] = None,
+              fetch_size: int = QUERY_FETCH_SIZE,
+              compact: bool = False,
+              pool: Optional[ConnectionPool] = None) -> QueryResult:
+    """Run a statement on a pooled connection with a timeout, cancellation and size caps.
+
+    Rows beyond ``max_rows`` or ``max_bytes`` are not fetched and the result
+    is flagged as truncated. Raises QueryTimeoutError or QueryCancelledError
+    when the statement is interrupted. With ``compact``, shipment columns are
+    converted to the compact dtypes of ``database.schema`` as they are fetched.
+    ``pool`` defaults to the process-wide pool.
+    """
+    started = time.monotonic()
+    with get_tracer().span("warehouse", "warehouse") as span:
+        with _running_statement(query, params, timeout, cancel_token, pool) as cur:
+            columns = [d[0] for d in cur.description or []]
+            batches = _arrow_batches(cur, fetch_size)
+            if batches is not None:
+                frame, truncated_by, num_bytes = _collect_arrow(batches, columns, max_rows, max_bytes, cancel_token, compact)
+            else:
+                frame, truncated_by, num_bytes = _collect_rows(cur, columns, max_rows, max_bytes, fetch_size, cancel_token)
+                if compact:
+                    frame = compact_shipments(frame)
+        span.set(rows=len(frame), bytes=num_bytes, truncated=truncated_by)
+
+    return QueryResult(frame, truncated_by is not None, truncated_by, num_bytes, time.monotonic() - started)
+
+def iter_query_batches(query: str,
+                       params: Sequence = None,
+                       timeout: Optional[float] = QUERY_TIMEOUT,
+                       cancel_token: Optional[CancellationToken] = None,
+                       fetch_size: int = QUERY_FETCH_SIZE,
+                       compact: bool = False,
+                       pool: Optional[ConnectionPool] = None) -> Iterator[pd.DataFrame]:
+    """Yield the result as DataFrames of about ``fetch_size`` rows, without caps.
+
+    For callers that aggregate or write out results as they arrive; the
+    pooled connection is held until the iterator is exhausted or closed.
+    """
+    # Not made the current span: the caller's own work runs between batches
+    span = Span("warehouse", "warehouse", current_span(), streamed=True)
+    rows_seen, error = 0, None
+    try:
+        with _running_statement(query, params, timeout, cancel_token, pool) as cur:
+            columns = [d[0] for d in cur.description or []]
+            batches = _arrow_batches(cur, fetch_size)
+            if batches is not None:
+                for batch in batches:
+                    if cancel_token is not None:
+                        cancel_token.raise_if_cancelled()
+                    if batch.num_rows:
+                        rows_seen += batch.num_rows
+                        yield _arrow_to_pandas(batch, compact)
+            else:
+                while True:
+                    if cancel_token is not None:
+                        cancel_token.raise_if_cancelled()
+                    rows = cur.fetchmany(fetch_size)
+                    if not rows:
+                        break
+                    rows_seen += len(rows)
+                    frame = pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+                    yield compact_shipments(frame) if compact else frame
+    except Exception as e:
+        error = e
+        raise
     finally:
-        conn.close()
+        span.set(rows=rows_seen)
+        span.finish(error)
+        get_tracer().record(span)
+
+@contextmanager
+def _running_statement(query: str,
+                       params: Optional[Sequence],
+                       timeout: Optional[float],
+                       cancel_token: Optional[CancellationToken],
+                       pool: Optional[ConnectionPool] = None):
+    """Execute a statement on a pooled connection and yield its cursor.
+
+    The timeout and cancellation stay armed while the caller fetches, and
+    interruptions surface as QueryTimeoutError / QueryCancelledError.
+    """
+    if cancel_token is not None:
+        cancel_token.raise_if_cancelled()
+
+    started = time.monotonic()
+    interrupted = {'reason': None}
+    with (pool or get_pool()).connection() as conn:
+        cur = conn.cursor()
+        interrupt = _interrupter(conn, cur)
+
+        def stop(reason: str) -> None:
+            if interrupted['reason'] is None:
+                interrupted['reason'] = reason
+                interrupt()
+
+        watchdog = None
+        if timeout and not _is_snowflake(conn):
+            watchdog = threading.Timer(timeout, stop, args=('timeout',))
+            watchdog.daemon = True
+            watchdog.start()
+        unregister = cancel_token.register(lambda: stop('cancelled')) if cancel_token else None
 
-def execute_query(query: str, params: dict = None):
+        try:
+            if _is_snowflake(conn) and timeout:
+                # The connector aborts the statement server-side after ``timeout``
+                cur.execute(query, params or None, timeout=int(max(1, timeout)))
+            elif params:
+                cur.execute(query, params)
+            else:
+                cur.execute(query)
+            yield cur
+        except Exception as e:
+            elapsed = time.monotonic() - started
+            if interrupted['reason'] == 'cancelled' or (cancel_token is not None and cancel_token.cancelled):
+                raise QueryCancelledError("Query was cancelled") from e
+            if interrupted['reason'] == 'timeout' or (timeout and _is_snowflake(conn) and elapsed >= timeout):
+                raise QueryTimeoutError(f"Query exceeded its {timeout:g}s timeout") from e
+            raise
+        finally:
+            if watchdog is not None:
+                watchdog.cancel()
+            if unregister is not None:
+                unregister()
+            try:
+                cur.close()
+            except Exception:
+                pass
+
+def _arrow_batches(cur, fetch_size: int) -> Optional[Iterator[Any]]:
+    """Arrow record batches straight from the driver, or None if it has no Arrow API"""
+    if hasattr(cur, 'fetch_arrow_batches'):  # Snowflake
+        batches = cur.fetch_arrow_batches()
+        try:
+            first = next(batches)
+        except StopIteration:
+            return iter(())
+        except snowflake.connector.errors.NotSupportedError:
+            return None  # e.g. results not returned in Arrow format
+        return itertools.chain([first], batches)
+    if hasattr(cur, 'to_arrow_reader'):  # duckdb
+        return iter(cur.to_arrow_reader(fetch_size))
+    if hasattr(cur, 'fetch_record_batch'):  # older duckdb
+        return iter(cur.fetch_record_batch(fetch_size))
+    return None
+
+def _collect_arrow(batches, columns, max_rows, max_bytes, cancel_token, compact=False):
+    """Concatenate Arrow batches up to the caps, converting to pandas once at the end"""
+    tables, rows, num_bytes, truncated_by = [], 0, 0, None
+    for batch in batches:
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+        table = batch if isinstance(batch, pa.Table) else pa.Table.from_batches([batch])
+        if max_rows is not None and rows + table.num_rows > max_rows:
+            table = table.slice(0, max_rows - rows)
+            truncated_by = 'max_rows'
+        if max_bytes is not None and num_bytes + table.nbytes > max_bytes:
+            row_bytes = table.nbytes / max(table.num_rows, 1)
+            table = table.slice(0, int((max_bytes - num_bytes) // row_bytes))
+            truncated_by = 'max_bytes'
+
+        tables.append(table)
+        rows += table.num_rows
+        num_bytes += table.nbytes
+        if truncated_by is not None:
+            break
+
+    if not tables:
+        return pd.DataFrame(columns=columns), None, 0
+    # Chunks are only referenced, not copied, until the single to_pandas call
+    return _arrow_to_pandas(pa.concat_tables(tables), compact), truncated_by, num_bytes
+
+def _arrow_to_pandas(table, compact: bool = False) -> pd.DataFrame:
+    """Convert Arrow data to pandas, with decimals as numbers like read_sql_query(coerce_float=True)"""
+    if isinstance(table, pa.RecordBatch):
+        table = pa.Table.from_batches([table])
+    for i, field in enumerate(table.schema):
+        if pa.types.is_decimal(field.type):
+            column = table.column(i)
+            try:
+                column = column.cast(pa.int64()) if field.type.scale == 0 else column.cast(pa.float64(), safe=False)
+            except pa.ArrowInvalid:
+                column = column.cast(pa.float64(), safe=False)  # integer too large for int64
+            table = table.set_column(i, field.name, column)
+    if not compact:
+        return table.to_pandas(split_blocks=True, self_destruct=True)
+    # Strings stay Arrow-backed instead of becoming Python objects
+    frame = compact_arrow(table).to_pandas(
+        split_blocks=True, self_destruct=True,
+        types_mapper={pa.string(): pd.StringDtype('pyarrow'), pa.large_string(): pd.StringDtype('pyarrow')}.get
+    )
+    return compact_shipments(frame)
+
+def _collect_rows(cur, columns, max_rows, max_bytes, fetch_size, cancel_token):
+    """Fetch tuples in batches until the result ends or a cap is reached"""
+    frames, rows, num_bytes, truncated_by = [], 0, 0, None
+    while True:
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+        size = fetch_size if max_rows is None else min(fetch_size, max_rows - rows + 1)
+        batch = cur.fetchmany(size)
+        if not batch:
+            break
+
+        frame = pd.DataFrame.from_records(batch, columns=columns, coerce_float=True)
+        if max_rows is not None and rows + len(frame) > max_rows:
+            frame = frame.iloc[:max_rows - rows]
+            truncated_by = 'max_rows'
+        batch_bytes = int(frame.memory_usage(deep=True, index=False).sum())
+        if max_bytes is not None and num_bytes + batch_bytes > max_bytes:
+            row_bytes = batch_bytes / max(len(frame), 1)
+            frame = frame.iloc[:int((max_bytes - num_bytes) // row_bytes)]
+            batch_bytes = int(frame.memory_usage(deep=True, index=False).sum())
+            truncated_by = 'max_bytes'
+
+        frames.append(frame)
+        rows += len(frame)
+        num_bytes += batch_bytes
+        if truncated_by is not None:
+            break
+
+    if not frames:
+        return pd.DataFrame(columns=columns), None, 0
+    frame = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+    return frame.reset_index(drop=True), truncated_by, num_bytes
+
+def _is_snowflake(conn) -> bool:
+    return isinstance(conn, snowflake.connector.SnowflakeConnection)
+
+def _interrupter(conn, cur) -> Callable[[], None]:
+    """Best way to stop a running statement for this driver"""
+    if hasattr(cur, 'interrupt'):
+        return cur.interrupt  # duckdb, where cursors are separate connections
+    if hasattr(conn, 'interrupt'):
+        return conn.interrupt  # sqlite3
+    if _is_snowflake(conn):
+        session_id = conn.session_id
+
+        def cancel_session() -> None:
+            # Must come from another session; this one is blocked on the statement
+            other = get_db_connection()
+            try:
+                other.cursor().execute(f"SELECT SYSTEM$CANCEL_ALL_QUERIES({int(session_id)})")
+            finally:
+                other.close()
+        return cancel_session
+    if hasattr(cur, 'cancel'):
+        return cur.cancel
+    return lambda: None
+
+def execute_query(query: str, params: Sequence = None):
     """Execute SQL query"""
     with get_db_session() as conn:
         cur = conn.cursor()
@@ -53,7 +625,6 @@ def execute_query(query: str, params: dict = None):
         finally:
             cur.close()
 
-def execute_query_df(query: str) -> pd.DataFrame:
-    """Execute query and return DataFrame"""
-    with get_db_session() as conn:
-        return pd.read_sql_query(query, conn)
\ No newline at end of file
+def execute_query_df(query: str, params: Sequence = None, **limits) -> pd.DataFrame:
+    """Execute query and return DataFrame, under the default timeout and caps"""
+    return run_query(query, params, **limits).frame
@@ -69,5 +69,7 @@ class QueryCache(Base):
     query_hash = Column(String, unique=True)
     query_text = Column(String)
     result = Column(String)
+    watermark = Column(String)
     created_at = Column(DateTime)
-    updated_at = Column(DateTime)
\ No newline at end of file
+    updated_at = Column(DateTime)
+    expires_at = Column(DateTime)
\ No newline at end of file
@@ -0,0 +1,248 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from io import StringIO
+from typing import Any, Callable, Dict, Optional, Sequence
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from config import (
+    QUERY_CACHE_URL,
+    QUERY_CACHE_TTL,
+    QUERY_CACHE_MAX_BYTES,
+    QUERY_CACHE_WATERMARK_INTERVAL,
+    TABLE_NAME
+)
+from database.models import QueryCache
+
+# Splits SQL into alternating code and quoted-literal segments
+_LITERAL_PATTERN = re.compile(r"('(?:[^']|'')*')")
+_COMMENT_PATTERN = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+WATERMARK_QUERY = f"SELECT MAX(ASSIGNED_DATE_TIME) FROM {TABLE_NAME}"
+
+def normalize_sql(sql: str) -> str:
+    """Normalize SQL text so formatting differences share a cache key"""
+    parts = _LITERAL_PATTERN.split(sql.strip())
+    normalized = []
+    for i, part in enumerate(parts):
+        if i % 2:
+            normalized.append(part)  # string literal, keep as-is
+        else:
+            part = _COMMENT_PATTERN.sub(" ", part)
+            normalized.append(_WHITESPACE_PATTERN.sub(" ", part).upper())
+    return "".join(normalized).strip().rstrip(";").strip()
+
+def make_cache_key(sql: str, params: Sequence = None) -> str:
+    """Hash normalized SQL plus its bind parameters"""
+    payload = json.dumps(
+        {"sql": normalize_sql(sql), "params": list(params) if params else []},
+        default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _frame_size(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+class ResultCache:
+    """Two-tier result cache for warehouse queries.
+
+    Tier one is an in-process LRU bounded by the total DataFrame size in
+    bytes; tier two persists results in the ``query_cache`` table. Entries
+    expire after ``ttl`` seconds or as soon as the data-freshness watermark
+    of the shipment view moves.
+    """
+
+    def __init__(self,
+                 database_url: Optional[str] = QUERY_CACHE_URL,
+                 ttl: int = QUERY_CACHE_TTL,
+                 max_bytes: int = QUERY_CACHE_MAX_BYTES,
+                 watermark_provider: Callable[[], Any] = None,
+                 watermark_interval: int = QUERY_CACHE_WATERMARK_INTERVAL):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.watermark_interval = watermark_interval
+        self._watermark_provider = watermark_provider or _warehouse_watermark
+
+        self._entries = OrderedDict()  # key -> (df, size, watermark, expires_at)
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self._watermark = None
+        self._watermark_checked = None
+
+        self._session_factory = None
+        if database_url:
+            engine = create_engine(database_url)
+            QueryCache.__table__.create(engine, checkfirst=True)
+            self._session_factory = sessionmaker(bind=engine)
+
+        self._stats = {
+            'memory_hits': 0,
+            'persistent_hits': 0,
+            'misses': 0,
+            'expired': 0,
+            'stale': 0,
+            'evictions': 0,
+            'persist_errors': 0
+        }
+
+    def get(self, sql: str, params: Sequence = None) -> Optional[pd.DataFrame]:
+        """Return a cached result, or None on a miss"""
+        key = make_cache_key(sql, params)
+        watermark = self.current_watermark()
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                df, size, entry_watermark, expires_at = entry
+                if expires_at <= now or entry_watermark != watermark:
+                    self._stats['expired' if expires_at <= now else 'stale'] += 1
+                    self._remove(key)
+                else:
+                    self._entries.move_to_end(key)
+                    self._stats['memory_hits'] += 1
+                    return df.copy()
+
+        df = self._load_persistent(key, watermark)
+        with self._lock:
+            if df is None:
+                self._stats['misses'] += 1
+                return None
+            self._stats['persistent_hits'] += 1
+            self._store_memory(key, df, watermark, now + self.ttl)
+        return df.copy()
+
+    def put(self, sql: str, df: pd.DataFrame, params: Sequence = None) -> None:
+        """Store a query result in both tiers"""
+        key = make_cache_key(sql, params)
+        watermark = self.current_watermark()
+        expires_at = time.time() + self.ttl
+        df = df.copy()
+
+        with self._lock:
+            self._store_memory(key, df, watermark, expires_at)
+        self._save_persistent(key, sql, df, watermark)
+
+    def invalidate(self) -> None:
+        """Drop every cached result"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if self._session_factory is not None:
+            try:
+                with self._session_factory() as session:
+                    session.query(QueryCache).delete()
+                    session.commit()
+            except Exception:
+                self._stats['persist_errors'] += 1
+
+    def current_watermark(self) -> Optional[str]:
+        """Latest data-freshness watermark, refreshed at most once per interval"""
+        now = time.monotonic()
+        with self._lock:
+            if self._watermark_checked is not None and now - self._watermark_checked < self.watermark_interval:
+                return self._watermark
+        try:
+            watermark = self._watermark_provider()
+            watermark = None if watermark is None else str(watermark)
+        except Exception:
+            # Keep the last known watermark; TTL still bounds staleness
+            watermark = self._watermark
+        with self._lock:
+            self._watermark = watermark
+            self._watermark_checked = now
+        return watermark
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/eviction counters and memory tier occupancy"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes
+            })
+        lookups = stats['memory_hits'] + stats['persistent_hits'] + stats['misses']
+        stats['hit_rate'] = round((lookups - stats['misses']) / lookups, 4) if lookups else 0.0
+        return stats
+
+    def _store_memory(self, key: str, df: pd.DataFrame, watermark: Optional[str], expires_at: float) -> None:
+        size = _frame_size(df)
+        if key in self._entries:
+            self._remove(key)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (df, size, watermark, expires_at)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self._stats['evictions'] += 1
+
+    def _remove(self, key: str) -> None:
+        _, size, _, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def _load_persistent(self, key: str, watermark: Optional[str]) -> Optional[pd.DataFrame]:
+        if self._session_factory is None:
+            return None
+        try:
+            with self._session_factory() as session:
+                row = session.query(QueryCache).filter_by(query_hash=key).one_or_none()
+                if row is None:
+                    return None
+                if row.expires_at <= datetime.now() or row.watermark != watermark:
+                    with self._lock:
+                        self._stats['expired' if row.expires_at <= datetime.now() else 'stale'] += 1
+                    session.delete(row)
+                    session.commit()
+                    return None
+                return pd.read_json(StringIO(row.result), orient='table')
+        except Exception:
+            with self._lock:
+                self._stats['persist_errors'] += 1
+            return None
+
+    def _save_persistent(self, key: str, sql: str, df: pd.DataFrame, watermark: Optional[str]) -> None:
+        if self._session_factory is None:
+            return
+        now = datetime.now()
+        try:
+            payload = df.to_json(orient='table', index=False, date_format='iso')
+            with self._session_factory() as session:
+                row = session.query(QueryCache).filter_by(query_hash=key).one_or_none()
+                if row is None:
+                    row = QueryCache(query_hash=key, created_at=now)
+                    session.add(row)
+                row.query_text = normalize_sql(sql)
+                row.result = payload
+                row.watermark = watermark
+                row.updated_at = now
+                row.expires_at = now + timedelta(seconds=self.ttl)
+                session.commit()
+        except Exception:
+            with self._lock:
+                self._stats['persist_errors'] += 1
+
+def _warehouse_watermark():
+    from database.connector import execute_query
+    rows = execute_query(WATERMARK_QUERY)
+    return rows[0][0] if rows else None
+
+_cache: Optional[ResultCache] = None
+_cache_lock = threading.Lock()
+
+def get_result_cache() -> ResultCache:
+    """Get the process-wide result cache, creating it on first use"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResultCache()
+    return _cache
@@ -0,0 +1,226 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from config import (
+    RESULT_STORE_DIR,
+    RESULT_STORE_MAX_MEMORY_BYTES,
+    RESULT_STORE_TTL,
+    RESULT_PAGE_SIZE
+)
+
+class ResultExpiredError(KeyError):
+    """Raised when a result reference no longer has data behind it"""
+
+class ResultRef:
+    """Lightweight handle to a stored query result, safe to keep in session state"""
+
+    def __init__(self, store: "ResultStore", result_id: str, num_rows: int, columns: List[str]):
+        self.store = store
+        self.result_id = result_id
+        self.num_rows = num_rows
+        self.columns = columns
+
+    @property
+    def num_pages(self) -> int:
+        return max(1, -(-self.num_rows // self.store.page_size))
+
+    def page(self, page: int) -> pd.DataFrame:
+        """Rows of one zero-based page"""
+        return self.store.get_page(self.result_id, page)
+
+    def to_frame(self) -> pd.DataFrame:
+        """The full result; prefer ``page`` for display"""
+        return self.store.get_frame(self.result_id)
+
+    def __len__(self) -> int:
+        return self.num_rows
+
+    def __repr__(self) -> str:
+        return f"ResultRef({self.result_id!r}, rows={self.num_rows})"
+
+class ResultStore:
+    """Keeps query results server-side in Arrow form, referenced by ID.
+
+    Recent results stay in memory up to ``max_memory_bytes``; older ones are
+    spilled to Parquet files written in page-sized row groups, so a page can
+    be read back without loading the whole result. Results expire after
+    ``ttl`` seconds.
+    """
+
+    def __init__(self,
+                 directory: str = RESULT_STORE_DIR,
+                 max_memory_bytes: int = RESULT_STORE_MAX_MEMORY_BYTES,
+                 ttl: int = RESULT_STORE_TTL,
+                 page_size: int = RESULT_PAGE_SIZE):
+        self.directory = directory
+        self.max_memory_bytes = max_memory_bytes
+        self.ttl = ttl
+        self.page_size = page_size
+
+        self._tables = OrderedDict()  # result_id -> pa.Table, most recently used last
+        self._meta: Dict[str, Dict[str, Any]] = {}
+        self._bytes = 0
+        self._last_cleanup = time.time()
+        self._lock = threading.RLock()
+        self._stats = {
+            'stored': 0,
+            'spilled': 0,
+            'pages_from_memory': 0,
+            'pages_from_disk': 0,
+            'expired': 0
+        }
+
+    def put(self, frame: pd.DataFrame) -> ResultRef:
+        """Store a result and return a reference to it"""
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        result_id = uuid.uuid4().hex
+        with self._lock:
+            self._tables[result_id] = table
+            self._meta[result_id] = {
+                'rows': table.num_rows,
+                'columns': list(table.column_names),
+                'bytes': table.nbytes,
+                'created_at': time.time()
+            }
+            self._bytes += table.nbytes
+            self._stats['stored'] += 1
+            self._spill_over_budget()
+        self._maybe_cleanup()
+        return ResultRef(self, result_id, table.num_rows, list(table.column_names))
+
+    def ref(self, result_id: str) -> ResultRef:
+        """Reference to an existing result"""
+        meta = self._get_meta(result_id)
+        return ResultRef(self, result_id, meta['rows'], meta['columns'])
+
+    def get_page(self, result_id: str, page: int, page_size: int = None) -> pd.DataFrame:
+        """Rows ``page * page_size`` up to the next page, as a DataFrame"""
+        page_size = page_size or self.page_size
+        offset = max(page, 0) * page_size
+        return self._read(result_id, offset, page_size).to_pandas()
+
+    def get_frame(self, result_id: str) -> pd.DataFrame:
+        """The whole result as a DataFrame"""
+        return self._read(result_id, 0, None).to_pandas()
+
+    def delete(self, result_ids: Iterable[str]) -> None:
+        """Drop results, e.g. when a conversation is cleared"""
+        with self._lock:
+            for result_id in result_ids:
+                self._drop(result_id)
+
+    def cleanup(self) -> int:
+        """Remove expired results from memory and disk; returns how many"""
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            expired = [rid for rid, meta in self._meta.items() if meta['created_at'] < cutoff]
+            for result_id in expired:
+                self._drop(result_id)
+            self._stats['expired'] += len(expired)
+            self._last_cleanup = time.time()
+
+        # Files left behind by earlier processes
+        if os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                path = os.path.join(self.directory, name)
+                try:
+                    if name.endswith(".parquet") and os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                except OSError:
+                    pass
+        return len(expired)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters plus memory and entry counts"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                'results': len(self._meta),
+                'in_memory': len(self._tables),
+                'memory_bytes': self._bytes,
+                'max_memory_bytes': self.max_memory_bytes
+            })
+        return stats
+
+    def _read(self, result_id: str, offset: int, length: Optional[int]) -> pa.Table:
+        with self._lock:
+            self._get_meta(result_id)
+            table = self._tables.get(result_id)
+            if table is not None:
+                self._tables.move_to_end(result_id)
+                self._stats['pages_from_memory'] += 1
+                return table.slice(offset, length) if length is not None else table.slice(offset)
+            self._stats['pages_from_disk'] += 1
+
+        path = self._path(result_id)
+        try:
+            parquet = pq.ParquetFile(path)
+        except (FileNotFoundError, OSError):
+            raise ResultExpiredError(result_id)
+        if length is None:
+            return parquet.read().slice(offset)
+
+        # Read only the row groups that overlap the requested rows
+        groups, start, first_row = [], 0, None
+        for i in range(parquet.metadata.num_row_groups):
+            rows = parquet.metadata.row_group(i).num_rows
+            if start + rows > offset and start < offset + length:
+                groups.append(i)
+                first_row = start if first_row is None else first_row
+            start += rows
+        if not groups:
+            return parquet.schema_arrow.empty_table()
+        return parquet.read_row_groups(groups).slice(offset - first_row, length)
+
+    def _get_meta(self, result_id: str) -> Dict[str, Any]:
+        meta = self._meta.get(result_id)
+        if meta is None:
+            raise ResultExpiredError(result_id)
+        return meta
+
+    def _spill_over_budget(self) -> None:
+        """Write least recently used tables to Parquet until memory fits (lock held)"""
+        while self._bytes > self.max_memory_bytes and self._tables:
+            result_id, table = self._tables.popitem(last=False)
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = self._path(result_id) + ".tmp"
+            pq.write_table(table, tmp_path, row_group_size=self.page_size)
+            os.replace(tmp_path, self._path(result_id))
+            self._bytes -= table.nbytes
+            self._stats['spilled'] += 1
+
+    def _drop(self, result_id: str) -> None:
+        """Forget a result everywhere (lock held)"""
+        table = self._tables.pop(result_id, None)
+        if table is not None:
+            self._bytes -= table.nbytes
+        if self._meta.pop(result_id, None) is not None:
+            try:
+                os.remove(self._path(result_id))
+            except OSError:
+                pass
+
+    def _maybe_cleanup(self) -> None:
+        if time.time() - self._last_cleanup > min(self.ttl, 3600):
+            self.cleanup()
+
+    def _path(self, result_id: str) -> str:
+        return os.path.join(self.directory, f"{result_id}.parquet")
+
+_store: Optional[ResultStore] = None
+_store_lock = threading.Lock()
+
+def get_result_store() -> ResultStore:
+    """Get the process-wide result store, creating it on first use"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ResultStore()
+    return _store
@@ -0,0 +1,253 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import pandas as pd
+from database.schema import compact_shipments, memory_per_row
+from config import (
+    TABLE_NAME,
+    ROLLUP_PATH,
+    ROLLUP_LOOKBACK_DAYS,
+    ROLLUP_START_DATE,
+    ROLLUP_MAX_AGE,
+    DELIVERY_SLA_HOURS,
+    QUERY_TIMEOUT_CEILING,
+    SYNC_CHANGE_COLUMNS,
+    SYNC_OVERLAP_SECONDS
+)
+
+# Dimensions kept in the rollup, next to the day of ASSIGNED_DATE_TIME
+ROLLUP_DIMENSIONS = ['ZONE', 'CITY_TIER', 'PARENT_COURIER', 'MODE_OF_SHIPMENT']
+
+class DailyRollup:
+    """Locally stored day x dimensions rollup of VIEW_TITANIUM_PLATINUM_REPORT.
+
+    Each row holds the additive metric components from ``utils.metrics`` for
+    one day and dimension combination, stored as Parquet. ``refresh``
+    re-aggregates the most recent ``lookback_days`` plus every older day with
+    a shipment changed since the last refresh, found with the same change
+    columns and watermarks as ``IncrementalSync``; late updates such as RTO
+    or delivery settlement weeks after booking are picked up without a full
+    scan. A rollup not refreshed within ``max_age`` seconds answers nothing.
+    """
+
+    def __init__(self,
+                 path: str = ROLLUP_PATH,
+                 lookback_days: int = ROLLUP_LOOKBACK_DAYS,
+                 start_date: Optional[str] = ROLLUP_START_DATE,
+                 sla_hours: float = DELIVERY_SLA_HOURS,
+                 max_age: int = ROLLUP_MAX_AGE,
+                 change_columns: List[str] = None,
+                 overlap_seconds: int = SYNC_OVERLAP_SECONDS):
+        self.path = path
+        self.state_path = os.path.splitext(path)[0] + ".json"
+        self.lookback_days = lookback_days
+        self.start_date = start_date
+        self.sla_hours = sla_hours
+        self.max_age = max_age
+        self.change_columns = change_columns or SYNC_CHANGE_COLUMNS
+        self.overlap_seconds = overlap_seconds
+
+        self._frame: Optional[pd.DataFrame] = None
+        self._state: Dict[str, Any] = {}
+        self._loaded_mtime = None
+        self._lock = threading.RLock()
+
+    def load(self) -> Optional[pd.DataFrame]:
+        """Current rollup frame, reloaded if another process refreshed the file"""
+        with self._lock:
+            try:
+                mtime = os.path.getmtime(self.path)
+            except OSError:
+                return None
+            if mtime != self._loaded_mtime:
+                self._frame = pd.read_parquet(self.path)
+                with open(self.state_path) as f:
+                    self._state = json.load(f)
+                self._loaded_mtime = mtime
+            return self._frame
+
+    def refresh(self, full: bool = False) -> Dict[str, Any]:
+        """Re-aggregate recent and changed days from the warehouse and merge them in"""
+        from database.connector import get_pool
+        from utils.metrics import MetricsCalculator, METRICS
+
+        started = time.perf_counter()
+        pool = get_pool()  # the source of truth; the rollup may be taken as full history
+        with self._lock:
+            frame = None if full else self.load()
+            # Taken before reading, so changes made meanwhile are read again next refresh
+            watermarks = self._watermarks(pool)
+            changed = []
+            if frame is None or frame.empty:
+                since = pd.Timestamp(self.start_date) if self.start_date else None
+                covered_from = self.start_date
+            else:
+                since = frame['DAY'].max() - pd.Timedelta(days=self.lookback_days)
+                covered_from = self._state.get('covered_from')
+                changed = self._changed_days(self._state.get('watermarks') or {}, since, pool)
+
+            calculator = MetricsCalculator(sla_hours=self.sla_hours, use_rollup=False)
+            parts = []
+            for first, last in _day_ranges(changed) + [(since, None)]:
+                filters = {'start_date': first} if first is not None else {}
+                if last is not None:
+                    filters['end_date'] = last
+                parts.append(calculator.fetch_components(
+                    list(METRICS),
+                    filters or None,
+                    ['DAY'] + ROLLUP_DIMENSIONS,
+                    timeout=QUERY_TIMEOUT_CEILING,
+                    pool=pool
+                ))
+            fresh = pd.concat(parts, ignore_index=True)
+            fresh['DAY'] = pd.to_datetime(fresh['DAY'])
+
+            if frame is not None and not frame.empty:
+                kept = (frame['DAY'] < since) & ~frame['DAY'].isin(changed)
+                frame = pd.concat([frame[kept], fresh], ignore_index=True)
+            else:
+                frame = fresh
+            # Dimensions as categoricals; concat falls back to object when categories differ
+            frame = compact_shipments(frame.sort_values('DAY', kind='mergesort').reset_index(drop=True))
+
+            state = {
+                'covered_from': covered_from,
+                'sla_hours': self.sla_hours,
+                'min_day': None if frame.empty else str(frame['DAY'].min().date()),
+                'max_day': None if frame.empty else str(frame['DAY'].max().date()),
+                'refreshed_at': datetime.now().isoformat(timespec='seconds'),
+                'rows': len(frame),
+                'watermarks': watermarks
+            }
+            self._write(frame, state)
+
+        return {
+            'rows_refreshed': len(fresh),
+            'rows_total': len(frame),
+            'refreshed_since': None if since is None else str(since.date()),
+            'changed_days_before': len(changed),
+            'seconds': round(time.perf_counter() - started, 3)
+        }
+
+    def covers(self,
+               metrics: List[str],
+               filters: Dict[str, Any] = None,
+               group_by: List[str] = None,
+               sla_hours: float = None) -> bool:
+        """Whether a metrics request can be answered from the rollup alone"""
+        from utils.metrics import METRICS, TIME_GRAINS
+
+        frame = self.load()
+        if frame is None or frame.empty:
+            return False
+        if any(component not in frame.columns for metric in metrics for component in METRICS[metric][0]):
+            return False  # written before the metric existed; the next full refresh adds it
+        refreshed_at = self._state.get('refreshed_at')
+        if not refreshed_at or (datetime.now() - datetime.fromisoformat(refreshed_at)).total_seconds() > self.max_age:
+            return False
+        if 'sla_compliance' in metrics and sla_hours is not None and sla_hours != self._state.get('sla_hours'):
+            return False
+        if any(col.upper() not in ROLLUP_DIMENSIONS and col.upper() not in TIME_GRAINS for col in group_by or []):
+            return False
+
+        filters = filters or {}
+        for key in filters:
+            if key not in ('start_date', 'end_date') and key.upper() not in ROLLUP_DIMENSIONS:
+                return False
+
+        start = filters.get('start_date')
+        covered_from = self._state.get('covered_from')
+        if start:
+            start = pd.Timestamp(start)
+            if start != start.normalize():
+                return False  # rollup has day granularity
+            if covered_from and start < pd.Timestamp(covered_from):
+                return False
+        elif covered_from:
+            return False
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """Size and freshness of the stored rollup"""
+        with self._lock:
+            frame = self.load()
+            return {
+                **self._state,
+                'path': self.path,
+                'memory_bytes': 0 if frame is None else int(frame.memory_usage(deep=True).sum()),
+                'bytes_per_row': 0 if frame is None or frame.empty else memory_per_row(frame)
+            }
+
+    def _watermarks(self, pool) -> Dict[str, Optional[str]]:
+        """Latest value of each change column, capped at now like the sync's"""
+        from database.connector import run_query
+
+        now = pd.Timestamp.now()
+        maxima = run_query(
+            "SELECT " + ", ".join(f"MAX({col}) AS {col}" for col in self.change_columns) + f" FROM {TABLE_NAME}",
+            pool=pool
+        ).frame.iloc[0]
+        return {col: None if pd.isna(maxima[col]) else min(pd.Timestamp(maxima[col]), now).isoformat()
+                for col in self.change_columns}
+
+    def _changed_days(self, watermarks: Dict[str, Optional[str]], before: pd.Timestamp, pool) -> List[pd.Timestamp]:
+        """Days before ``before`` with a shipment changed since the watermarks were taken"""
+        from database.connector import run_query
+
+        conditions, params = [], []
+        for col in self.change_columns:
+            if watermarks.get(col):
+                conditions.append(f"{col} > ?")
+                params.append((pd.Timestamp(watermarks[col]) - pd.Timedelta(seconds=self.overlap_seconds)).to_pydatetime())
+        if not conditions:
+            return []  # written before watermarks were kept; only the lookback is refreshed
+        days = run_query(
+            f"SELECT DISTINCT DATE_TRUNC('DAY', ASSIGNED_DATE_TIME) AS DAY FROM {TABLE_NAME} "
+            f"WHERE ASSIGNED_DATE_TIME < ? AND ({' OR '.join(conditions)})",
+            [before.to_pydatetime()] + params,
+            timeout=QUERY_TIMEOUT_CEILING, max_rows=None, max_bytes=None, pool=pool
+        ).frame
+        return sorted(pd.to_datetime(days.iloc[:, 0]).dropna())
+
+    def _write(self, frame: pd.DataFrame, state: Dict[str, Any]) -> None:
+        """Atomically replace the Parquet file and its state sidecar"""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        frame.to_parquet(tmp_path, index=False)
+        with open(self.state_path + ".tmp", "w") as f:
+            json.dump(state, f)
+        os.replace(self.state_path + ".tmp", self.state_path)
+        os.replace(tmp_path, self.path)
+        self._frame = frame
+        self._state = state
+        self._loaded_mtime = os.path.getmtime(self.path)
+
+def _day_ranges(days: List[pd.Timestamp]) -> List[tuple]:
+    """Sorted days as (first, last) runs of consecutive days"""
+    ranges = []
+    for day in days:
+        if ranges and day - ranges[-1][1] == pd.Timedelta(days=1):
+            ranges[-1] = (ranges[-1][0], day)
+        else:
+            ranges.append((day, day))
+    return ranges
+
+_rollup: Optional[DailyRollup] = None
+_rollup_lock = threading.Lock()
+
+def get_rollup() -> DailyRollup:
+    """Get the process-wide daily rollup"""
+    global _rollup
+    if _rollup is None:
+        with _rollup_lock:
+            if _rollup is None:
+                _rollup = DailyRollup()
+    return _rollup
+
+if __name__ == "__main__":
+    # Scheduled refresh job: python -m database.rollup [--full]
+    import sys
+    print(get_rollup().refresh(full="--full" in sys.argv))
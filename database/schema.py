@@ -0,0 +1,106 @@
+from typing import Dict, List
+import pandas as pd
+import pyarrow as pa
+from sqlalchemy import Boolean, DateTime, Enum, Float, Integer, String
+from database.models import ShipmentTracking
+
+# String columns with one value per shipment; everything else repeats and is categorical
+HIGH_CARDINALITY_COLUMNS = {'AWB_CODE', 'ORDER_ID'}
+
+_TRUE_STRINGS = ['1', '1.0', 'true', 't', 'yes', 'y']
+
+def _column_kind(column) -> str:
+    if isinstance(column.type, Enum):
+        return 'enum'
+    if isinstance(column.type, Boolean):
+        return 'bool'
+    if isinstance(column.type, DateTime):
+        return 'datetime'
+    if isinstance(column.type, Float):
+        return 'float32'
+    if isinstance(column.type, Integer):
+        return 'int'
+    if isinstance(column.type, String):
+        return 'string' if column.name in HIGH_CARDINALITY_COLUMNS else 'category'
+    return 'object'
+
+# Compact representation of each ShipmentTracking column, derived from the model
+SHIPMENT_SCHEMA: Dict[str, str] = {
+    column.name: _column_kind(column) for column in ShipmentTracking.__table__.columns
+}
+ENUM_VALUES: Dict[str, List[str]] = {
+    column.name: list(column.type.enums)
+    for column in ShipmentTracking.__table__.columns if isinstance(column.type, Enum)
+}
+
+def compact_arrow(table: pa.Table) -> pa.Table:
+    """Shrink shipment columns while still in Arrow, before conversion to pandas.
+
+    Repeating strings are dictionary-encoded (they arrive in pandas as
+    categoricals, never as Python strings) and doubles are narrowed.
+    """
+    for i, field in enumerate(table.schema):
+        kind = SHIPMENT_SCHEMA.get(field.name.upper())
+        if kind in ('enum', 'category') and (pa.types.is_string(field.type) or pa.types.is_large_string(field.type)):
+            table = table.set_column(i, field.name, table.column(i).dictionary_encode())
+        elif kind == 'float32' and pa.types.is_floating(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(pa.float32()))
+    return table
+
+def compact_shipments(frame: pd.DataFrame) -> pd.DataFrame:
+    """Convert the shipment columns of a frame to their compact dtypes.
+
+    Enums become categoricals over the model's values (plus any unexpected
+    values, so nothing is lost), other repeating strings categoricals, flags
+    bool (null counts as not set), timestamps datetime64, weights and values
+    float32 and counts the smallest integer type. Other columns are left as is.
+    """
+    frame = frame.copy(deep=False)
+    for col in frame.columns:
+        kind = SHIPMENT_SCHEMA.get(str(col).upper())
+        if kind is not None and kind != 'object':
+            frame[col] = _compact_column(frame[col], kind, ENUM_VALUES.get(str(col).upper()))
+    return frame
+
+def _compact_column(values: pd.Series, kind: str, enum_values: List[str] = None) -> pd.Series:
+    if kind in ('enum', 'category'):
+        if not isinstance(values.dtype, pd.CategoricalDtype):
+            values = values.astype('category')
+        if kind == 'enum':
+            extras = [value for value in values.cat.categories if value not in enum_values]
+            if list(values.cat.categories) != enum_values + extras:
+                values = values.cat.set_categories(enum_values + extras)
+        return values
+    if kind == 'bool':
+        if pd.api.types.is_bool_dtype(values) and not values.hasnans:
+            return values.astype(bool)
+        if pd.api.types.is_numeric_dtype(values):
+            return values.fillna(0).astype(bool)
+        return values.astype(str).str.strip().str.lower().isin(_TRUE_STRINGS) & values.notna()
+    if kind == 'datetime':
+        if pd.api.types.is_datetime64_any_dtype(values):
+            return values
+        return pd.to_datetime(values, errors='coerce')
+    if kind == 'float32':
+        return pd.to_numeric(values, errors='coerce').astype('float32')
+    if kind == 'int':
+        # Stays float (then float32) when there are nulls
+        values = pd.to_numeric(values, errors='coerce')
+        return pd.to_numeric(values, downcast='float' if values.hasnans else 'integer')
+    if kind == 'string':
+        if isinstance(values.dtype, pd.StringDtype):
+            return values
+        return values.astype('string[pyarrow]')
+    return values
+
+def memory_report(frame: pd.DataFrame) -> Dict[str, float]:
+    """Bytes per row for each column, plus 'total'"""
+    rows = max(len(frame), 1)
+    usage = frame.memory_usage(deep=True, index=False)
+    report = {str(col): round(float(size) / rows, 2) for col, size in usage.items()}
+    report['total'] = round(float(usage.sum()) / rows, 2)
+    return report
+
+def memory_per_row(frame: pd.DataFrame) -> float:
+    """Average bytes a row of the frame takes in memory"""
+    return memory_report(frame)['total']
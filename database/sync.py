@@ -0,0 +1,239 @@
+import os
+import shutil
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from config import (
+    TABLE_NAME,
+    SYNC_CHANGE_COLUMNS,
+    SYNC_OVERLAP_SECONDS,
+    SYNC_BATCH_ROWS,
+    SYNC_COMPACT_MAX_FILES,
+    SYNC_HISTORY_RUNS
+)
+from database.backends import DATE_COLUMN, ParquetMirror
+from utils.tracing import get_tracer
+
+KEY_COLUMN = 'AWB_CODE'
+
+class IncrementalSync:
+    """Keeps the Parquet mirror up to date with rows changed since the last run.
+
+    A shipment changes when one of ``change_columns`` moves past its
+    watermark (by default the timestamps a shipment picks up as it
+    progresses; a single change column if the view has one). Changed rows are
+    read in Arrow batches and upserted by AWB_CODE into the month of their
+    ASSIGNED_DATE_TIME, which is taken to be fixed for a shipment: files
+    without any of the changed AWBs are kept (hard-linked), files with some
+    are rewritten without them, and the changed rows are added as a new file.
+    Each month is then swapped in whole.
+
+    Watermarks are saved only when a run completes. Upserts are idempotent,
+    so a run cut short is simply repeated from the old watermarks. An
+    ``index`` (AwbIndex) is given every upserted row before that, too.
+    """
+
+    def __init__(self,
+                 mirror: ParquetMirror = None,
+                 change_columns: List[str] = None,
+                 overlap_seconds: int = SYNC_OVERLAP_SECONDS,
+                 batch_rows: int = SYNC_BATCH_ROWS,
+                 compact_max_files: int = SYNC_COMPACT_MAX_FILES,
+                 pool=None,
+                 index=None):
+        self.mirror = mirror or ParquetMirror()
+        self.change_columns = change_columns or SYNC_CHANGE_COLUMNS
+        self.overlap_seconds = overlap_seconds
+        self.batch_rows = batch_rows
+        self.compact_max_files = compact_max_files
+        self.pool = pool  # where the view is read from; None for the process-wide pool
+        self.index = index
+        self._lock = threading.Lock()
+
+    @property
+    def watermarks(self) -> Dict[str, Optional[str]]:
+        return self.mirror._state().get('watermarks', {})
+
+    def run(self, compact: bool = True) -> Dict[str, Any]:
+        """Apply every change since the last run; bootstraps the mirror on the first one"""
+        with self._lock, get_tracer().span("sync", "sync") as span:
+            self.mirror.recover()
+            started_at = pd.Timestamp.now()
+            started = time.perf_counter()
+            watermarks = self.watermarks
+            if not watermarks or not self.mirror.months():
+                result = self._bootstrap(started_at)
+            else:
+                result = self._apply_changes(watermarks, started_at)
+            if compact:
+                result['compacted'] = self.compact()
+            if self.index is not None:
+                if result['mode'] == 'bootstrap' or not self.index.built:
+                    self.index.build(self.mirror)
+                self.index.mark_synced()
+
+            result['seconds'] = round(time.perf_counter() - started, 2)
+            result['rows_per_second'] = int(result['rows'] / result['seconds']) if result['seconds'] else 0
+            result['finished_at'] = datetime.now().isoformat()
+            newest = max((pd.Timestamp(v) for v in result['watermarks'].values() if v), default=None)
+            result['lag_seconds'] = None if newest is None else round((pd.Timestamp.now() - newest).total_seconds(), 1)
+
+            state = self.mirror._state()
+            state['watermarks'] = result['watermarks']
+            state['sync_history'] = (state.get('sync_history', []) + [result])[-SYNC_HISTORY_RUNS:]
+            self.mirror._write_state(state)
+            span.set(rows=result['rows'], months=len(result['months']), mode=result['mode'])
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Watermarks, lag and throughput of recent runs"""
+        history = self.mirror._state().get('sync_history', [])
+        last = history[-1] if history else None
+        return {
+            'watermarks': self.watermarks,
+            'runs': len(history),
+            'last_run': last,
+            'since_last_run_seconds': None if last is None else round(
+                (pd.Timestamp.now() - pd.Timestamp(last['finished_at'])).total_seconds(), 1),
+            'avg_rows_per_second': int(sum(r['rows_per_second'] for r in history) / len(history)) if history else 0
+        }
+
+    def compact(self, months: List[str] = None) -> List[str]:
+        """Merge the files of months with more than ``compact_max_files`` into one, sorted by AWB"""
+        compacted = []
+        for month in months or self.mirror.months():
+            files = self.mirror.files(month)
+            if len(files) <= self.compact_max_files:
+                continue
+            table = pa.concat_tables([pq.read_table(f) for f in files], promote_options='default')
+            table = table.sort_by(KEY_COLUMN)
+            staging = self.mirror.staging_dir(month)
+            pq.write_table(table, os.path.join(staging, f"part-{uuid.uuid4().hex[:8]}.parquet"))
+            self.mirror.replace_month(month, staging)
+            compacted.append(month)
+        return compacted
+
+    def _bootstrap(self, started_at: pd.Timestamp) -> Dict[str, Any]:
+        """First run: take watermarks, then export every month"""
+        from database.connector import run_query
+
+        # Taken before the export, so changes made meanwhile are read again next run
+        maxima = run_query(
+            "SELECT " + ", ".join(f"MAX({col}) AS {col}" for col in self.change_columns) + f" FROM {TABLE_NAME}",
+            pool=self.pool
+        ).frame.iloc[0]
+        export = self.mirror.export(full=True, pool=self.pool)
+        return {
+            'mode': 'bootstrap',
+            'rows': export['rows'],
+            'inserted': export['rows'],
+            'updated': 0,
+            'months': export['months'],
+            'watermarks': {col: None if pd.isna(maxima[col]) else min(pd.Timestamp(maxima[col]), started_at).isoformat()
+                           for col in self.change_columns}
+        }
+
+    def _apply_changes(self, watermarks: Dict[str, Optional[str]], started_at: pd.Timestamp) -> Dict[str, Any]:
+        from database.connector import iter_query_batches
+
+        # Watermarks are capped at the start of the run so a row dated in the future cannot skip others
+        conditions, params = [], []
+        for col in self.change_columns:
+            if watermarks.get(col):
+                conditions.append(f"{col} > ?")
+                params.append((pd.Timestamp(watermarks[col]) - pd.Timedelta(seconds=self.overlap_seconds)).to_pydatetime())
+        query = f"SELECT * FROM {TABLE_NAME}"
+        if conditions:
+            query += " WHERE " + " OR ".join(conditions)
+
+        result = {'mode': 'incremental', 'rows': 0, 'inserted': 0, 'updated': 0, 'skipped': 0, 'months': []}
+        new_watermarks = dict(watermarks)
+        pending, pending_rows = [], 0
+        for frame in iter_query_batches(query, params, timeout=None, pool=self.pool):
+            for col in self.change_columns:
+                seen = frame[col].max() if col in frame.columns else None
+                if seen is not None and not pd.isna(seen):
+                    seen = min(pd.Timestamp(seen), started_at)
+                    if not new_watermarks.get(col) or seen > pd.Timestamp(new_watermarks[col]):
+                        new_watermarks[col] = seen.isoformat()
+            pending.append(frame)
+            pending_rows += len(frame)
+            if pending_rows >= self.batch_rows:
+                self._upsert(pd.concat(pending, ignore_index=True), result)
+                pending, pending_rows = [], 0
+        if pending:
+            self._upsert(pd.concat(pending, ignore_index=True), result)
+
+        result['months'] = sorted(set(result['months']))
+        result['watermarks'] = new_watermarks
+        return result
+
+    def _upsert(self, changes: pd.DataFrame, result: Dict[str, Any]) -> None:
+        """Upsert changed rows by AWB into their months"""
+        changes = changes.drop_duplicates(subset=KEY_COLUMN, keep='last')
+        months = pd.to_datetime(changes[DATE_COLUMN]).dt.to_period('M')
+        result['rows'] += len(changes)
+        result['skipped'] += int(months.isna().sum())  # never mirrored, as export filters on the date
+        mirrored = changes[months.notna()]
+        for month, rows in mirrored.groupby(months[months.notna()].astype(str)):
+            updated = self._upsert_month(month, pa.Table.from_pandas(rows, preserve_index=False))
+            result['updated'] += updated
+            result['inserted'] += len(rows) - updated
+            result['months'].append(month)
+        if self.index is not None and self.index.built and len(mirrored):
+            self.index.add(mirrored)
+
+    def _upsert_month(self, month: str, rows: pa.Table) -> int:
+        """Write the month's next version with ``rows`` replacing any same-AWB rows; returns how many did"""
+        keys = pc.unique(rows[KEY_COLUMN])
+        staging = self.mirror.staging_dir(month)
+        replaced = 0
+        for path in self.mirror.files(month):
+            matches = pc.is_in(pq.read_table(path, columns=[KEY_COLUMN])[KEY_COLUMN], value_set=keys)
+            hits = pc.sum(matches).as_py() or 0
+            target = os.path.join(staging, os.path.basename(path))
+            if not hits:
+                _link_or_copy(path, target)
+                continue
+            replaced += hits
+            kept = pq.read_table(path).filter(pc.invert(matches))
+            if kept.num_rows:
+                pq.write_table(kept, os.path.join(staging, f"part-{uuid.uuid4().hex[:8]}.parquet"))
+        pq.write_table(rows, os.path.join(staging, f"part-{uuid.uuid4().hex[:8]}.parquet"))
+        self.mirror.replace_month(month, staging)
+        return replaced
+
+def _link_or_copy(source: str, target: str) -> None:
+    """Reuse an unchanged file in the next version of a month without copying it"""
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+
+_sync: Optional[IncrementalSync] = None
+_sync_lock = threading.Lock()
+
+def get_sync() -> IncrementalSync:
+    """Get the process-wide sync of the default mirror"""
+    global _sync
+    if _sync is None:
+        with _sync_lock:
+            if _sync is None:
+                _sync = IncrementalSync()
+    return _sync
+
+if __name__ == "__main__":
+    # Scheduled sync job, run against Snowflake: python -m database.sync [--no-compact] [--stats]
+    import sys
+    from database.awb_index import get_awb_index
+    from database.backends import SnowflakeBackend
+    from database.connector import ConnectionPool
+
+    sync = IncrementalSync(pool=ConnectionPool(SnowflakeBackend().connect), index=get_awb_index())
+    print(sync.stats() if "--stats" in sys.argv else sync.run(compact="--no-compact" not in sys.argv))
@@ -0,0 +1,215 @@
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Iterable, List, Optional
+import pandas as pd
+from config import (
+    TRACKING_CACHE_MAX_ENTRIES,
+    TRACKING_CACHE_TERMINAL_TTL,
+    TRACKING_CACHE_ACTIVE_TTL,
+    TRACKING_CACHE_MISS_TTL
+)
+
+# Statuses after which a shipment's tracking row no longer changes
+TERMINAL_STATUSES = {
+    'DELIVERED',
+    'RTO',
+    'RTO DELIVERED',
+    'CANCELLED',
+    'CANCELED',
+    'LOST',
+    'DAMAGED',
+    'DESTROYED',
+    'DISPOSED OFF'
+}
+
+_STATUS_SEPARATORS = re.compile(r"[\s_\-]+")
+
+def normalize_status(status: Any) -> str:
+    if status is None or (isinstance(status, float) and status != status):
+        return ""
+    return _STATUS_SEPARATORS.sub(" ", str(status)).strip().upper()
+
+def _row_size(row: Optional[Dict[str, Any]]) -> int:
+    if row is None:
+        return sys.getsizeof(None)
+    return sys.getsizeof(row) + sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in row.items())
+
+class TrackingCache:
+    """Size-bounded cache of tracking rows keyed by AWB_CODE.
+
+    TTLs depend on SHIPMENT_STATUS: rows in a terminal state are kept for a
+    long time, in-transit rows only briefly, and AWBs the warehouse does not
+    know are remembered for ``miss_ttl``. Concurrent lookups of the same AWB
+    share a single warehouse query.
+    """
+
+    def __init__(self,
+                 max_entries: int = TRACKING_CACHE_MAX_ENTRIES,
+                 terminal_ttl: int = TRACKING_CACHE_TERMINAL_TTL,
+                 active_ttl: int = TRACKING_CACHE_ACTIVE_TTL,
+                 miss_ttl: int = TRACKING_CACHE_MISS_TTL,
+                 terminal_statuses: Iterable[str] = TERMINAL_STATUSES):
+        self.max_entries = max_entries
+        self.terminal_ttl = terminal_ttl
+        self.active_ttl = active_ttl
+        self.miss_ttl = miss_ttl
+        self.terminal_statuses = {normalize_status(s) for s in terminal_statuses}
+
+        self._entries = OrderedDict()  # awb -> (row or None, expires_at, size)
+        self._inflight: Dict[str, Future] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'coalesced': 0,
+            'expired': 0,
+            'evictions': 0,
+            'loads': 0
+        }
+
+    def ttl_for(self, row: Optional[Dict[str, Any]]) -> int:
+        """TTL in seconds for a tracking row, based on its status"""
+        if row is None:
+            return self.miss_ttl
+        if normalize_status(row.get('SHIPMENT_STATUS')) in self.terminal_statuses:
+            return self.terminal_ttl
+        return self.active_ttl
+
+    def get_many(self,
+                 awbs: List[str],
+                 loader: Callable[[List[str]], Dict[str, Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+        """Return rows for the AWBs that exist, loading misses in one batch.
+
+        ``loader`` receives the AWBs nobody else is fetching and returns a
+        mapping of AWB to row; AWBs missing from that mapping are not found.
+        """
+        results: Dict[str, Dict[str, Any]] = {}
+        to_load: List[str] = []
+        waiting: Dict[str, Future] = {}
+        now = time.time()
+
+        with self._lock:
+            for awb in awbs:
+                entry = self._entries.get(awb)
+                if entry is not None:
+                    if entry[1] > now:
+                        self._entries.move_to_end(awb)
+                        self._stats['hits'] += 1
+                        if entry[0] is not None:
+                            results[awb] = entry[0]
+                        continue
+                    self._stats['expired'] += 1
+                    self._remove(awb)
+
+                if awb in self._inflight:
+                    self._stats['coalesced'] += 1
+                    waiting[awb] = self._inflight[awb]
+                else:
+                    self._stats['misses'] += 1
+                    self._inflight[awb] = Future()
+                    to_load.append(awb)
+
+        if to_load:
+            results.update(self._load(to_load, loader))
+
+        for awb, future in waiting.items():
+            row = future.result()
+            if row is not None:
+                results[awb] = row
+        return results
+
+    def get(self, awb: str, loader: Callable[[List[str]], Dict[str, Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        """Return the row for one AWB, or None if it does not exist"""
+        return self.get_many([awb], loader).get(awb)
+
+    def put(self, row: Dict[str, Any]) -> None:
+        """Insert or refresh a single tracking row"""
+        with self._lock:
+            self._store(row['AWB_CODE'], row, time.time())
+
+    def warm(self, frame: pd.DataFrame) -> int:
+        """Pre-load tracking rows, e.g. from a bulk export of recent shipments"""
+        now = time.time()
+        records = frame.drop_duplicates(subset='AWB_CODE', keep='last').to_dict('records')
+        with self._lock:
+            for row in records:
+                self._store(row['AWB_CODE'], row, now)
+        return len(records)
+
+    def invalidate(self, awbs: Iterable[str] = None) -> None:
+        """Drop the given AWBs, or everything"""
+        with self._lock:
+            if awbs is None:
+                self._entries.clear()
+                self._bytes = 0
+            else:
+                for awb in awbs:
+                    if awb in self._entries:
+                        self._remove(awb)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit rate, counters and approximate memory use"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                'entries': len(self._entries),
+                'memory_bytes': self._bytes,
+                'max_entries': self.max_entries
+            })
+        lookups = stats['hits'] + stats['misses'] + stats['coalesced']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        return stats
+
+    def _load(self, awbs: List[str], loader) -> Dict[str, Dict[str, Any]]:
+        try:
+            loaded = loader(awbs)
+        except Exception as e:
+            with self._lock:
+                futures = [self._inflight.pop(awb) for awb in awbs]
+            for future in futures:
+                future.set_exception(e)
+            raise
+
+        now = time.time()
+        with self._lock:
+            self._stats['loads'] += 1
+            futures = []
+            for awb in awbs:
+                row = loaded.get(awb)
+                self._store(awb, row, now)
+                futures.append((self._inflight.pop(awb), row))
+        for future, row in futures:
+            future.set_result(row)
+        return {awb: loaded[awb] for awb in awbs if loaded.get(awb) is not None}
+
+    def _store(self, awb: str, row: Optional[Dict[str, Any]], now: float) -> None:
+        """Insert an entry and evict least recently used ones (lock held)"""
+        if awb in self._entries:
+            self._remove(awb)
+        size = _row_size(row)
+        self._entries[awb] = (row, now + self.ttl_for(row), size)
+        self._bytes += size
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+            self._stats['evictions'] += 1
+
+    def _remove(self, awb: str) -> None:
+        _, _, size = self._entries.pop(awb)
+        self._bytes -= size
+
+_cache: Optional[TrackingCache] = None
+_cache_lock = threading.Lock()
+
+def get_tracking_cache() -> TrackingCache:
+    """Get the process-wide tracking cache, creating it on first use"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = TrackingCache()
+    return _cache
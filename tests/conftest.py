@@ -0,0 +1,27 @@
+import duckdb
+import pytest
+from config import TABLE_NAME
+from database.connector import configure_pool
+from utils.llm import configure_chat_model
+from benchmarks.fake_llm import fake_chat_model_factory
+from benchmarks.synthetic import generate_shipments
+from benchmarks.warehouse import connector
+
+@pytest.fixture
+def warehouse():
+    """In-memory DuckDB stand-in for Snowflake, behind the process-wide pool"""
+    db = duckdb.connect()
+    shipments = generate_shipments(2000, seed=1, start="2024-01-01", days=90)
+    db.register('shipments', shipments)
+    db.execute(f"CREATE TABLE {TABLE_NAME} AS SELECT * FROM shipments")
+    db.unregister('shipments')
+    configure_pool(connector(db))
+    yield db
+    db.close()
+
+@pytest.fixture
+def chat_model():
+    """Canned, instant replies in place of OpenAI for agents built in the test"""
+    configure_chat_model(fake_chat_model_factory(latency=0))
+    yield
+    configure_chat_model()
@@ -0,0 +1,74 @@
+import time
+import pandas as pd
+import pytest
+from config import TABLE_NAME
+from database.awb_index import AwbIndex
+from database.backends import ParquetMirror
+from database.sync import IncrementalSync
+from benchmarks.bench_sync import change_source
+
+def shipments(awbs, status, courier="Delhivery"):
+    return pd.DataFrame({
+        'AWB_CODE': awbs,
+        'SHIPMENT_STATUS': status,
+        'ASSIGNED_DATE_TIME': pd.Timestamp("2024-01-01 10:00"),
+        'NO_OF_ATTEMPTS': 1,
+        'PARENT_COURIER': courier
+    })
+
+@pytest.fixture
+def index(tmp_path):
+    index = AwbIndex(str(tmp_path / "index"), max_deltas=2)
+    index.add(shipments([f"AWB{i:08d}" for i in range(100)], "IN TRANSIT"))
+    index.mark_synced()
+    return index
+
+def test_lookups(index):
+    row = index.get("awb00000042")
+    assert row['AWB_CODE'] == "AWB00000042" and row['SHIPMENT_STATUS'] == "IN TRANSIT"
+    assert row['NO_OF_ATTEMPTS'] == 1 and row['ZONE'] is None and pd.isna(row['AWB_DELIVERED_DATE'])
+    assert index.get("AWB99999999") is None
+    assert index.get("AWB000000420") is None  # longer than any key
+
+def test_newest_segment_wins(index):
+    index.add(shipments(["AWB00000001"], "DELIVERED"))
+    index.add(shipments(["AWB00000001", "AWB00000100"], "RTO", courier=None))
+    assert index.stats()['segments'] == 3
+    assert index.get("AWB00000001")['SHIPMENT_STATUS'] == "RTO"
+    assert index.get("AWB00000001")['PARENT_COURIER'] is None
+    assert index.get("AWB00000100")['SHIPMENT_STATUS'] == "RTO"
+
+def test_deltas_merge_and_keep_the_latest_rows(index):
+    for i in range(3):
+        index.add(shipments(["AWB00000001", f"AWB1000000{i}"], f"STATUS {i}"))
+    assert index.stats()['segments'] == 2  # the deltas merged, not yet into the base
+    assert index.get("AWB00000001")['SHIPMENT_STATUS'] == "STATUS 2"
+    assert index.get("AWB00000002")['SHIPMENT_STATUS'] == "IN TRANSIT"
+
+    for i in range(3, 12):
+        index.add(shipments([f"AWB1000{i:04d}"], "DELIVERED"))
+    stats = index.stats()
+    assert stats['segments'] < 3 and stats['rows'] == 100 + 12
+    assert index.get("AWB10000000")['SHIPMENT_STATUS'] == "STATUS 0"
+    assert index.get("AWB00000001")['SHIPMENT_STATUS'] == "STATUS 2"
+
+def test_stale_index_serves_terminal_rows_only(index):
+    index.add(shipments(["AWB00000001"], "DELIVERED"))
+    index.max_age = 0
+    time.sleep(0.01)
+    assert set(index.get_many(["AWB00000001", "AWB00000002"])) == {"AWB00000001"}
+
+def test_sync_keeps_the_index_current(warehouse, tmp_path):
+    index = AwbIndex(str(tmp_path / "index"))
+    sync = IncrementalSync(ParquetMirror(str(tmp_path / "mirror")), overlap_seconds=60, index=index)
+    sync.run()
+    change_source(warehouse, 2000, 0.05, 20, seed=7)
+    sync.run()
+
+    changed = warehouse.execute(f"""
+        SELECT AWB_CODE, SHIPMENT_STATUS FROM {TABLE_NAME}
+        WHERE AWB_DELIVERED_DATE >= now()::TIMESTAMP - INTERVAL 1 HOUR
+    """).df()
+    rows = index.get_many(changed['AWB_CODE'].tolist())
+    assert len(rows) == len(changed) > 0
+    assert all(rows[awb]['SHIPMENT_STATUS'] == status for awb, status in zip(changed['AWB_CODE'], changed['SHIPMENT_STATUS']))
@@ -0,0 +1,37 @@
+import database.connector as connector
+from database.backends import DuckDBBackend, ParquetMirror, transpile
+from database.connector import get_pool, run_query
+
+def test_transpile_to_duckdb():
+    sql = transpile("SELECT DATEADD(DAY, -7, CURRENT_DATE())", 'duckdb')
+    assert 'DATEADD' not in sql.upper()
+    assert transpile("SELECT 1", 'snowflake') == "SELECT 1"
+
+def test_mirror_parity_with_source(warehouse, tmp_path):
+    mirror = ParquetMirror(str(tmp_path))
+    export = mirror.export(full=True)
+    assert export['rows'] == 2000
+    assert mirror.full_history
+    local = connector.ConnectionPool(DuckDBBackend(str(tmp_path)).connect)
+    query = "SELECT ZONE, COUNT(*) AS N FROM VIEW_TITANIUM_PLATINUM_REPORT GROUP BY ZONE ORDER BY ZONE"
+    assert run_query(query, pool=local).frame.values.tolist() == run_query(query).frame.values.tolist()
+
+def test_partial_mirror_is_not_used_for_analytics(warehouse, tmp_path, monkeypatch):
+    backend = DuckDBBackend(str(tmp_path))
+    monkeypatch.setattr(connector, 'ANALYTICS_BACKEND', 'duckdb')
+    monkeypatch.setattr(connector, 'get_backend', lambda name=None: backend)
+    monkeypatch.setattr(connector, '_analytics_pool', None)
+
+    ParquetMirror(str(tmp_path)).export(months=1)
+    assert not backend.ready()
+    assert connector.get_analytics_pool() is get_pool()
+
+    ParquetMirror(str(tmp_path)).export(full=True)
+    assert backend.ready()
+    assert connector.get_analytics_pool() is not get_pool()
+
+def test_partial_export_keeps_full_history(warehouse, tmp_path):
+    mirror = ParquetMirror(str(tmp_path))
+    mirror.export(full=True)
+    mirror.export(months=1)
+    assert mirror.full_history
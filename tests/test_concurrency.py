@@ -0,0 +1,62 @@
+import asyncio
+from langchain_core.messages import HumanMessage
+import agents.orchestrator as orchestrator
+from utils.concurrency import BackendLimiter
+from utils.query_classifier import QueryClassifier
+
+def test_slot_skips_waiters_whose_loop_has_closed():
+    limiter = BackendLimiter(1)
+    asyncio.run(limiter.acquire())
+
+    dead = asyncio.new_event_loop()
+    dead.create_task(limiter.acquire())
+    dead.run_until_complete(asyncio.sleep(0))  # queued behind the held slot
+    dead.close()
+
+    async def wait_for_slot():
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        limiter.release()
+        await asyncio.wait_for(waiter, timeout=1)
+
+    asyncio.run(wait_for_slot())
+    assert limiter.active == 1
+
+def test_limits_concurrency():
+    limiter = BackendLimiter(2)
+    running, peak = 0, 0
+
+    async def work():
+        nonlocal running, peak
+        async with limiter:
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+    async def main():
+        await asyncio.gather(*(work() for _ in range(10)))
+
+    asyncio.run(main())
+    assert peak == 2 and limiter.active == 0
+
+class CountingCache:
+    def __init__(self):
+        self.checks = 0
+
+    def current_watermark(self):
+        self.checks += 1
+
+def test_watermark_prefetched_only_for_operations_questions(monkeypatch):
+    cache = CountingCache()
+    monkeypatch.setattr(orchestrator, 'get_result_cache', lambda: cache)
+    monkeypatch.setattr(orchestrator, 'get_classifier', lambda: QueryClassifier(llm_fallback=False))
+
+    def classify(question):
+        state = {"messages": [HumanMessage(content=question)], "context": {}}
+        return asyncio.run(orchestrator.aclassify_query(state))["query_type"]
+
+    assert classify("Where is AWB12345678?") == "delivery"
+    assert cache.checks == 0
+    assert classify("Show NDR rate by zone") == "operations"
+    assert cache.checks == 1
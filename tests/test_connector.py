@@ -0,0 +1,124 @@
+import sqlite3
+import threading
+import time
+import duckdb
+import pytest
+import database.connector
+from database.connector import (
+    CancellationToken,
+    ConnectionPool,
+    PoolTimeoutError,
+    QueryCancelledError,
+    QueryTimeoutError,
+    configure_pool,
+    run_query
+)
+
+def sqlite_pool(**kwargs):
+    return ConnectionPool(lambda: sqlite3.connect(":memory:", check_same_thread=False), **kwargs)
+
+def test_connections_are_reused():
+    pool = sqlite_pool(max_size=2)
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        assert second is first
+    assert pool.stats()['created'] == 1
+
+def test_checkout_times_out_when_exhausted():
+    pool = sqlite_pool(max_size=1, checkout_timeout=0.05)
+    held = pool.acquire()
+    with pytest.raises(PoolTimeoutError):
+        pool.acquire()
+    pool.release(held)
+    assert pool.stats()['timeouts'] == 1
+
+def test_waiter_gets_the_released_connection():
+    pool = sqlite_pool(max_size=1, checkout_timeout=2)
+    held = pool.acquire()
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pool.acquire()))
+    waiter.start()
+    pool.release(held)
+    waiter.join(2)
+    assert got == [held]
+    assert pool.stats()['waits'] == 1
+
+def test_unhealthy_idle_connections_are_replaced():
+    pool = sqlite_pool(ping_interval=0)
+    conn = pool.acquire()
+    pool.release(conn)
+    conn.close()
+    assert pool.acquire() is not conn
+    assert pool.stats()['created'] == 2
+
+def test_configured_pool_defaults_to_the_warehouse_backend(monkeypatch):
+    class Backend:
+        def connect(self):
+            return sqlite3.connect(":memory:", check_same_thread=False)
+
+    backend = Backend()
+    monkeypatch.setattr(database.connector, 'get_backend', lambda name=None: backend)
+    monkeypatch.setattr(database.connector, '_pool', None)
+    pool = configure_pool(max_size=1)
+    assert pool._connect == backend.connect
+    with pool.connection() as conn:
+        assert isinstance(conn, sqlite3.Connection)
+
+# Endless statements for each driver, to be stopped by a timeout or a cancel
+ENDLESS = {
+    'sqlite': "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) SELECT COUNT(*) FROM c",
+    'duckdb': "SELECT SUM(hash(i)) FROM range(1000000000000) t(i)"
+}
+
+@pytest.fixture(params=['sqlite', 'duckdb'])
+def driver(request):
+    """A pool on either driver holding a 5000-row table T"""
+    if request.param == 'sqlite':
+        db = sqlite3.connect(":memory:", check_same_thread=False)
+        db.execute("CREATE TABLE T AS WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 5000) "
+                   "SELECT x AS ID, 'shipment ' || x AS NAME FROM c")
+        pool = ConnectionPool(lambda: db)
+    else:
+        db = duckdb.connect()
+        db.execute("CREATE TABLE T AS SELECT i AS ID, 'shipment ' || i AS NAME FROM range(1, 5001) t(i)")
+        pool = ConnectionPool(db.cursor)
+    yield request.param, pool
+    db.close()
+
+def test_run_query_fetches_everything_under_the_caps(driver):
+    _, pool = driver
+    result = run_query("SELECT * FROM T ORDER BY ID", pool=pool, fetch_size=1000)
+    assert not result.truncated and len(result.frame) == 5000
+    assert list(result.frame.columns) == ['ID', 'NAME'] and result.frame['ID'].iloc[-1] == 5000
+
+def test_run_query_truncates_at_max_rows(driver):
+    _, pool = driver
+    result = run_query("SELECT * FROM T ORDER BY ID", pool=pool, max_rows=1500, fetch_size=1000)
+    assert result.truncated_by == 'max_rows' and len(result.frame) == 1500
+
+def test_run_query_truncates_at_max_bytes(driver):
+    _, pool = driver
+    full = run_query("SELECT * FROM T", pool=pool)
+    result = run_query("SELECT * FROM T", pool=pool, max_bytes=full.num_bytes // 4, fetch_size=1000)
+    assert result.truncated_by == 'max_bytes'
+    assert 0 < len(result.frame) < 5000 and result.num_bytes <= full.num_bytes // 4
+
+def test_run_query_times_out(driver):
+    name, pool = driver
+    started = time.monotonic()
+    with pytest.raises(QueryTimeoutError):
+        run_query(ENDLESS[name], pool=pool, timeout=0.2)
+    assert time.monotonic() - started < 5
+    assert run_query("SELECT COUNT(*) AS N FROM T", pool=pool).frame['N'][0] == 5000  # connection still usable
+
+def test_run_query_is_cancelled(driver):
+    name, pool = driver
+    token = CancellationToken()
+    threading.Timer(0.2, token.cancel).start()
+    with pytest.raises(QueryCancelledError):
+        run_query(ENDLESS[name], pool=pool, cancel_token=token, timeout=None)
+
+    # A cancelled token stops later statements before they start
+    with pytest.raises(QueryCancelledError):
+        run_query("SELECT 1", pool=pool, cancel_token=token)
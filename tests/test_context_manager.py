@@ -0,0 +1,78 @@
+import threading
+import time
+import pytest
+from agents.support.context_manager import ContextManager, MemoryContextStore, _summarizing
+
+ENTITIES = ["AWB00000001", "zone_a", "Delhivery", "COD"]
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.005)
+
+@pytest.fixture
+def manager():
+    """Six turns through a three-turn ring buffer, the first three folded extractively"""
+    manager = ContextManager("trim", store=MemoryContextStore(), max_turns=3)
+    for i in range(6):
+        manager.update_context(f"question number {i}", "answer " * 20, entities=[ENTITIES[i % 4]])
+    return manager
+
+def test_ring_buffer_overflows_into_the_summary(manager):
+    state = manager.context
+    assert [turn['query'] for turn in state['turns']] == [f"question number {i}" for i in (3, 4, 5)]
+    assert state['pending'] == []
+    assert state['summary'] == "question number 0; question number 1; question number 2"
+    assert state['turn_count'] == 6
+
+def test_budget_trims_old_turns_then_summary_then_entities_then_last_turn(manager):
+    full = manager.get_relevant_context("q")
+    turns = [turn['query'] for turn in full['recent_history']]
+    assert len(turns) == 3 and full['active_entities'][0] == ENTITIES[5 % 4]
+
+    stages = set()
+    for budget in range(400, -1, -1):
+        manager.token_budget = budget
+        context = manager.get_relevant_context("q")
+        kept = [turn['query'] for turn in context['recent_history']]
+        assert kept == turns[len(turns) - len(kept):]  # newest turns kept
+        assert full['summary'].endswith(context['summary'])  # summary cut from the front
+        assert context['active_entities'] == full['active_entities'][:len(context['active_entities'])]
+        if len(kept) < len(turns):
+            stages.add('turns')
+        if context['summary'] != full['summary']:
+            assert len(kept) <= 1
+            stages.add('summary')
+        if context['active_entities'] != full['active_entities']:
+            assert context['summary'] == ""
+            stages.add('entities')
+        if not kept:
+            assert context['active_entities'] == []
+            stages.add('last turn')
+    assert stages == {'turns', 'summary', 'entities', 'last turn'}
+
+def test_background_summary_is_merged_with_turns_added_meanwhile():
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def summarizer(previous, turns):
+        calls.append([turn['query'] for turn in turns])
+        started.set()
+        release.wait(5)
+        return f"{previous}+{len(turns)}"
+
+    manager = ContextManager("background", store=MemoryContextStore(), max_turns=1, summarizer=summarizer)
+    manager.update_context("first", "a")
+    manager.update_context("second", "b")
+    assert started.wait(5)
+    manager.update_context("third", "c")  # while the summarizer runs
+    assert [turn['query'] for turn in manager.context['pending']] == ["first", "second"]
+    assert manager.get_relevant_context("q")['summary'].endswith("first; second")
+
+    release.set()
+    wait_for(lambda: "background" not in _summarizing)
+    state = manager.context
+    assert calls == [["first"], ["second"]]
+    assert state['summary'] == "+1+1" and state['pending'] == []
+    assert [turn['query'] for turn in state['turns']] == ["third"]
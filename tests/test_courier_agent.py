@@ -0,0 +1,25 @@
+import pytest
+from agents.business.courier_agent import CourierAgent
+from utils.metrics import MetricsCalculator
+
+@pytest.fixture
+def agent(warehouse, chat_model):
+    agent = CourierAgent()
+    agent.metrics_calculator = MetricsCalculator(use_rollup=False)
+    return agent
+
+def test_performance_per_courier(agent):
+    prompt, inputs = agent._build_prompt("Compare courier FASR and RTO rate")
+    rows = inputs["data"]
+    assert len(rows) == 7 and sum(row['total_shipments'] for row in rows) == 2000
+    assert {'PARENT_COURIER', 'fasr', 'rto_rate'} <= set(rows[0])
+
+def test_performance_per_courier_and_zone(agent):
+    prompt, inputs = agent._build_prompt("Compare courier FASR by zone")
+    assert {'PARENT_COURIER', 'ZONE'} <= set(inputs["data"][0])
+
+def test_weight_questions_get_weight_data(agent):
+    prompt, inputs = agent._build_prompt("Weight discrepancy by courier")
+    assert set(prompt.input_variables) == {"query", "weight_data"}
+    assert all(0 <= row['weight_discrepancy_rate'] <= 100 for row in inputs["weight_data"])
+    assert "error" not in agent.process_query("Weight discrepancy by courier").lower()
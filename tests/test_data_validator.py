@@ -0,0 +1,90 @@
+import pandas as pd
+import pytest
+from agents.support.data_validator import DataValidator, _coerce_bool, _parse_datetimes, _to_category
+
+def row(awb, zone="z_a", tier="Tier1", assigned="2024-01-05 10:30:00", delivered=None, rto=0, flag=1):
+    return {
+        'AWB_CODE': awb, 'ZONE': zone, 'CITY_TIER': tier, 'SHIPMENT_STATUS': "DELIVERED",
+        'ASSIGNED_DATE_TIME': assigned, 'AWB_DELIVERED_DATE': delivered,
+        'RTO_SHIPMENTS': rto, 'DELIVERED_SHIPMENTS': flag, 'NDR_RAISED_SHIPMENTS': 0
+    }
+
+# Values on which the per-row and the frame paths are meant to agree
+ROWS = [
+    row("AWB00000001"),
+    row("AWB00000002", zone="z_x"),
+    row("AWB00000003", tier="Tier9"),
+    row("AWB00000004", zone="north", tier="Metro", rto=1, flag=0),
+    row("AWB00000005", assigned="2024-01-05 10:30:00.250000", delivered="2024-01-07 09:00:00"),
+    row("AWB00000006", assigned="2024-01-05T10:30:00", delivered="2024-01-08"),
+    row("AWB00000007", zone="z_e2", tier="Others", rto=True, flag=False)
+]
+
+@pytest.fixture
+def validator():
+    return DataValidator()
+
+def test_validate_frame_matches_validate_data(validator):
+    masks = validator.validate_frame(pd.DataFrame(ROWS)).masks
+    for i, data in enumerate(ROWS):
+        per_row = {field for field, _ in validator.validate_data(data)['invalid_values']}
+        in_frame = {field for field in ('ZONE', 'CITY_TIER') if masks[f'invalid:{field}'][i]}
+        assert in_frame == per_row, data['AWB_CODE']
+
+def test_missing_columns_match(validator):
+    rows = [{k: v for k, v in data.items() if k not in ('ZONE', 'RTO_SHIPMENTS')} for data in ROWS]
+    frame = validator.validate_frame(pd.DataFrame(rows))
+    assert frame.missing_fields == validator.validate_data(rows[0])['missing_fields'] == ['ZONE', 'RTO_SHIPMENTS']
+    assert not frame.is_valid
+
+def test_clean_frame_matches_clean_data(validator):
+    cleaned, validation = validator.clean_frame(pd.DataFrame(ROWS))
+    assert validation.counts['invalid:ASSIGNED_DATE_TIME'] == 0
+    for i, data in enumerate(ROWS):
+        expected = validator.clean_data(data)
+        for field in ('ASSIGNED_DATE_TIME', 'AWB_DELIVERED_DATE'):
+            if expected[field] is None:
+                assert pd.isna(cleaned[field][i])
+            else:
+                assert cleaned[field][i] == expected[field]
+        for field in ('RTO_SHIPMENTS', 'DELIVERED_SHIPMENTS', 'NDR_RAISED_SHIPMENTS'):
+            assert cleaned[field][i] == expected[field]
+
+def test_unparseable_dates_are_missing_in_both(validator):
+    data = row("AWB00000008", assigned="not a date")
+    cleaned, validation = validator.clean_frame(pd.DataFrame([data]))
+    assert validator.clean_data(data)['ASSIGNED_DATE_TIME'] is None
+    assert pd.isna(cleaned['ASSIGNED_DATE_TIME'][0])
+    assert validation.counts['invalid:ASSIGNED_DATE_TIME'] == 1
+
+def test_parse_datetimes_tries_each_format_on_what_is_left():
+    values = pd.Series(["2024-01-05 10:30:00", "2024-01-05 10:30:00.5", "2024-01-05T10:30:00",
+                        "2024-01-05", None, "05/01/2024"])
+    parsed = _parse_datetimes(values)
+    assert list(parsed[:4]) == [pd.Timestamp("2024-01-05 10:30:00"), pd.Timestamp("2024-01-05 10:30:00.5"),
+                                pd.Timestamp("2024-01-05 10:30:00"), pd.Timestamp("2024-01-05")]
+    assert parsed[4:].isna().all()
+    already = pd.Series(pd.to_datetime(["2024-01-05"]))
+    assert _parse_datetimes(already) is already
+
+def test_coerce_bool_strings_and_nulls():
+    values, invalid = _coerce_bool(pd.Series(["Yes", " true ", "1", "0", "n", "", None, "maybe", True, False]))
+    assert list(values) == [True, True, True, False, False, False, False, False, True, False]
+    assert list(invalid) == [False] * 7 + [True, False, False]
+
+    values, invalid = _coerce_bool(pd.Series([1, 0, None]))
+    assert list(values) == [True, False, False] and not invalid.any()
+    values, invalid = _coerce_bool(pd.Series([True, None], dtype='boolean'))
+    assert list(values) == [True, False] and not invalid.any()
+
+def test_categorical_input_is_recoded(validator):
+    zones = pd.Series(["z_a", "z_x", None, "z_e2"], dtype="category")
+    recoded = _to_category(zones, ["z_a", "z_b", "z_e2"])
+    assert list(recoded.cat.categories) == ["z_a", "z_b", "z_e2"]
+    assert recoded.isna().tolist() == [False, True, True, False]
+    assert recoded[3] == "z_e2"
+
+    frame = pd.DataFrame(ROWS).astype({'ZONE': 'category'})
+    cleaned, validation = validator.clean_frame(frame)
+    assert validation.masks['invalid:ZONE'].tolist() == [False, True, False, True, False, False, False]
+    assert cleaned['ZONE'].isna().tolist() == validation.masks['invalid:ZONE'].tolist()
@@ -0,0 +1,25 @@
+import pytest
+from agents.business.delivery_agent import DeliveryAgent
+from database.awb_index import AwbIndex
+from database.connector import CancellationToken
+from database.tracking_cache import TrackingCache
+
+@pytest.fixture
+def agent(warehouse, chat_model, tmp_path):
+    agent = DeliveryAgent()
+    agent.awb_index = AwbIndex(str(tmp_path / "index"))  # empty, so lookups reach the warehouse
+    agent.tracking_cache = TrackingCache()
+    return agent
+
+def test_tracking_lookup(agent):
+    assert agent.process_query("Where is AWB00000001?").startswith("Tracking Information for AWB00000001")
+
+def test_cancelled_lookups_do_not_reach_the_warehouse(agent):
+    token = CancellationToken()
+    token.cancel()
+    response = agent.process_query("Where is AWB00000001?", {'cancel_token': token})
+    assert not response.startswith("Tracking Information")
+    assert agent.tracking_cache.stats()['entries'] == 0
+
+    response, _, _ = agent.process_query("AWB00000001 and AWB00000002", {'cancel_token': CancellationToken()})
+    assert "(2 found)" in response
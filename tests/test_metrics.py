@@ -0,0 +1,16 @@
+import pandas as pd
+import pytest
+from config import TABLE_NAME
+from utils.metrics import MetricsCalculator
+from benchmarks.bench_metrics import SCENARIOS
+
+WEIGHT_SCENARIO = ("weight by courier", ['weight_discrepancy_rate', 'avg_excess_weight'], None, ['PARENT_COURIER'])
+
+@pytest.mark.parametrize("name, metrics, filters, group_by", SCENARIOS + [WEIGHT_SCENARIO],
+                         ids=[scenario[0] for scenario in SCENARIOS + [WEIGHT_SCENARIO]])
+def test_pushdown_matches_local(warehouse, name, metrics, filters, group_by):
+    frame = warehouse.execute(f"SELECT * FROM {TABLE_NAME}").df()
+    local = MetricsCalculator(frame=frame).compute(metrics, filters, group_by)
+    pushed = MetricsCalculator(use_rollup=False).compute(metrics, filters, group_by)
+    assert len(local) > 0
+    pd.testing.assert_frame_equal(local, pushed, check_dtype=False)
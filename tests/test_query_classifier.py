@@ -0,0 +1,35 @@
+import pytest
+from utils.query_classifier import QueryClassifier
+
+@pytest.fixture
+def classifier():
+    return QueryClassifier(llm_fallback=False)
+
+def test_courier_questions_fan_out_to_the_courier_agent(classifier):
+    result = classifier.classify_rules("Compare courier FASR and RTO rate by zone")
+    assert result["primary_agent"] == "operations"
+    assert result["secondary_agents"] == ["courier"]
+    assert classifier.classify_rules("Weight discrepancy rate by zone")["secondary_agents"] == ["courier"]
+
+def test_awbs_in_analytics_questions_bring_in_the_delivery_agent(classifier):
+    result = classifier.classify_rules("Compare the RTO rate of AWB12345678 with zone a")
+    assert result["primary_agent"] == "operations"
+    assert result["secondary_agents"] == ["delivery"]
+
+def test_primary_routing(classifier):
+    assert classifier.classify_rules("Where is AWB12345678?")["primary_agent"] == "delivery"
+    assert classifier.classify_rules("Show NDR rate month over month")["metrics"] == ["ndr"]
+    assert classifier.classify_rules("How do I change my address?")["primary_agent"] == "customer"
+
+def test_greetings_skip_the_llm_fallback(monkeypatch):
+    classifier = QueryClassifier()
+    asked = []
+    monkeypatch.setattr(classifier, '_classify_llm', lambda query, rules: asked.append(query) or rules)
+    for greeting in ["hi", "Hello there!", "thanks a lot", "Good morning :)", "ok"]:
+        result = classifier.classify(greeting)
+        assert result["primary_agent"] == "customer" and result["confidence_score"] >= classifier.confidence_threshold
+    assert asked == []
+
+    classifier.classify("which one was worse")
+    classifier.classify("hi, which one was worse last time around")
+    assert asked == ["which one was worse", "hi, which one was worse last time around"]
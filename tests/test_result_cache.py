@@ -0,0 +1,56 @@
+import pandas as pd
+from database.result_cache import ResultCache, make_cache_key
+
+class Watermark:
+    value = "2024-03-01"
+
+    def __call__(self):
+        return self.value
+
+def memory_cache(**kwargs):
+    return ResultCache(database_url=None, watermark_interval=0, **kwargs)
+
+def test_formatting_differences_share_a_key():
+    assert make_cache_key("select *\n  from t -- all rows\n;") == make_cache_key("SELECT * FROM t")
+    assert make_cache_key("SELECT * FROM t WHERE z = 'a'") != make_cache_key("SELECT * FROM t WHERE z = 'A'")
+
+def test_hit_until_the_watermark_moves():
+    watermark = Watermark()
+    cache = memory_cache(watermark_provider=watermark)
+    cache.put("SELECT 1", pd.DataFrame({'a': [1]}))
+    assert cache.get("select 1")['a'].tolist() == [1]
+
+    watermark.value = "2024-03-02"
+    assert cache.get("SELECT 1") is None
+    assert cache.stats()['stale'] == 1
+
+def test_expired_entries_miss():
+    cache = memory_cache(ttl=-1, watermark_provider=Watermark())
+    cache.put("SELECT 1", pd.DataFrame({'a': [1]}))
+    assert cache.get("SELECT 1") is None
+
+def test_evicts_least_recently_used_beyond_max_bytes():
+    frame = pd.DataFrame({'a': range(100)})
+    size = int(frame.memory_usage(index=True, deep=True).sum())
+    cache = memory_cache(max_bytes=size * 2, watermark_provider=Watermark())
+    for sql in ("SELECT 1", "SELECT 2"):
+        cache.put(sql, frame)
+    cache.get("SELECT 1")
+    cache.put("SELECT 3", frame)
+    assert cache.get("SELECT 2") is None
+    assert cache.get("SELECT 1") is not None
+    assert cache.stats()['evictions'] == 1
+
+def test_persistent_tier_survives_a_restart(tmp_path):
+    url = f"sqlite:///{tmp_path / 'cache.db'}"
+    ResultCache(database_url=url, watermark_provider=Watermark()).put("SELECT 1", pd.DataFrame({'a': [1, 2]}))
+    restarted = ResultCache(database_url=url, watermark_provider=Watermark())
+    assert restarted.get("SELECT 1")['a'].tolist() == [1, 2]
+    assert restarted.stats()['persistent_hits'] == 1
+
+def test_invalidate_drops_both_tiers(tmp_path):
+    cache = ResultCache(database_url=f"sqlite:///{tmp_path / 'cache.db'}", watermark_provider=Watermark())
+    cache.put("SELECT 1", pd.DataFrame({'a': [1]}))
+    cache.invalidate()
+    assert cache.get("SELECT 1") is None
+    assert cache.stats()['entries'] == 0
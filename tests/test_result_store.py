@@ -0,0 +1,63 @@
+import os
+import time
+import pandas as pd
+import pyarrow as pa
+import pytest
+from database.result_store import ResultExpiredError, ResultStore
+
+def frame(rows):
+    return pd.DataFrame({'AWB_CODE': [f"AWB{i:08d}" for i in range(rows)], 'N': range(rows)})
+
+@pytest.fixture
+def spilling(tmp_path):
+    """A store with no memory budget, so every result goes straight to Parquet"""
+    return ResultStore(str(tmp_path), max_memory_bytes=0, page_size=10)
+
+def test_results_over_budget_spill_to_parquet(spilling):
+    ref = spilling.put(frame(95))
+    stats = spilling.stats()
+    assert stats['spilled'] == 1 and stats['in_memory'] == 0 and stats['memory_bytes'] == 0
+    assert os.path.exists(spilling._path(ref.result_id))
+    assert ref.num_pages == 10
+    pd.testing.assert_frame_equal(ref.to_frame(), frame(95))
+    assert spilling.stats()['pages_from_disk'] == 1
+
+def test_least_recently_used_result_spills_first(tmp_path):
+    nbytes = pa.Table.from_pandas(frame(50), preserve_index=False).nbytes
+    store = ResultStore(str(tmp_path), max_memory_bytes=int(1.5 * nbytes))
+    old, new = store.put(frame(50)), store.put(frame(50))
+    assert not os.path.exists(store._path(new.result_id))
+    assert os.path.exists(store._path(old.result_id))
+
+@pytest.mark.parametrize("page, page_size", [(0, 10), (1, 15), (3, 7), (9, 10), (4, 25)])
+def test_pages_read_from_disk_match_memory(spilling, tmp_path, page, page_size):
+    in_memory = ResultStore(str(tmp_path / "memory"), page_size=10)
+    expected = in_memory.get_page(in_memory.put(frame(95)).result_id, page, page_size)
+    got = spilling.get_page(spilling.put(frame(95)).result_id, page, page_size)
+    pd.testing.assert_frame_equal(got, expected)
+    assert len(got) == min(page_size, max(95 - page * page_size, 0))
+
+def test_page_past_the_end_is_empty(spilling):
+    ref = spilling.put(frame(95))
+    page = ref.page(10)
+    assert page.empty and list(page.columns) == ['AWB_CODE', 'N']
+
+def test_expired_results_raise(tmp_path):
+    store = ResultStore(str(tmp_path), max_memory_bytes=0)
+    ref = store.put(frame(20))
+    path = store._path(ref.result_id)
+    store.ttl = 0
+    time.sleep(0.01)
+    assert store.cleanup() == 1
+    assert not os.path.exists(path)
+    assert store.stats()['expired'] == 1
+    with pytest.raises(ResultExpiredError):
+        ref.page(0)
+    with pytest.raises(ResultExpiredError):
+        store.ref(ref.result_id)
+
+def test_missing_spill_file_raises(spilling):
+    ref = spilling.put(frame(20))
+    os.remove(spilling._path(ref.result_id))
+    with pytest.raises(ResultExpiredError):
+        ref.page(0)
@@ -0,0 +1,49 @@
+import json
+import os
+import time
+from datetime import datetime, timedelta
+import utils.metrics
+from agents.business.operations_agent import OperationsAgent
+from database.backends import DuckDBBackend, ParquetMirror
+from database.connector import ConnectionPool
+from database.rollup import DailyRollup
+from benchmarks.bench_sync import change_source
+
+def test_refresh_reads_the_source_not_a_partial_mirror(warehouse, tmp_path, monkeypatch):
+    ParquetMirror(str(tmp_path / "mirror")).export(months=1)
+    partial = ConnectionPool(DuckDBBackend(str(tmp_path / "mirror")).connect)
+    monkeypatch.setattr(utils.metrics, 'get_analytics_pool', lambda: partial)
+
+    rollup = DailyRollup(path=str(tmp_path / "rollup.parquet"), start_date=None)
+    rollup.refresh(full=True)
+    assert rollup.load()['total_shipments'].sum() == 2000
+    assert rollup.covers(['rto_rate'])
+
+def test_stale_rollup_covers_nothing(warehouse, tmp_path):
+    rollup = DailyRollup(path=str(tmp_path / "rollup.parquet"), start_date=None, max_age=3600)
+    rollup.refresh(full=True)
+    assert rollup.covers(['ndr_rate'], group_by=['ZONE'])
+
+    state = json.loads((tmp_path / "rollup.json").read_text())
+    state['refreshed_at'] = (datetime.now() - timedelta(hours=2)).isoformat(timespec='seconds')
+    (tmp_path / "rollup.json").write_text(json.dumps(state))
+    os.utime(rollup.path, (time.time() + 1, time.time() + 1))  # reload
+    assert not rollup.covers(['ndr_rate'], group_by=['ZONE'])
+
+def test_refresh_picks_up_changes_older_than_the_lookback(warehouse, tmp_path):
+    rollup = DailyRollup(path=str(tmp_path / "rollup.parquet"), start_date=None, lookback_days=7)
+    rollup.refresh(full=True)
+    change_source(warehouse, 2000, 0.05, 20, seed=7)  # settles shipments from every week
+    assert rollup.refresh()['changed_days_before'] > 7
+
+    expected = DailyRollup(path=str(tmp_path / "expected.parquet"), start_date=None)
+    expected.refresh(full=True)
+    columns = ['total_shipments', 'total_delivered', 'tat_seconds', 'sla_met']
+    by_day = rollup.load().groupby('DAY')[columns].sum()
+    assert by_day.equals(expected.load().groupby('DAY')[columns].sum())
+    assert by_day['total_shipments'].sum() == 2020
+
+def test_not_delivered_questions_are_not_answered_with_the_ndr_rate(chat_model):
+    agent = OperationsAgent()
+    assert agent._plan_rollup_question("shipments not delivered by zone", ['ndr']) is None
+    assert agent._plan_rollup_question("NDR rate by zone", ['ndr']) == (['ndr_rate'], {}, ['ZONE'])
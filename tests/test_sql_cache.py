@@ -0,0 +1,61 @@
+import pytest
+from agents.support.sql_cache import NL2SQLCache, normalize_question
+
+RTO_3_MONTHS = "SELECT ... DATEADD(MONTH, -3, CURRENT_DATE())"
+TOP_5 = "SELECT PARENT_COURIER ... LIMIT 5"
+DELHI_TO_MUMBAI = "SELECT ... WHERE ORIGIN = 'DELHI' AND DESTINATION = 'MUMBAI'"
+
+def make_cache() -> NL2SQLCache:
+    cache = NL2SQLCache(max_entries=100, similarity_threshold=0.8)
+    cache.set_schema("schema")
+    return cache
+
+def test_exact_and_paraphrased_hits():
+    cache = make_cache()
+    cache.store("Show RTO rate month over month", RTO_3_MONTHS, ['rto'])
+    assert cache.lookup("show rto rate month over month", ['rto']) == RTO_3_MONTHS
+    assert cache.lookup("Show the RTO % month over month", ['rto']) == RTO_3_MONTHS
+
+def test_different_period_misses():
+    cache = make_cache()
+    cache.store("RTO rate for the last 3 months", RTO_3_MONTHS, ['rto'])
+    assert cache.lookup("RTO rate for the last 3 months", ['rto']) == RTO_3_MONTHS
+    assert cache.lookup("RTO rate for the last 6 months", ['rto']) is None
+    assert cache.lookup("RTO rate for the last 12 months", ['rto']) is None
+
+def test_different_ranking_size_misses():
+    cache = make_cache()
+    cache.store("top 5 couriers by rto rate", TOP_5, ['rto'])
+    assert cache.lookup("top 3 couriers by rto rate", ['rto']) is None
+    assert cache.lookup("top five couriers by rto rate", ['rto']) == TOP_5
+
+def test_reversed_direction_misses():
+    cache = make_cache()
+    cache.store("shipments from delhi to mumbai", DELHI_TO_MUMBAI)
+    assert cache.lookup("shipments from mumbai to delhi") is None
+    assert cache.lookup("shipments from delhi to mumbai") == DELHI_TO_MUMBAI
+
+def test_normalize_question_keeps_order():
+    assert normalize_question("delhi to mumbai") != normalize_question("mumbai to delhi")
+
+def test_schema_change_invalidates():
+    cache = make_cache()
+    cache.store("RTO rate by zone", RTO_3_MONTHS, ['rto'])
+    cache.set_schema("other schema")
+    assert cache.lookup("RTO rate by zone", ['rto']) is None
+
+@pytest.mark.parametrize("cached, asked", [
+    ("RTO rate for Delhivery and Bluedart", "RTO rate for Delhivery and Ekart"),
+    ("NDR rate in the north region", "NDR rate in the south region"),
+    ("shipments with boost enabled by zone", "shipments with boost disabled by zone"),
+    ("couriers sorted by RTO rate ascending", "couriers sorted by RTO rate descending"),
+])
+def test_one_different_content_word_misses(cached, asked):
+    cache = make_cache()
+    cache.store(cached, "SELECT ...", ['rto'])
+    assert cache.lookup(asked, ['rto']) is None
+
+def test_reordered_content_words_hit():
+    cache = make_cache()
+    cache.store("RTO rate by zone for COD shipments", RTO_3_MONTHS, ['rto'])
+    assert cache.lookup("For COD shipments, what is the RTO rate by zone?", ['rto']) == RTO_3_MONTHS
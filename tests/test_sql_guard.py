@@ -0,0 +1,55 @@
+import pytest
+from agents.business.operations_agent import OperationsAgent
+from agents.support.sql_cache import NL2SQLCache
+from database.result_cache import ResultCache
+from utils.sql_guard import SQLGuard, UnsafeQueryError
+
+@pytest.fixture
+def guard():
+    return SQLGuard(window_days=90, row_limit=100)
+
+@pytest.mark.parametrize("sql", [
+    "DELETE FROM VIEW_TITANIUM_PLATINUM_REPORT",
+    "WITH x AS (SELECT 1) INSERT INTO t SELECT * FROM x",
+    "SELECT 1; DROP TABLE VIEW_TITANIUM_PLATINUM_REPORT",
+    "SELECT SYSTEM$CANCEL_ALL_QUERIES(1)",
+    "SELECT ZONE FROM VIEW_TITANIUM_PLATINUM_REPORT WHERE SYSTEM$ABORT_SESSION(1) IS NOT NULL",
+    "SELECT SNOWFLAKE.CORTEX.COMPLETE('model', ZONE) FROM VIEW_TITANIUM_PLATINUM_REPORT",
+    "SELECT mydb.public.notify(AWB_CODE) FROM VIEW_TITANIUM_PLATINUM_REPORT",
+])
+def test_refuses_writes_and_side_effecting_functions(guard, sql):
+    with pytest.raises(UnsafeQueryError):
+        guard.check(sql)
+    assert guard.stats()['rejected'] == 1
+
+def test_builtin_functions_pass(guard):
+    guarded = guard.check("SELECT ZONE, DATEDIFF('hour', ASSIGNED_DATE_TIME, AWB_DELIVERED_DATE), "
+                          "RATIO_TO_REPORT(COUNT(*)) OVER () FROM VIEW_TITANIUM_PLATINUM_REPORT GROUP BY ZONE")
+    assert "RATIO_TO_REPORT" in guarded.sql
+
+def test_records_window_and_limit_rewrites(guard):
+    guarded = guard.check("SELECT AWB_CODE FROM VIEW_TITANIUM_PLATINUM_REPORT")
+    assert guarded.rewrites == ["ASSIGNED_DATE_TIME window of 90 days", "LIMIT 100"]
+    assert guarded.row_limit == 100
+    assert "DATEADD(DAY, -90" in guarded.sql and guarded.sql.endswith("LIMIT 100")
+
+def test_keeps_filters_and_smaller_limits(guard):
+    guarded = guard.check("SELECT AWB_CODE FROM VIEW_TITANIUM_PLATINUM_REPORT "
+                          "WHERE ASSIGNED_DATE_TIME >= '2024-01-01' LIMIT 10")
+    assert guarded.rewrites == [] and guarded.row_limit is None
+
+def test_agent_reports_the_guard_limit_and_window(warehouse, chat_model):
+    agent = OperationsAgent()
+    agent.result_cache = ResultCache(database_url=None, watermark_provider=lambda: None)
+    agent.sql_guard = SQLGuard(window_days=100000, row_limit=100)
+
+    agent.sql_cache = NL2SQLCache()
+    agent.sql_cache.set_schema(agent.table_schema)
+
+    # The second answer comes from the NL-to-SQL cache and is guarded again
+    for _ in range(2):
+        response, sql, ref = agent.process_query("Export all shipments")
+        assert "window of 100000 days" in response
+        assert "only the first 100 rows are shown" in response
+        assert sql.endswith("LIMIT 100")
+    assert agent.sql_cache.stats()['exact_hits'] == 1
@@ -0,0 +1,39 @@
+import pandas as pd
+import pytest
+from database.backends import ParquetMirror
+from database.sync import IncrementalSync
+from benchmarks.bench_sync import InterruptedMirror, change_source, mismatched_months
+
+def mirror_rows(mirror):
+    return sum(pd.read_parquet(path).shape[0] for month in mirror.months() for path in mirror.files(month))
+
+@pytest.fixture
+def synced(warehouse, tmp_path):
+    """A mirror bootstrapped from the warehouse stand-in"""
+    sync = IncrementalSync(ParquetMirror(str(tmp_path / "mirror")), overlap_seconds=60)
+    assert sync.run()['mode'] == 'bootstrap'
+    assert mismatched_months(warehouse, sync.mirror) == []
+    return sync
+
+def test_changes_are_upserted_by_awb(warehouse, synced):
+    change_source(warehouse, 2000, 0.05, 20, seed=7)
+    result = synced.run()
+    assert result['inserted'] == 20 and result['updated'] >= 100
+    assert mismatched_months(warehouse, synced.mirror) == []
+    assert mirror_rows(synced.mirror) == 2020
+
+    # Repeating a run changes nothing
+    synced.run()
+    assert mismatched_months(warehouse, synced.mirror) == []
+    assert mirror_rows(synced.mirror) == 2020
+
+def test_interrupted_run_is_finished_by_the_next(warehouse, synced, tmp_path):
+    watermarks = synced.watermarks
+    change_source(warehouse, 2000, 0.05, 20, seed=8)
+    with pytest.raises(KeyboardInterrupt):
+        IncrementalSync(InterruptedMirror(synced.mirror.path), overlap_seconds=60).run()
+    assert synced.watermarks == watermarks  # saved only when a run completes
+
+    synced.run()
+    assert mismatched_months(warehouse, synced.mirror) == []
+    assert mirror_rows(synced.mirror) == 2020
@@ -0,0 +1,68 @@
+import threading
+import time
+import pytest
+from database.tracking_cache import TrackingCache
+
+def row(awb, status):
+    return {'AWB_CODE': awb, 'SHIPMENT_STATUS': status}
+
+def test_ttl_depends_on_status():
+    cache = TrackingCache(terminal_ttl=100, active_ttl=10, miss_ttl=1)
+    assert cache.ttl_for(row("AWB1", "Delivered")) == 100
+    assert cache.ttl_for(row("AWB1", "rto_delivered")) == 100
+    assert cache.ttl_for(row("AWB1", "IN TRANSIT")) == 10
+    assert cache.ttl_for(None) == 1
+
+def test_misses_load_in_one_batch_and_unknown_awbs_are_remembered():
+    cache = TrackingCache()
+    calls = []
+
+    def loader(awbs):
+        calls.append(list(awbs))
+        return {awb: row(awb, "DELIVERED") for awb in awbs if awb != "AWB3"}
+
+    assert set(cache.get_many(["AWB1", "AWB2", "AWB3"], loader)) == {"AWB1", "AWB2"}
+    assert set(cache.get_many(["AWB1", "AWB2", "AWB3"], loader)) == {"AWB1", "AWB2"}
+    assert calls == [["AWB1", "AWB2", "AWB3"]]
+
+def test_active_rows_expire():
+    cache = TrackingCache(active_ttl=0)
+    loader = lambda awbs: {awb: row(awb, "IN TRANSIT") for awb in awbs}
+    cache.get("AWB1", loader)
+    cache.get("AWB1", loader)
+    assert cache.stats()['loads'] == 2
+
+def test_concurrent_lookups_share_a_load():
+    cache = TrackingCache()
+    started = threading.Event()
+    loads = []
+
+    def loader(awbs):
+        loads.append(awbs)
+        started.set()
+        time.sleep(0.05)
+        return {awb: row(awb, "DELIVERED") for awb in awbs}
+
+    first = threading.Thread(target=cache.get, args=("AWB1", loader))
+    first.start()
+    started.wait(1)
+    assert cache.get("AWB1", loader) == row("AWB1", "DELIVERED")
+    first.join()
+    assert len(loads) == 1 and cache.stats()['coalesced'] == 1
+
+def test_evicts_least_recently_used():
+    cache = TrackingCache(max_entries=2)
+    for awb in ("AWB1", "AWB2", "AWB3"):
+        cache.put(row(awb, "DELIVERED"))
+    assert cache.stats()['entries'] == 2 and cache.stats()['evictions'] == 1
+
+def test_failed_loads_are_not_cached():
+    cache = TrackingCache()
+
+    def loader(awbs):
+        raise RuntimeError("warehouse down")
+
+    with pytest.raises(RuntimeError):
+        cache.get("AWB1", loader)
+    assert cache.stats()['entries'] == 0
+    assert cache.get("AWB1", lambda awbs: {"AWB1": row("AWB1", "DELIVERED")}) == row("AWB1", "DELIVERED")
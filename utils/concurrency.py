@@ -0,0 +1,88 @@
+import asyncio
+import threading
+from collections import deque
+from functools import partial
+from typing import Any, Callable, Dict
+from config import LLM_MAX_CONCURRENCY, WAREHOUSE_MAX_CONCURRENCY
+
+class BackendLimiter:
+    """Async semaphore shared across threads and event loops.
+
+    Streamlit sessions each run their own event loop, so a plain
+    ``asyncio.Semaphore`` cannot cap calls to a backend process-wide.
+    """
+
+    def __init__(self, limit: int):
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        self.limit = limit
+        self._active = 0
+        self._waiters = deque()  # (loop, future)
+        self._lock = threading.Lock()
+
+    async def acquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._active < self.limit and not self._waiters:
+                self._active += 1
+                return
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+
+        try:
+            await waiter[1]
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    raise
+            # The slot was already handed to us
+            if waiter[1].done() and not waiter[1].cancelled():
+                self.release()
+            raise
+
+    def release(self) -> None:
+        with self._lock:
+            while self._waiters:
+                # Hand the slot straight to the next waiter
+                loop, future = self._waiters.popleft()
+                try:
+                    loop.call_soon_threadsafe(self._wake, future)
+                    return
+                except RuntimeError:
+                    continue  # its event loop is closed, so the next waiter gets the slot
+            self._active -= 1
+
+    def _wake(self, future: asyncio.Future) -> None:
+        if future.cancelled():
+            self.release()  # waiter gave up, pass the slot on
+        else:
+            future.set_result(None)
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
+
+_limiters: Dict[str, BackendLimiter] = {
+    'llm': BackendLimiter(LLM_MAX_CONCURRENCY),
+    'warehouse': BackendLimiter(WAREHOUSE_MAX_CONCURRENCY)
+}
+
+def get_limiter(backend: str) -> BackendLimiter:
+    """Get the process-wide concurrency limiter for a backend"""
+    try:
+        return _limiters[backend]
+    except KeyError:
+        raise ValueError(f"Unknown backend: {backend}")
+
+async def run_blocking(backend: str, fn: Callable, *args, **kwargs) -> Any:
+    """Run a blocking call in a worker thread under the backend's limit"""
+    async with get_limiter(backend):
+        return await asyncio.to_thread(partial(fn, *args, **kwargs))
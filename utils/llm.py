@@ -0,0 +1,32 @@
+import threading
+from typing import Any, Callable, Optional
+from config import AGENT_MODEL
+from utils.tracing import get_llm_callback
+
+# Builds a LangChain chat model from model_name, temperature and extra kwargs
+ChatModelFactory = Callable[..., Any]
+
+def openai_chat_model(model_name: Optional[str] = None, **kwargs) -> Any:
+    """The production chat model"""
+    from langchain_openai import ChatOpenAI
+
+    return ChatOpenAI(model_name=model_name or AGENT_MODEL, **kwargs)
+
+_factory: ChatModelFactory = openai_chat_model
+_factory_lock = threading.Lock()
+
+def get_chat_model(model_name: Optional[str] = None, temperature: Optional[float] = None, **kwargs) -> Any:
+    """Create a chat model with the configured factory; every model is traced"""
+    if temperature is not None:
+        kwargs['temperature'] = temperature
+    kwargs['callbacks'] = [*kwargs.get('callbacks', []), get_llm_callback()]
+    return _factory(model_name=model_name, **kwargs)
+
+def configure_chat_model(factory: ChatModelFactory = None) -> None:
+    """Replace the chat model factory, e.g. with a fake for offline benchmarks.
+
+    Affects models created afterwards; agents built before keep theirs.
+    """
+    global _factory
+    with _factory_lock:
+        _factory = factory or openai_chat_model
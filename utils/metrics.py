@@ -1,69 +1,381 @@
-from typing import Dict, List, Union
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+import numpy as np
 import pandas as pd
-from database.connector import get_db_connection
+from config import TABLE_NAME, DELIVERY_SLA_HOURS, QUERY_TIMEOUT
+from database.connector import run_query, get_analytics_pool
+from database.rollup import get_rollup
+
+# Dimensions callers may filter and group on
+DIMENSIONS = {
+    'ZONE', 'CITY_TIER', 'DELIVERY_STATE', 'PARENT_COURIER', 'COMPANY_ID',
+    'MODE_OF_SHIPMENT', 'COURIER_MODE', 'SHIP_TYPE', 'SHIPMENT_STATUS',
+    'IS_DELIVERYBOOST'
+}
+
+# Time grains over ASSIGNED_DATE_TIME, usable as group-by columns
+TIME_GRAINS = {'DAY', 'WEEK', 'MONTH'}
+
+# Additive components; every metric is a ratio of these, so they can be
+# summed in the warehouse, over a local frame or over a rollup alike
+COMPONENTS = {
+    'total_shipments': "COUNT(*)",
+    'total_rto': "SUM(RTO_SHIPMENTS)",
+    'total_ndr': "SUM(NDR_RAISED_SHIPMENTS)",
+    'ndr_delivered': "SUM(NDR_DELIVERED_SHIPMENTS)",
+    'ndr_attempts': "SUM(CASE WHEN NDR_RAISED_SHIPMENTS = 1 THEN NO_OF_ATTEMPTS ELSE 0 END)",
+    'total_fasr': "SUM(FASR_SHIPMENT)",
+    'total_delivered': "SUM(DELIVERED_SHIPMENTS)",
+    'tat_seconds': "SUM(DATEDIFF('second', ASSIGNED_DATE_TIME, AWB_DELIVERED_DATE))",
+    'tat_count': "COUNT(DATEDIFF('second', ASSIGNED_DATE_TIME, AWB_DELIVERED_DATE))",
+    'sla_met': "SUM(CASE WHEN DATEDIFF('second', ASSIGNED_DATE_TIME, AWB_DELIVERED_DATE) <= {sla_seconds} THEN 1 ELSE 0 END)",
+    'weight_discrepancies': "SUM(CAST(IS_WEIGHT_DESCRIPANCY AS INTEGER))",
+    'excess_weight': "SUM(COURIER_CHARGED_WEIGHT - APPLIED_WEIGHT)",
+    'weighed_count': "COUNT(COURIER_CHARGED_WEIGHT - APPLIED_WEIGHT)"
+}
+
+def _pct(numerator: pd.Series, denominator: pd.Series) -> pd.Series:
+    return np.round(numerator / denominator.where(denominator > 0) * 100, 2)
+
+def _ratio(numerator: pd.Series, denominator: pd.Series, scale: float = 1.0) -> pd.Series:
+    return np.round(numerator / denominator.where(denominator > 0) / scale, 2)
+
+# metric -> (components it needs, how to finish it from summed components)
+METRICS: Dict[str, Tuple[Tuple[str, ...], Callable[[pd.DataFrame], pd.Series]]] = {
+    'rto_rate': (('total_rto', 'total_shipments'),
+                 lambda c: _pct(c['total_rto'], c['total_shipments'])),
+    'ndr_rate': (('total_ndr', 'total_shipments'),
+                 lambda c: _pct(c['total_ndr'], c['total_shipments'])),
+    'ndr_resolution_rate': (('ndr_delivered', 'total_ndr'),
+                            lambda c: _pct(c['ndr_delivered'], c['total_ndr'])),
+    'avg_attempts_after_ndr': (('ndr_attempts', 'total_ndr'),
+                               lambda c: _ratio(c['ndr_attempts'], c['total_ndr'])),
+    'fasr': (('total_fasr', 'total_shipments'),
+             lambda c: _pct(c['total_fasr'], c['total_shipments'])),
+    'delivery_rate': (('total_delivered', 'total_shipments'),
+                      lambda c: _pct(c['total_delivered'], c['total_shipments'])),
+    'avg_tat_hours': (('tat_seconds', 'tat_count'),
+                      lambda c: _ratio(c['tat_seconds'], c['tat_count'], 3600)),
+    'sla_compliance': (('sla_met', 'tat_count'),
+                       lambda c: _pct(c['sla_met'], c['tat_count'])),
+    'weight_discrepancy_rate': (('weight_discrepancies', 'total_shipments'),
+                                lambda c: _pct(c['weight_discrepancies'], c['total_shipments'])),
+    'avg_excess_weight': (('excess_weight', 'weighed_count'),
+                          lambda c: _ratio(c['excess_weight'], c['weighed_count']))
+}
+
+def _as_float(series: pd.Series) -> pd.Series:
+    """0/1, boolean and nullable columns as float64 with NaN for missing"""
+    return pd.Series(pd.to_numeric(series, errors='coerce').to_numpy(dtype='float64', na_value=np.nan),
+                     index=series.index)
+
+def _truncate(timestamps: pd.Series, grain: str) -> pd.Series:
+    timestamps = pd.to_datetime(timestamps)
+    if grain == 'DAY':
+        return timestamps.dt.floor('D')
+    if grain == 'WEEK':
+        return timestamps.dt.to_period('W-SUN').dt.start_time
+    return timestamps.dt.to_period('M').dt.start_time
 
 class MetricsCalculator:
-    def __init__(self):
-        self.conn = get_db_connection()
+    """Delivery KPIs computed from additive components.
+
+    By default filters, group-bys and aggregation are pushed down to the
+    warehouse as one parameterized query, unless the local daily rollup can
+    answer the request. Given a ``frame`` of already fetched shipments, the
+    same components are computed locally with vectorized pandas; all paths
+    share the final ratio step and therefore return identical results.
+    """
+
+    def __init__(self,
+                 frame: pd.DataFrame = None,
+                 sla_hours: float = DELIVERY_SLA_HOURS,
+                 use_rollup: bool = True):
+        self.frame = frame
+        self.sla_hours = sla_hours
+        self.rollup = get_rollup() if use_rollup and frame is None else None
 
-    def calculate_rto_rate(self, 
-                          filters: Dict = None, 
+    def compute(self,
+                metrics: List[str],
+                filters: Dict[str, Any] = None,
+                group_by: List[str] = None) -> pd.DataFrame:
+        """Compute metrics per group; one row when ``group_by`` is empty"""
+        group_by = self._validate(metrics, filters, group_by)
+        components = self._required_components(metrics)
+
+        if self.frame is not None:
+            sums = self._aggregate_local(self.frame, components, filters, group_by)
+        elif self.covered_by_rollup(metrics, filters, group_by):
+            sums = self._aggregate_rollup(self.rollup.load(), components, filters, group_by)
+        else:
+            sums = self.fetch_components(metrics, filters, group_by)
+
+        return self._finalize(sums, metrics, components, group_by)
+
+    def covered_by_rollup(self,
+                          metrics: List[str],
+                          filters: Dict[str, Any] = None,
+                          group_by: List[str] = None) -> bool:
+        """Whether compute() would be answered from the local rollup"""
+        return self.rollup is not None and self.rollup.covers(metrics, filters, group_by, self.sla_hours)
+
+    def fetch_components(self,
+                         metrics: List[str],
+                         filters: Dict[str, Any] = None,
+                         group_by: List[str] = None,
+                         timeout: float = QUERY_TIMEOUT,
+                         pool=None) -> pd.DataFrame:
+        """Run the pushed-down aggregate and return the summed components; by default on the analytics pool"""
+        group_by = self._validate(metrics, filters, group_by)
+        query, params = self.build_query(metrics, filters, group_by)
+        # A partial aggregate would be wrong, so no row or byte cap here
+        sums = run_query(query, params, timeout=timeout, max_rows=None, max_bytes=None,
+                         pool=pool or get_analytics_pool()).frame
+        sums.columns = [col.upper() if col.upper() in group_by else col.lower() for col in sums.columns]
+        return sums
+
+    def build_query(self,
+                    metrics: List[str],
+                    filters: Dict[str, Any] = None,
+                    group_by: List[str] = None) -> Tuple[str, List[Any]]:
+        """Aggregate SQL plus bind parameters for the warehouse"""
+        group_by = self._validate(metrics, filters, group_by)
+        sla_seconds = int(self.sla_hours * 3600)
+
+        select_cols = [self._group_expression(col) for col in group_by]
+        select_cols += [
+            f"{COMPONENTS[name].format(sla_seconds=sla_seconds)} AS {name}"
+            for name in self._required_components(metrics)
+        ]
+        where_clause, params = self._where_clause(filters)
+
+        query = f"SELECT {', '.join(select_cols)} FROM {TABLE_NAME}"
+        if where_clause:
+            query += f" WHERE {where_clause}"
+        if group_by:
+            query += " GROUP BY " + ", ".join(self._group_source(col) for col in group_by)
+        return query, params
+
+    def calculate_rto_rate(self,
+                          filters: Dict = None,
                           group_by: List[str] = None) -> pd.DataFrame:
         """Calculate RTO (Return to Origin) rate"""
-        query = """
-        SELECT 
-            {group_by_cols}
-            SUM(RTO_SHIPMENTS) as total_rto,
-            COUNT(*) as total_shipments,
-            ROUND(CAST(SUM(RTO_SHIPMENTS) AS FLOAT) / 
-                  COUNT(*) * 100, 2) as rto_rate
-        FROM DW_DB_PROD.DATA.VIEW_TITANIUM_PLATINUM_REPORT
-        {where_clause}
-        {group_by_clause}
-        """
-        
-        # Add implementation details
-        return pd.read_sql(query, self.conn)
-
-    def calculate_ndr_metrics(self, 
+        return self.compute(['rto_rate'], filters, group_by)
+
+    def calculate_ndr_metrics(self,
                             filters: Dict = None) -> Dict[str, float]:
         """Calculate NDR (Non-Delivery Report) related metrics"""
-        metrics = {
-            'ndr_rate': 0.0,
-            'ndr_resolution_rate': 0.0,
-            'avg_attempts_after_ndr': 0.0
-        }
-        
-        # Add implementation details
-        return metrics
+        names = ['ndr_rate', 'ndr_resolution_rate', 'avg_attempts_after_ndr']
+        return self._single_row(self.compute(names, filters), names)
 
-    def calculate_fasr(self, 
-                      zone: str = None, 
+    def calculate_fasr(self,
+                      zone: str = None,
                       courier: str = None) -> float:
         """Calculate First Attempt Success Rate"""
-        query = """
-        SELECT 
-            ROUND(CAST(SUM(FASR_SHIPMENT) AS FLOAT) / 
-                  COUNT(*) * 100, 2) as fasr
-        FROM DW_DB_PROD.DATA.DEV_REPORTS_COPILOT_REPORT
-        WHERE 1=1
-        {zone_filter}
-        {courier_filter}
-        """
-        
-        # Add implementation details
-        return 0.0
-
-    def get_delivery_performance(self, 
-                               start_date: str, 
+        filters = {}
+        if zone:
+            filters['ZONE'] = zone
+        if courier:
+            filters['PARENT_COURIER'] = courier
+        return self._single_row(self.compute(['fasr'], filters), ['fasr'])['fasr']
+
+    def get_delivery_performance(self,
+                               start_date: str,
                                end_date: str) -> Dict[str, Union[float, int]]:
         """Get overall delivery performance metrics"""
-        metrics = {
-            'total_shipments': 0,
-            'delivery_rate': 0.0,
-            'avg_delivery_time': 0.0,
-            'sla_compliance': 0.0
-        }
-        
-        # Add implementation details
-        return metrics
\ No newline at end of file
+        names = ['delivery_rate', 'avg_tat_hours', 'sla_compliance']
+        result = self.compute(names, {'start_date': start_date, 'end_date': end_date})
+        metrics = self._single_row(result, names)
+        metrics['total_shipments'] = int(result['total_shipments'].iloc[0]) if len(result) else 0
+        # Kept for callers of the original API
+        metrics['avg_delivery_time'] = metrics['avg_tat_hours']
+        return metrics
+
+    def _validate(self, metrics: List[str], filters: Dict[str, Any], group_by: List[str]) -> List[str]:
+        unknown = [m for m in metrics if m not in METRICS]
+        if unknown:
+            raise ValueError(f"Unknown metrics: {unknown}")
+        group_by = [col.upper() for col in group_by or []]
+        for col in group_by:
+            if col not in DIMENSIONS and col not in TIME_GRAINS:
+                raise ValueError(f"Cannot group by: {col}")
+        for key in filters or {}:
+            if key not in ('start_date', 'end_date') and key.upper() not in DIMENSIONS:
+                raise ValueError(f"Cannot filter on: {key}")
+        return group_by
+
+    @staticmethod
+    def _required_components(metrics: List[str]) -> List[str]:
+        needed = {'total_shipments'}
+        for metric in metrics:
+            needed.update(METRICS[metric][0])
+        return [name for name in COMPONENTS if name in needed]
+
+    @staticmethod
+    def _group_source(col: str) -> str:
+        if col in TIME_GRAINS:
+            return f"DATE_TRUNC('{col}', ASSIGNED_DATE_TIME)"
+        return col
+
+    def _group_expression(self, col: str) -> str:
+        return f"{self._group_source(col)} AS {col}" if col in TIME_GRAINS else col
+
+    @staticmethod
+    def _date_bounds(filters: Dict[str, Any]) -> Tuple[Optional[pd.Timestamp], Optional[pd.Timestamp]]:
+        start = filters.get('start_date')
+        end = filters.get('end_date')
+        start = pd.Timestamp(start) if start else None
+        # end_date is inclusive of the whole day
+        end = pd.Timestamp(end).normalize() + pd.Timedelta(days=1) if end else None
+        return start, end
+
+    def _where_clause(self, filters: Dict[str, Any]) -> Tuple[str, List[Any]]:
+        conditions, params = [], []
+        filters = filters or {}
+        start, end = self._date_bounds(filters)
+        if start is not None:
+            conditions.append("ASSIGNED_DATE_TIME >= ?")
+            params.append(start.to_pydatetime())
+        if end is not None:
+            conditions.append("ASSIGNED_DATE_TIME < ?")
+            params.append(end.to_pydatetime())
+
+        for key, value in filters.items():
+            if key in ('start_date', 'end_date'):
+                continue
+            col = key.upper()
+            if value is None:
+                conditions.append(f"{col} IS NULL")
+            elif isinstance(value, (list, tuple, set)):
+                values = list(value)
+                conditions.append(f"{col} IN ({', '.join(['?'] * len(values))})")
+                params.extend(values)
+            else:
+                conditions.append(f"{col} = ?")
+                params.append(value)
+        return " AND ".join(conditions), params
+
+    def _filter_local(self,
+                      frame: pd.DataFrame,
+                      filters: Dict[str, Any],
+                      date_column: str = 'ASSIGNED_DATE_TIME') -> pd.DataFrame:
+        if not filters:
+            return frame
+        mask = np.ones(len(frame), dtype=bool)
+        start, end = self._date_bounds(filters)
+        if start is not None or end is not None:
+            assigned = pd.to_datetime(frame[date_column])
+            if start is not None:
+                mask &= (assigned >= start).to_numpy(dtype=bool, na_value=False)
+            if end is not None:
+                mask &= (assigned < end).to_numpy(dtype=bool, na_value=False)
+
+        for key, value in filters.items():
+            if key in ('start_date', 'end_date'):
+                continue
+            column = frame[key.upper()]
+            if value is None:
+                mask &= column.isna().to_numpy()
+            elif isinstance(value, (list, tuple, set)):
+                mask &= column.isin(list(value)).to_numpy(dtype=bool, na_value=False)
+            else:
+                mask &= (column == value).to_numpy(dtype=bool, na_value=False)
+        return frame[mask]
+
+    def _aggregate_local(self,
+                         frame: pd.DataFrame,
+                         components: List[str],
+                         filters: Dict[str, Any],
+                         group_by: List[str]) -> pd.DataFrame:
+        """Vectorized equivalent of the pushed-down aggregate query"""
+        frame = self._filter_local(frame, filters)
+        columns = {}
+        for col in group_by:
+            columns[col] = _truncate(frame['ASSIGNED_DATE_TIME'], col) if col in TIME_GRAINS else frame[col]
+
+        columns['total_shipments'] = pd.Series(1.0, index=frame.index)
+        if 'total_rto' in components:
+            columns['total_rto'] = _as_float(frame['RTO_SHIPMENTS'])
+        if {'total_ndr', 'ndr_attempts'} & set(components):
+            ndr = _as_float(frame['NDR_RAISED_SHIPMENTS'])
+            columns['total_ndr'] = ndr
+            if 'ndr_attempts' in components:
+                columns['ndr_attempts'] = _as_float(frame['NO_OF_ATTEMPTS']).where(ndr == 1, 0.0)
+        if 'ndr_delivered' in components:
+            columns['ndr_delivered'] = _as_float(frame['NDR_DELIVERED_SHIPMENTS'])
+        if 'total_fasr' in components:
+            columns['total_fasr'] = _as_float(frame['FASR_SHIPMENT'])
+        if 'total_delivered' in components:
+            columns['total_delivered'] = _as_float(frame['DELIVERED_SHIPMENTS'])
+        if {'tat_seconds', 'tat_count', 'sla_met'} & set(components):
+            # DATEDIFF('second', ...) counts whole-second boundaries
+            assigned = pd.to_datetime(frame['ASSIGNED_DATE_TIME']).dt.floor('s')
+            delivered = pd.to_datetime(frame['AWB_DELIVERED_DATE']).dt.floor('s')
+            seconds = (delivered - assigned).dt.total_seconds()
+            columns['tat_seconds'] = seconds
+            columns['tat_count'] = seconds.notna().astype('float64')
+            columns['sla_met'] = (seconds <= int(self.sla_hours * 3600)).astype('float64')
+        if 'weight_discrepancies' in components:
+            columns['weight_discrepancies'] = _as_float(frame['IS_WEIGHT_DESCRIPANCY'])
+        if {'excess_weight', 'weighed_count'} & set(components):
+            excess = _as_float(frame['COURIER_CHARGED_WEIGHT']) - _as_float(frame['APPLIED_WEIGHT'])
+            columns['excess_weight'] = excess
+            columns['weighed_count'] = excess.notna().astype('float64')
+
+        data = pd.DataFrame(columns, index=frame.index)
+        value_cols = [name for name in components if name in data.columns]
+        if not group_by:
+            return data[value_cols].sum(min_count=0).to_frame().T
+        return data.groupby(group_by, dropna=False, sort=False, observed=True)[value_cols].sum().reset_index()
+
+    def _aggregate_rollup(self,
+                          rollup: pd.DataFrame,
+                          components: List[str],
+                          filters: Dict[str, Any],
+                          group_by: List[str]) -> pd.DataFrame:
+        """Re-aggregate pre-summed daily components"""
+        rollup = self._filter_local(rollup, filters, date_column='DAY')
+        keys = {}
+        for col in group_by:
+            if col == 'DAY':
+                keys[col] = rollup['DAY']
+            elif col in TIME_GRAINS:
+                keys[col] = _truncate(rollup['DAY'], col)
+            else:
+                keys[col] = rollup[col]
+
+        data = pd.DataFrame({**keys, **{name: rollup[name].astype('float64') for name in components}},
+                            index=rollup.index)
+        if not group_by:
+            return data[components].sum(min_count=0).to_frame().T
+        return data.groupby(group_by, dropna=False, sort=False, observed=True)[components].sum().reset_index()
+
+    @staticmethod
+    def _finalize(sums: pd.DataFrame,
+                  metrics: List[str],
+                  components: List[str],
+                  group_by: List[str]) -> pd.DataFrame:
+        """Turn summed components into rounded metrics, in a stable row order"""
+        result = pd.DataFrame(index=sums.index)
+        for col in group_by:
+            if col in TIME_GRAINS:
+                result[col] = pd.to_datetime(sums[col])
+            elif isinstance(sums[col].dtype, pd.CategoricalDtype):
+                # Sort and compare by value, as the warehouse returns them
+                result[col] = sums[col].astype(sums[col].cat.categories.dtype)
+            else:
+                result[col] = sums[col]
+        for name in components:
+            result[name] = pd.to_numeric(sums[name], errors='coerce').astype('float64').fillna(0.0)
+        for metric in metrics:
+            result[metric] = METRICS[metric][1](result)
+
+        if group_by:
+            result = result.sort_values(group_by, na_position='last', kind='mergesort')
+        return result.reset_index(drop=True)
+
+    @staticmethod
+    def _single_row(result: pd.DataFrame, names: List[str]) -> Dict[str, float]:
+        if result.empty:
+            return {name: 0.0 for name in names}
+        row = result.iloc[0]
+        return {name: 0.0 if pd.isna(row[name]) else float(row[name]) for name in names}
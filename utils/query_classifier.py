@@ -1,114 +1,270 @@
-from typing import Dict, List
+from typing import Dict, Iterable, List
 import re
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
-from config import AGENT_MODEL, TEMPERATURE
 import json
+import threading
+from langchain_core.prompts import ChatPromptTemplate
+from config import AGENT_MODEL, TEMPERATURE, CONFIDENCE_THRESHOLD
+from utils.llm import get_chat_model
 
-class QueryClassifier:
-    def __init__(self):
-        self.model = ChatOpenAI(
-            model_name=AGENT_MODEL,
-            temperature=TEMPERATURE
-        )
-        
-        # Patterns for different types of queries
-        self.patterns = {
-            'analytical': [
-                'rate', 'trend', 'analysis', 'compare', 'performance',
-                'distribution', 'breakdown', 'month', 'percentage',
-                'average', 'avg', 'total', 'count', 'rto', 'ndr', 'fasr'
-            ],
-            'tracking': [
-                'track', 'where', 'status', 'awb', 'delivery status',
-                'shipment status', 'order status'
-            ],
-            'metric_terms': {
-                'rto': ['rto', 'return', 'returned'],
-                'ndr': ['ndr', 'non delivery', 'not delivered'],
-                'fasr': ['fasr', 'first attempt', 'success rate'],
-                'tat': ['tat', 'turnaround', 'delivery time']
-            }
+# Terms that signal each kind of query (matched as substrings, like before)
+ANALYTICAL_TERMS = [
+    'rate', 'trend', 'analysis', 'compare', 'performance',
+    'distribution', 'breakdown', 'month', 'percentage',
+    'average', 'avg', 'total', 'count', 'rto', 'ndr', 'fasr'
+]
+
+TRACKING_TERMS = [
+    'track', 'where', 'status', 'awb', 'delivery status',
+    'shipment status', 'order status'
+]
+
+# Service requests; they go to the customer agent without an LLM round trip
+CUSTOMER_TERMS = [
+    'refund', 'complain', 'cancel', 'reschedule', 'contact', 'support',
+    'help', 'address', 'feedback'
+]
+
+# Courier partner questions; they bring in the courier agent next to the primary one
+COURIER_TERMS = [
+    'courier', 'carrier', 'delivery partner', 'logistics partner', 'weight'
+]
+
+# Agents with data behind them, worth running next to the primary one
+FANOUT_AGENTS = {'delivery', 'courier'}
+
+METRIC_TERMS = {
+    'rto': ['rto', 'return', 'returned'],
+    'ndr': ['ndr', 'non delivery', 'not delivered'],
+    'fasr': ['fasr', 'first attempt', 'success rate'],
+    'tat': ['tat', 'turnaround', 'delivery time']
+}
+
+QUERY_TYPES = {
+    'operations': 'analytical',
+    'delivery': 'tracking',
+    'courier': 'analytical',
+    'customer': 'general'
+}
+
+_AWB_PATTERN = re.compile(r'AWB\d{8}', re.IGNORECASE)
+_ZONE_PATTERN = re.compile(r'zone[_\s]?[a-e]2?', re.IGNORECASE)
+_TIER_PATTERN = re.compile(r'tier[_\s]?[123]|metro', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+# Greetings, thanks and sign-offs, on their own; the customer agent answers them without an LLM round trip
+_CHITCHAT_PATTERN = re.compile(
+    r'^\W*(?:hi|hello|hey|hiya|thanks|thank you|thx|ok|okay|cool|great|bye|goodbye|'
+    r'good (?:morning|afternoon|evening|night))\b[\w\s]{0,20}\W*$',
+    re.IGNORECASE
+)
+_JSON_OBJECT = re.compile(r'\{.*\}', re.DOTALL)
+
+class _TermMatcher:
+    """Finds every labelled term occurring anywhere in a text in one regex pass.
+
+    A zero-width lookahead over a prefix-factored alternation is tried at each
+    position and captures the longest term starting there; labels of terms contained in that match (``return``
+    inside ``returned``) are folded in ahead of time, so the result equals
+    running ``term in text`` for every term.
+    """
+
+    def __init__(self, labelled_terms: Dict[str, Iterable[str]]):
+        labels: Dict[str, set] = {}
+        for label, terms in labelled_terms.items():
+            for term in terms:
+                labels.setdefault(term, set()).add(label)
+
+        terms = sorted(labels, key=len, reverse=True)
+        self._labels = {
+            term: frozenset().union(*(labels[other] for other in terms if other in term))
+            for term in terms
         }
+        # Guarding on the first character skips most positions cheaply
+        first_chars = "".join(sorted({re.escape(term[0]) for term in terms}))
+        self._pattern = re.compile(f"(?=[{first_chars}])(?=({self._trie_pattern(terms)}))")
+
+    @staticmethod
+    def _trie_pattern(terms: List[str]) -> str:
+        """Alternation factored by common prefixes, e.g. r(?:ate|eturn(?:ed)?|to)"""
+        trie: Dict[str, dict] = {}
+        for term in terms:
+            node = trie
+            for char in term:
+                node = node.setdefault(char, {})
+            node[''] = {}
+
+        def build(node: dict) -> str:
+            branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+            if not branches:
+                return ''
+            body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+            return f'(?:{body})?' if '' in node else body
+
+        return build(trie)
+
+    def labels(self, text: str) -> set:
+        found = set()
+        for term in set(self._pattern.findall(text)):
+            found |= self._labels[term]
+        return found
+
+_MATCHER = _TermMatcher({
+    'analytical': ANALYTICAL_TERMS,
+    'tracking': TRACKING_TERMS,
+    'customer': CUSTOMER_TERMS,
+    'courier': COURIER_TERMS,
+    **{f'metric:{metric}': terms for metric, terms in METRIC_TERMS.items()}
+})
+
+_FALLBACK_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You route questions about a shipment tracking report to one agent:
+- operations: metrics, trends and analysis (RTO, NDR, FASR, TAT, volumes)
+- delivery: status of specific shipments or AWB numbers
+- courier: courier partner comparisons and performance
+- customer: service requests, complaints and general conversation
+
+Respond with JSON only: {{"primary_agent": "<agent>", "confidence_score": <0-1>}}"""),
+    ("human", "{query}")
+])
+
+class QueryClassifier:
+    """Rule-based query router with an LLM fallback for low-confidence queries.
+
+    The rules cover almost all traffic with a single precompiled regex pass;
+    the LLM client is only created, and only called, when rule confidence is
+    below ``confidence_threshold``.
+    """
+
+    def __init__(self,
+                 confidence_threshold: float = CONFIDENCE_THRESHOLD,
+                 llm_fallback: bool = True):
+        self.confidence_threshold = confidence_threshold
+        self.llm_fallback = llm_fallback
+        self._model = None
+        self._model_lock = threading.Lock()
+
+    @property
+    def model(self):
+        """LLM client for the fallback, created on first use"""
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    self._model = get_chat_model(AGENT_MODEL, temperature=TEMPERATURE)
+        return self._model
 
     def classify(self, query: str) -> Dict:
         """Classify the query and determine appropriate agent(s)"""
+        classification = self.classify_rules(query)
+        if self.llm_fallback and classification["confidence_score"] < self.confidence_threshold:
+            return self._classify_llm(query, classification)
+        return classification
+
+    def classify_rules(self, query: str) -> Dict:
+        """Classify using the precompiled rules only"""
         query_lower = query.lower()
-        
-        # Extract metrics and entities
-        metrics = self.extract_key_metrics(query_lower)
+        labels = _MATCHER.labels(query_lower)
+        metrics = self._metrics_from_labels(labels)
         tracking_numbers = self._extract_tracking_numbers(query)
-        
+
         # Check if query is analytical
-        if any(term in query_lower for term in self.patterns['analytical']):
-            return {
-                "primary_agent": "operations",
-                "secondary_agents": [],
-                "metrics": metrics,
-                "entities": self._extract_entities(query_lower),
-                "confidence_score": 0.9,
-                "query_type": "analytical"
-            }
-        
+        if 'analytical' in labels:
+            result = self._result("operations", metrics, self._extract_entities(query_lower), 0.9, "analytical")
+            result["secondary_agents"] = self._secondary_agents("operations", labels, tracking_numbers)
+            return result
+
         # Check if query is about tracking
-        if tracking_numbers or any(term in query_lower for term in self.patterns['tracking']):
-            return {
-                "primary_agent": "delivery",
-                "secondary_agents": [],
-                "metrics": metrics,
-                "entities": tracking_numbers,
-                "confidence_score": 0.9,
-                "query_type": "tracking"
-            }
-        
-        # Default to customer service
-        return {
-            "primary_agent": "customer",
-            "secondary_agents": [],
-            "metrics": metrics,
-            "entities": [],
-            "confidence_score": 0.7,
-            "query_type": "general"
-        }
+        if tracking_numbers or 'tracking' in labels:
+            result = self._result("delivery", metrics, tracking_numbers, 0.9, "tracking")
+            result["secondary_agents"] = self._secondary_agents("delivery", labels, tracking_numbers)
+            return result
+
+        # Default to customer service; without any signal, and not chit-chat, the LLM gets a say
+        confidence = 0.7 if 'customer' in labels or _CHITCHAT_PATTERN.match(query) else 0.5
+        return self._result("customer", metrics, [], confidence, "general")
+
+    def _secondary_agents(self, primary: str, labels: set, tracking_numbers: List[str]) -> List[str]:
+        """Other agents whose domain the query also touches, for a parallel fan-out"""
+        secondary = []
+        if 'courier' in labels and primary != 'courier':
+            secondary.append('courier')
+        if tracking_numbers and primary != 'delivery':
+            secondary.append('delivery')
+        return [agent for agent in secondary if agent in FANOUT_AGENTS]
 
     def extract_key_metrics(self, query: str) -> List[str]:
         """Extract mentioned metrics/KPIs from query"""
-        found_metrics = []
-        for metric, terms in self.patterns['metric_terms'].items():
-            if any(term in query for term in terms):
-                found_metrics.append(metric)
-        return found_metrics
+        return self._metrics_from_labels(_MATCHER.labels(query))
+
+    def _metrics_from_labels(self, labels: set) -> List[str]:
+        return [metric for metric in METRIC_TERMS if f'metric:{metric}' in labels]
 
     def _extract_tracking_numbers(self, text: str) -> List[str]:
         """Extract AWB numbers from text"""
-        # Pattern for AWB numbers (adjust based on your actual AWB format)
-        awb_pattern = r'AWB\d{8}'
-        return re.findall(awb_pattern, text, re.IGNORECASE)
+        return _AWB_PATTERN.findall(text)
 
     def _extract_entities(self, text: str) -> List[str]:
         """Extract other relevant entities from query"""
         entities = []
-        
-        # Zone patterns
-        zone_pattern = r'zone[_\s]?[a-e]2?'
-        zones = re.findall(zone_pattern, text, re.IGNORECASE)
-        entities.extend(zones)
-        
-        # City tier patterns
-        tier_pattern = r'tier[_\s]?[123]|metro'
-        tiers = re.findall(tier_pattern, text, re.IGNORECASE)
-        entities.extend(tiers)
-        
+
+        # Zone and city tier patterns
+        entities.extend(_ZONE_PATTERN.findall(text))
+        entities.extend(_TIER_PATTERN.findall(text))
+
         # Payment mode patterns
-        if 'cod' in text.lower():
+        text = text.lower()
+        if 'cod' in text:
             entities.append('COD')
-        if 'prepaid' in text.lower():
+        if 'prepaid' in text:
             entities.append('PREPAID')
-        
+
         return entities
 
+    def _classify_llm(self, query: str, rules: Dict) -> Dict:
+        """Ask the LLM for the agent; keep the rule result if it cannot decide"""
+        try:
+            response = (_FALLBACK_PROMPT | self.model).invoke({"query": query})
+            parsed = json.loads(_JSON_OBJECT.search(response.content).group(0))
+            agent = str(parsed["primary_agent"]).strip().lower()
+            confidence = float(parsed.get("confidence_score", self.confidence_threshold))
+        except Exception:
+            return rules
+
+        if agent not in QUERY_TYPES:
+            return rules
+
+        entities = rules["entities"]
+        if agent == "operations":
+            entities = self._extract_entities(query.lower())
+        elif agent == "delivery":
+            entities = self._extract_tracking_numbers(query)
+
+        return {
+            **rules,
+            "primary_agent": agent,
+            "secondary_agents": [other for other in rules["secondary_agents"] if other != agent],
+            "entities": entities,
+            "confidence_score": confidence,
+            "query_type": QUERY_TYPES[agent],
+            "source": "llm"
+        }
+
+    def _result(self,
+                agent: str,
+                metrics: List[str],
+                entities: List[str],
+                confidence: float,
+                query_type: str) -> Dict:
+        return {
+            "primary_agent": agent,
+            "secondary_agents": [],
+            "metrics": metrics,
+            "entities": entities,
+            "confidence_score": confidence,
+            "query_type": query_type,
+            "source": "rules"
+        }
+
     def _preprocess_query(self, query: str) -> str:
         """Clean and standardize query text"""
         query = query.lower().strip()
-        query = re.sub(r'\s+', ' ', query)
-        return query
\ No newline at end of file
+        query = _WHITESPACE.sub(' ', query)
+        return query
@@ -0,0 +1,97 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import pandas as pd
+from config import RENDER_CACHE_MAX_ENTRIES
+
+# Bar charts are only offered for small results
+BAR_CHART_MAX_ROWS = 10
+
+class DisplayArtifact:
+    """Everything the chat needs to draw one page of a result.
+
+    Float columns are formatted through Streamlit's column config rather than
+    a pandas Styler, which Streamlit would otherwise recompute on every rerun.
+    """
+
+    def __init__(self,
+                 frame: pd.DataFrame,
+                 float_columns: List[str],
+                 chart_kind: Optional[str] = None,
+                 chart_data: Optional[pd.DataFrame] = None):
+        self.frame = frame
+        self.float_columns = float_columns
+        self.chart_kind = chart_kind  # 'line', 'bar' or None
+        self.chart_data = chart_data
+
+def prepare_display(df: pd.DataFrame) -> DisplayArtifact:
+    """Detect dtypes and build chart-ready data for a result page"""
+    float_columns = list(df.select_dtypes(include=['float64', 'float32']).columns)
+    numeric_cols = list(df.select_dtypes(include=['float64', 'float32', 'int64', 'int32']).columns)
+    if df.empty or not numeric_cols:
+        return DisplayArtifact(df, float_columns)
+
+    month_columns = [col for col in df.columns if str(col).lower() == 'month']
+    if month_columns:
+        # Time series plot
+        chart_data = df.set_index(month_columns[0])[[c for c in numeric_cols if c != month_columns[0]]]
+        return DisplayArtifact(df, float_columns, 'line', chart_data.sort_index())
+    if len(df) <= BAR_CHART_MAX_ROWS and df.columns[0] not in numeric_cols:
+        chart_data = df.set_index(df.columns[0])[numeric_cols]
+        return DisplayArtifact(df, float_columns, 'bar', chart_data)
+    return DisplayArtifact(df, float_columns)
+
+class ArtifactCache:
+    """LRU of prepared display artifacts keyed by (result_id, page)"""
+
+    def __init__(self, max_entries: int = RENDER_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0}
+
+    def get(self, result, page: int) -> DisplayArtifact:
+        """Prepared artifact for a page of a ResultRef, built on first use"""
+        key = (result.result_id, page)
+        with self._lock:
+            artifact = self._entries.get(key)
+            if artifact is not None:
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                return artifact
+            self._stats['misses'] += 1
+
+        artifact = prepare_display(result.page(page))
+        with self._lock:
+            self._entries[key] = artifact
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return artifact
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, 'entries': len(self._entries)}
+
+_cache: Optional[ArtifactCache] = None
+_cache_lock = threading.Lock()
+
+def get_artifact_cache() -> ArtifactCache:
+    """Get the process-wide display artifact cache"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ArtifactCache()
+    return _cache
+
+def visible_history(history: List[Dict[str, Any]], visible_turns: int) -> Tuple[int, List[Dict[str, Any]]]:
+    """Split chat history into the number of hidden messages and the visible tail.
+
+    A turn is a user message plus the reply, so ``visible_turns`` turns are
+    at most twice as many messages.
+    """
+    start = max(0, len(history) - 2 * visible_turns)
+    # Never start a visible window on an assistant reply
+    if start and history[start].get("role") == "assistant":
+        start -= 1
+    return start, history[start:]
@@ -0,0 +1,264 @@
+import json
+import re
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional
+import sqlglot
+from sqlglot import exp
+from config import (
+    TABLE_NAME,
+    SQL_GUARD_DIALECT,
+    SQL_GUARD_WINDOW_DAYS,
+    SQL_GUARD_ROW_LIMIT,
+    SQL_GUARD_EXPLAIN,
+    SQL_GUARD_MAX_BYTES_SCANNED,
+    SQL_GUARD_MAX_PARTITIONS,
+    SQL_GUARD_BUDGET_ACTION,
+    SQL_GUARD_REWRITE_WINDOW_DAYS
+)
+
+DATE_COLUMN = 'ASSIGNED_DATE_TIME'
+
+# Statement types a read-only analytics query may consist of
+_READ_ONLY_ROOTS = (exp.Select, exp.Union, exp.Intersect, exp.Except)
+
+# Nodes that must not appear anywhere in the tree, e.g. inside a CTE
+_WRITE_NODES = (
+    exp.Insert, exp.Update, exp.Delete, exp.Merge, exp.Create, exp.Drop,
+    exp.Alter, exp.TruncateTable, exp.Command, exp.Grant, exp.Copy, exp.Use,
+    exp.Set, exp.Transaction, exp.Commit, exp.Rollback
+)
+
+# Functions with side effects or cost that a SELECT may still call: SYSTEM$ functions
+# (e.g. SYSTEM$CANCEL_ALL_QUERIES) and qualified ones such as UDFs, external
+# functions and SNOWFLAKE.CORTEX.*
+_UNSAFE_FUNCTIONS = {'RESULT_SCAN', 'GETVARIABLE'}
+
+_CODE_FENCE = re.compile(r"^\s*```[a-zA-Z]*\s*|\s*```\s*$")
+
+@lru_cache(maxsize=8)
+def _window_start(days: int) -> exp.Expression:
+    return sqlglot.parse_one(f"DATEADD(day, -{days}, CURRENT_TIMESTAMP())", read='snowflake')
+
+class UnsafeQueryError(ValueError):
+    """Raised when generated SQL is not a single read-only query"""
+
+class QueryBudgetError(UnsafeQueryError):
+    """Raised when a query's estimated scan exceeds the configured budget"""
+
+class GuardedQuery:
+    """Outcome of running generated SQL through the guard"""
+
+    def __init__(self, sql: str, original_sql: str):
+        self.sql = sql
+        self.original_sql = original_sql
+        self.rewrites: List[str] = []
+        self.row_limit: Optional[int] = None  # the LIMIT the guard imposed, if any
+        self.estimate: Optional[Dict[str, Any]] = None
+        self.parse_ms = 0.0
+        self.rewrite_ms = 0.0
+        self.explain_ms = 0.0
+
+    @property
+    def overhead_ms(self) -> float:
+        """Parse plus rewrite time; EXPLAIN round trips are reported separately"""
+        return self.parse_ms + self.rewrite_ms
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'sql': self.sql,
+            'rewrites': self.rewrites,
+            'estimate': self.estimate,
+            'parse_ms': round(self.parse_ms, 3),
+            'rewrite_ms': round(self.rewrite_ms, 3),
+            'explain_ms': round(self.explain_ms, 3)
+        }
+
+def snowflake_explain(sql: str) -> Dict[str, Any]:
+    """Partitions and bytes Snowflake expects to scan, from EXPLAIN USING JSON"""
+    from database.connector import execute_query
+
+    rows = execute_query(f"EXPLAIN USING JSON {sql}")
+    stats = json.loads(rows[0][0]).get('GlobalStats', {})
+    return {
+        'partitions_total': int(stats.get('partitionsTotal', 0)),
+        'partitions_assigned': int(stats.get('partitionsAssigned', 0)),
+        'bytes_assigned': int(stats.get('bytesAssigned', 0))
+    }
+
+class SQLGuard:
+    """Pre-execution stage for LLM-generated SQL.
+
+    Only single SELECT statements pass. Reads of the shipment view without an
+    ASSIGNED_DATE_TIME filter get a default window, and the outer query gets
+    a row limit. With ``explain`` enabled, the warehouse's scan estimate is
+    checked against the budget: over-budget queries are narrowed to a shorter
+    window once, or refused.
+    """
+
+    def __init__(self,
+                 dialect: str = SQL_GUARD_DIALECT,
+                 table_name: str = TABLE_NAME,
+                 window_days: int = SQL_GUARD_WINDOW_DAYS,
+                 row_limit: int = SQL_GUARD_ROW_LIMIT,
+                 explain: bool = SQL_GUARD_EXPLAIN,
+                 explainer: Callable[[str], Dict[str, Any]] = snowflake_explain,
+                 max_bytes_scanned: int = SQL_GUARD_MAX_BYTES_SCANNED,
+                 max_partitions: int = SQL_GUARD_MAX_PARTITIONS,
+                 budget_action: str = SQL_GUARD_BUDGET_ACTION,
+                 rewrite_window_days: int = SQL_GUARD_REWRITE_WINDOW_DAYS):
+        if budget_action not in ('rewrite', 'refuse'):
+            raise ValueError("budget_action must be 'rewrite' or 'refuse'")
+        self.dialect = dialect
+        self.table_name = table_name.upper()
+        self.window_days = window_days
+        self.row_limit = row_limit
+        self.explain = explain
+        self.explainer = explainer
+        self.max_bytes_scanned = max_bytes_scanned
+        self.max_partitions = max_partitions
+        self.budget_action = budget_action
+        self.rewrite_window_days = rewrite_window_days
+
+        self._overheads = deque(maxlen=1000)  # recent parse + rewrite ms
+        self._lock = threading.Lock()
+        self._stats = {
+            'checked': 0,
+            'rejected': 0,
+            'rewritten': 0,
+            'over_budget': 0
+        }
+
+    def check(self, sql: str) -> GuardedQuery:
+        """Validate and rewrite generated SQL, raising UnsafeQueryError if refused"""
+        try:
+            guarded = self._check(sql)
+        except UnsafeQueryError:
+            self._count('rejected')
+            raise
+        with self._lock:
+            self._stats['checked'] += 1
+            if guarded.rewrites:
+                self._stats['rewritten'] += 1
+            self._overheads.append(guarded.overhead_ms)
+        return guarded
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters and parse + rewrite overhead percentiles in ms"""
+        with self._lock:
+            stats = dict(self._stats)
+            overheads = sorted(self._overheads)
+        if overheads:
+            stats['overhead_p50_ms'] = round(overheads[len(overheads) // 2], 3)
+            stats['overhead_p95_ms'] = round(overheads[int(len(overheads) * 0.95) - 1], 3)
+        return stats
+
+    def _check(self, sql: str) -> GuardedQuery:
+        started = time.perf_counter()
+        original_sql = sql
+        sql = _CODE_FENCE.sub("", sql).strip().rstrip(";")
+        try:
+            statements = [s for s in sqlglot.parse(sql, read=self.dialect) if s is not None]
+        except sqlglot.errors.ParseError as e:
+            raise UnsafeQueryError(f"Could not parse generated SQL: {e}")
+        if len(statements) != 1:
+            raise UnsafeQueryError(f"Expected a single statement, got {len(statements)}")
+
+        tree = statements[0]
+        if not isinstance(tree, _READ_ONLY_ROOTS) or tree.find(*_WRITE_NODES) is not None:
+            raise UnsafeQueryError(f"Only SELECT statements may run, got {tree.key.upper()}")
+        for func in tree.find_all(exp.Anonymous):
+            name = func.name.upper()
+            if '$' in name or name in _UNSAFE_FUNCTIONS or isinstance(func.parent, exp.Dot):
+                raise UnsafeQueryError(f"Function {func.sql(dialect=self.dialect)} may not be called")
+        parsed = time.perf_counter()
+
+        guarded = GuardedQuery(sql, original_sql)
+        guarded.parse_ms = (parsed - started) * 1000
+        tree = self._rewrite(tree, self.window_days, guarded.rewrites)
+        if f"LIMIT {self.row_limit}" in guarded.rewrites:
+            guarded.row_limit = self.row_limit
+        guarded.sql = tree.sql(dialect=self.dialect)
+        guarded.rewrite_ms = (time.perf_counter() - parsed) * 1000
+
+        if self.explain:
+            self._enforce_budget(tree, guarded)
+        return guarded
+
+    def _rewrite(self, tree: exp.Expression, window_days: int, rewrites: List[str], force_window: bool = False) -> exp.Expression:
+        """Add the date window to view scans and cap the outer row count"""
+        for select in list(tree.find_all(exp.Select)):
+            tables = [t for t in select.find_all(exp.Table)
+                      if t.name.upper() == self.table_name and t.find_ancestor(exp.Select) is select]
+            if not tables:
+                continue
+            where = select.args.get('where')
+            filtered = where is not None and any(
+                c.name.upper() == DATE_COLUMN for c in where.find_all(exp.Column)
+            )
+            if filtered and not force_window:
+                continue
+            qualifier = tables[0].alias_or_name if len(tables) > 1 or tables[0].alias else None
+            select.where(self._window_condition(qualifier, window_days), copy=False)
+            rewrites.append(f"{DATE_COLUMN} window of {window_days} days")
+
+        limit = tree.args.get('limit')
+        current = None
+        if limit is not None:
+            value = limit.args.get('expression') or limit.this
+            current = int(value.name) if isinstance(value, exp.Literal) and value.is_int else None
+        if current is None or current > self.row_limit:
+            tree = tree.limit(self.row_limit, copy=False)
+            rewrites.append(f"LIMIT {self.row_limit}")
+        return tree
+
+    def _window_condition(self, qualifier: Optional[str], days: int) -> exp.Expression:
+        column = exp.column(DATE_COLUMN, table=qualifier)
+        return exp.GTE(this=column, expression=_window_start(days).copy())
+
+    def _enforce_budget(self, tree: exp.Expression, guarded: GuardedQuery) -> None:
+        started = time.perf_counter()
+        try:
+            guarded.estimate = self.explainer(guarded.sql)
+            if self._over_budget(guarded.estimate):
+                self._count('over_budget')
+                if self.budget_action == 'refuse':
+                    raise QueryBudgetError(self._budget_message(guarded.estimate))
+
+                rewrites: List[str] = []
+                tree = self._rewrite(tree, self.rewrite_window_days, rewrites, force_window=True)
+                guarded.sql = tree.sql(dialect=self.dialect)
+                guarded.rewrites.extend(f"{r} (over scan budget)" for r in rewrites)
+                guarded.estimate = self.explainer(guarded.sql)
+                if self._over_budget(guarded.estimate):
+                    raise QueryBudgetError(self._budget_message(guarded.estimate))
+        finally:
+            guarded.explain_ms = (time.perf_counter() - started) * 1000
+
+    def _over_budget(self, estimate: Dict[str, Any]) -> bool:
+        return (estimate.get('bytes_assigned', 0) > self.max_bytes_scanned or
+                estimate.get('partitions_assigned', 0) > self.max_partitions)
+
+    def _budget_message(self, estimate: Dict[str, Any]) -> str:
+        return (f"Query would scan {estimate.get('bytes_assigned', 0) / 1024 ** 3:.1f} GB "
+                f"in {estimate.get('partitions_assigned', 0)} partitions, over the budget of "
+                f"{self.max_bytes_scanned / 1024 ** 3:.1f} GB / {self.max_partitions} partitions. "
+                f"Try narrowing the date range.")
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+_guard: Optional[SQLGuard] = None
+_guard_lock = threading.Lock()
+
+def get_sql_guard() -> SQLGuard:
+    """Get the process-wide SQL guard, creating it on first use"""
+    global _guard
+    if _guard is None:
+        with _guard_lock:
+            if _guard is None:
+                _guard = SQLGuard()
+    return _guard
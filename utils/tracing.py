@@ -0,0 +1,232 @@
+import asyncio
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+import numpy as np
+from langchain_core.callbacks import BaseCallbackHandler
+from config import TRACE_ENABLED, TRACE_PATH, TRACE_MAX_BYTES, TRACE_BUFFER_SIZE
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+class Span:
+    """One timed operation; spans of one query share a trace_id"""
+
+    def __init__(self, name: str, stage: str, parent: Optional["Span"] = None, **attributes):
+        self.name = name
+        self.stage = stage  # 'query', 'node', 'llm', 'warehouse', 'render', ...
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.attributes: Dict[str, Any] = attributes
+        self.status = "ok"
+        self.error: Optional[str] = None
+        self.start_time = time.time()
+        self._started = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def finish(self, error: BaseException = None) -> None:
+        self.duration_ms = (time.perf_counter() - self._started) * 1000
+        if error is not None:
+            self.status = "error"
+            self.error = f"{type(error).__name__}: {error}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """OpenTelemetry-style span record (field names as in OTLP JSON)"""
+        start_ns = int(self.start_time * 1e9)
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id,
+            "name": self.name,
+            "startTimeUnixNano": start_ns,
+            "endTimeUnixNano": start_ns + int((self.duration_ms or 0) * 1e6),
+            "attributes": {"stage": self.stage, **self.attributes},
+            "status": {"code": "ERROR" if self.status == "error" else "OK", "message": self.error}
+        }
+
+class JSONLSink:
+    """Appends finished spans to a local JSON-lines file, rotating it at ``max_bytes``"""
+
+    def __init__(self, path: str = TRACE_PATH, max_bytes: int = TRACE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), default=str) + "\n"
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            try:
+                if os.path.getsize(self.path) > self.max_bytes:
+                    os.replace(self.path, self.path + ".1")
+            except OSError:
+                pass
+            with open(self.path, "a") as f:
+                f.write(line)
+
+class Tracer:
+    """Records spans, exports them to sinks and keeps recent durations per span name"""
+
+    def __init__(self,
+                 sinks: List[Any] = None,
+                 buffer_size: int = TRACE_BUFFER_SIZE,
+                 enabled: bool = TRACE_ENABLED):
+        self.sinks = sinks if sinks is not None else [JSONLSink()]
+        self.buffer_size = buffer_size
+        self.enabled = enabled
+        self._durations: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, stage: str, **attributes) -> Iterator[Span]:
+        """Time the enclosed block as a child of the current span"""
+        span = Span(name, stage, _current_span.get(), **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except GeneratorExit:
+            span.set(abandoned=True)  # a stream its consumer stopped reading
+            span.finish()
+            raise
+        except BaseException as e:
+            span.finish(e)
+            raise
+        else:
+            span.finish()
+        finally:
+            try:
+                _current_span.reset(token)
+            except ValueError:
+                pass  # generator finished in another context
+            self.record(span)
+
+    def record(self, span: Span) -> None:
+        """Keep a finished span's duration and export it"""
+        if not self.enabled:
+            return
+        with self._lock:
+            durations = self._durations.get(span.name)
+            if durations is None:
+                durations = self._durations[span.name] = deque(maxlen=self.buffer_size)
+            durations.append(span.duration_ms)
+        for sink in self.sinks:
+            try:
+                sink.export(span)
+            except Exception:
+                pass  # tracing never breaks a query
+
+    def stage_percentiles(self) -> Dict[str, Dict[str, float]]:
+        """p50 / p95 / p99 in milliseconds over the recent spans of each name"""
+        with self._lock:
+            snapshot = {name: list(durations) for name, durations in self._durations.items()}
+        stats = {}
+        for name, durations in snapshot.items():
+            if durations:
+                p50, p95, p99 = np.percentile(durations, [50, 95, 99])
+                stats[name] = {'count': len(durations), 'p50': float(p50), 'p95': float(p95), 'p99': float(p99)}
+        return stats
+
+    def reset(self) -> None:
+        with self._lock:
+            self._durations.clear()
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+def traced(name: str, stage: str = "node") -> Callable:
+    """Decorator recording a span around each call; works for sync and async functions"""
+    def decorate(func: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with get_tracer().span(name, stage):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with get_tracer().span(name, stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+class LLMTracingCallback(BaseCallbackHandler):
+    """LangChain callback recording an 'llm' span per model call, with token counts"""
+
+    run_inline = True  # keep the caller's context, so spans nest under the current node
+
+    def __init__(self):
+        self._spans: Dict[Any, Span] = {}
+        self._lock = threading.Lock()
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs) -> None:
+        self._start(serialized, run_id)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs) -> None:
+        self._start(serialized, run_id)
+
+    def on_llm_end(self, response, *, run_id, **kwargs) -> None:
+        span = self._pop(run_id)
+        if span is None:
+            return
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        prompt_tokens, completion_tokens = usage.get("prompt_tokens"), usage.get("completion_tokens")
+        if prompt_tokens is None:
+            # Chat models report usage on the message, including when streaming
+            for generations in response.generations:
+                for generation in generations:
+                    metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                    if metadata:
+                        prompt_tokens = metadata.get("input_tokens")
+                        completion_tokens = metadata.get("output_tokens")
+        span.set(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+        span.finish()
+        get_tracer().record(span)
+
+    def on_llm_error(self, error, *, run_id, **kwargs) -> None:
+        span = self._pop(run_id)
+        if span is not None:
+            span.finish(error)
+            get_tracer().record(span)
+
+    def _start(self, serialized, run_id) -> None:
+        kwargs = (serialized or {}).get("kwargs", {})
+        model = kwargs.get("model_name") or kwargs.get("model")
+        with self._lock:
+            self._spans[run_id] = Span("llm", "llm", _current_span.get(), model=model)
+
+    def _pop(self, run_id) -> Optional[Span]:
+        with self._lock:
+            return self._spans.pop(run_id, None)
+
+_tracer: Optional[Tracer] = None
+_llm_callback: Optional[LLMTracingCallback] = None
+_tracer_lock = threading.Lock()
+
+def get_tracer() -> Tracer:
+    """Get the process-wide tracer"""
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                _tracer = Tracer()
+    return _tracer
+
+def get_llm_callback() -> LLMTracingCallback:
+    """Shared LangChain callback; pass it in ``callbacks`` when creating a chat model"""
+    global _llm_callback
+    if _llm_callback is None:
+        with _tracer_lock:
+            if _llm_callback is None:
+                _llm_callback = LLMTracingCallback()
+    return _llm_callback